@@ -1,12 +1,50 @@
 import streamlit as st
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-from PIL import Image
+import html
 import os
-import plotly.graph_objects as go
-import plotly.express as px
-import numpy as np
-import re
-import time
+
+from detector import MODEL_NAME, WINDOW_STRIDE, WINDOW_TOKENS, iter_analysis, reanalysis_plan, reanalyze_document
+from result_cache import ResultCache, content_key, normalize_text
+from highlight import highlight_intervals, highlight_range_html
+from jobs import FINISHED_STATES, JobRunner, JobStore
+from near_duplicate import MATCH_BUCKETS, NearDuplicateIndex
+from metrics import METRICS, serve_metrics
+from inference_server import SUBMIT_SIZE, InferenceScheduler, SessionClient, model_batch_fn
+from startup import ModelLoader, model_source
+from autotune import profile_settings
+from visualize import TIMELINE_BUCKETS, page_bounds, page_end, page_html, page_of, score_buckets
+from cascade import cascade_classifier, cascade_fingerprint
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# 分析模式：sentences（依句子邊界裝箱，支援中文）、tokens（固定 token 視窗）、
+# words（舊版 50 字視窗）或 adaptive（由粗到細細分）
+ANALYSIS_MODE = os.environ.get("ANALYSIS_MODE", "sentences")
+# adaptive 模式每篇文件的推論次數上限（未設定時不超過 tokens 模式的次數）
+ADAPTIVE_BUDGET = int(os.environ["ADAPTIVE_BUDGET"]) if os.environ.get("ADAPTIVE_BUDGET") else None
+# 整體分數彙整方式：mean / length_weighted / logit_mean / max_k
+AGGREGATION = os.environ.get("AGGREGATION", "length_weighted")
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "pytorch")
+# 設定 MODEL_DIR 即從本機資料夾載入模型（離線部署）
+MODEL_SOURCE = model_source(MODEL_NAME)
+# 設定 CASCADE_MODEL（cascade.py train 的輸出）即先以便宜的前置模型判定有把握的視窗；
+# CASCADE_LOW / CASCADE_HIGH 覆寫模型檔中的門檻
+CASCADE_MODEL = os.environ.get("CASCADE_MODEL")
+CASCADE_LOW = float(os.environ["CASCADE_LOW"]) if os.environ.get("CASCADE_LOW") else None
+CASCADE_HIGH = float(os.environ["CASCADE_HIGH"]) if os.environ.get("CASCADE_HIGH") else None
+# 分數的來源（模型、後端與前置模型）：結果快取與報告以此區分
+SCORER = f"{MODEL_SOURCE}:{INFERENCE_BACKEND}"
+if CASCADE_MODEL:
+    SCORER += ":cascade-" + cascade_fingerprint(CASCADE_MODEL, CASCADE_LOW, CASCADE_HIGH)
+# 執行參數自動調校（autotune.py）：預設套用本主機已存的設定檔；AUTOTUNE=1 時沒有設定檔就在啟動時調校，
+# AUTOTUNE=0 不使用設定檔
+AUTOTUNE = {"0": None, "1": "tune"}.get(os.environ.get("AUTOTUNE"), "apply")
+# 設定檔的視窗長度會改變分數，AUTOTUNE_WINDOW=1 時才套用
+AUTOTUNE_WINDOW = os.environ.get("AUTOTUNE_WINDOW") == "1"
+# 長文件逐批顯示結果時，每批的視窗數
+STREAM_CHUNK = 32
+# 設定為 1 時在報告下方顯示各階段耗時（也可在網址加上 ?debug=1）
+METRICS_DEBUG = os.environ.get("METRICS_DEBUG") == "1"
+# 背景工作進行中時，工作列表重新讀取進度的間隔（秒）
+JOB_POLL_SECONDS = 1.0
 
 # 頁面配置
 st.set_page_config(
@@ -16,174 +54,514 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# 載入自訂 CSS
-def load_css():
-    # Add background image using base64 encoding
-    bg_path = "assets/bg.png"
-    if os.path.exists(bg_path):
-        import base64
-        with open(bg_path, "rb") as img_file:
-            bg_base64 = base64.b64encode(img_file.read()).decode()
-            bg_css = f'''
-            <style>
-            .stApp {{
-                background-image: url('data:image/png;base64,{bg_base64}') !important;
-                background-size: cover !important;
-                background-position: center !important;
-                background-repeat: no-repeat !important;
-                background-attachment: fixed !important;
-            }}
-            
-            /* Also apply to main container */
-            .main, [data-testid="stAppViewContainer"] {{
-                background: transparent !important;
-            }}
-            
-            /* Apply to sidebar if exists */
-            section[data-testid="stSidebar"] {{
-                background: transparent !important;
-            }}
-            </style>
-            '''
-            st.markdown(bg_css, unsafe_allow_html=True)
-    
-    # Load custom CSS
+# 載入自訂 CSS（每個行程只讀取一次；背景圖由靜態檔案服務提供，瀏覽器可快取）
+@st.cache_resource
+def page_styles():
     css_file = "styles/custom.css"
-    if os.path.exists(css_file):
-        with open(css_file) as f:
-            css_content = f.read()
-        st.markdown(f'<style>{css_content}</style>', unsafe_allow_html=True)
+    if not os.path.exists(css_file):
+        return ""
+    with open(css_file) as f:
+        return f'<style>{f.read()}</style>'
+
+def load_css():
+    st.markdown(page_styles(), unsafe_allow_html=True)
+
+with METRICS.span("load_css"):
+    load_css()
+
+# 載入模型：在背景執行緒載入並預熱，輸入介面不必等待
+@st.cache_resource
+def start_model_loader():
+    # 推論後端：pytorch（預設）、int8（動態量化）、onnx（ONNX Runtime）
+    return ModelLoader(MODEL_SOURCE, INFERENCE_BACKEND, warmup=os.environ.get("MODEL_WARMUP", "1") == "1",
+                       autotune=AUTOTUNE)
+
+model_loader = start_model_loader()
+
+# 結果快取（跨 session 共用；設定 RESULT_CACHE_DB 即啟用 SQLite 磁碟層）
+@st.cache_resource
+def load_result_cache():
+    return ResultCache(SCORER, db_path=os.environ.get("RESULT_CACHE_DB"))
+
+result_cache = load_result_cache()
+
+# 共用推論排程器：所有 session 的視窗在這裡合併成 micro-batch
+# （未設定 SCHEDULER_MAX_BATCH 時使用調校設定檔的批次大小）
+@st.cache_resource
+def load_scheduler():
+    clf, tokenizer = model_loader.result()
+    clf = cascade_classifier(clf, tokenizer, CASCADE_MODEL, CASCADE_LOW, CASCADE_HIGH, ANALYSIS_MODE,
+                             analysis_settings()["window_tokens"])
+    profile = model_loader.profile or {}
+    return InferenceScheduler(
+        model_batch_fn(clf, tokenizer),
+        max_batch_size=int(os.environ.get("SCHEDULER_MAX_BATCH") or profile.get("batch_size", 32)),
+        max_wait_ms=float(os.environ.get("SCHEDULER_MAX_WAIT_MS", 10)),
+    )
+
+# 設定 METRICS_PORT 即在本機提供 Prometheus 格式的 /metrics
+@st.cache_resource
+def start_metrics_server():
+    port = os.environ.get("METRICS_PORT")
+    return serve_metrics(METRICS, int(port)) if port else None
+
+start_metrics_server()
+
+def session_id():
+    script_ctx = get_script_run_ctx()
+    return script_ctx.session_id if script_ctx else "default"
+
+# 分析設定；AUTOTUNE_WINDOW=1 且調校設定檔選了不同的 token 視窗長度時一併帶入（前置模型的門檻依訓練時的
+# 視窗長度而定，設定 CASCADE_MODEL 時不改變視窗長度）
+def analysis_settings():
+    tuned = {} if CASCADE_MODEL else profile_settings(model_loader.profile, AUTOTUNE_WINDOW)
+    return dict(mode=ANALYSIS_MODE, aggregation=AGGREGATION, budget=ADAPTIVE_BUDGET,
+                window_tokens=tuned.get("window_tokens", WINDOW_TOKENS), stride=tuned.get("stride", WINDOW_STRIDE))
+
+# 本 session 使用的 clf 替代品（模型就緒後才建立）
+def session_client():
+    return SessionClient(load_scheduler(), session_id())
 
-load_css()
+# 背景工作：上傳的檔案在背景執行緒分析，視窗同樣經由共用排程器推論
+@st.cache_resource
+def load_job_store():
+    return JobStore(os.environ.get("JOB_DB", "jobs.db"))
+
+job_store = load_job_store()
 
-# 載入模型
 @st.cache_resource
-def load_model():
-    MODEL_NAME = "AICodexLab/answerdotai-ModernBERT-base-ai-detector"
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-    clf = pipeline("text-classification", model=model, tokenizer=tokenizer)
-    return clf, tokenizer
-
-clf, tokenizer = load_model()
-
-# 分析文字片段
-def analyze_text_segments(text, clf, tokenizer, segment_size=50):
-    """將文字分段並分析每段的 AI 機率"""
-    words = text.split()
-    segments = []
-    scores = []
+def load_job_runner():
+    _, tokenizer = model_loader.result()
+    return JobRunner(job_store, SessionClient(load_scheduler(), "jobs"), tokenizer,
+                     workers=int(os.environ.get("JOB_WORKERS", 1)), cache=result_cache, batch_size=SUBMIT_SIZE)
+
+# 近似重複索引：設定 NEAR_DUP_INDEX 即以已知文字比對 Content Classification 的各等級；
+# NEAR_DUP_RECORD=1 時把分析過的片段以 session 為來源加入索引；比對時排除本 session 記錄的片段，
+# 修改後重新偵測時不會比對到自己先前的版本
+@st.cache_resource
+def load_near_duplicate_index():
+    path = os.environ.get("NEAR_DUP_INDEX")
+    return NearDuplicateIndex(path) if path else None
+
+near_duplicate_index = load_near_duplicate_index()
+NEAR_DUP_RECORD = os.environ.get("NEAR_DUP_RECORD") == "1"
+
+# 模型就緒後才啟動背景工作（包含上次重新啟動前未完成的工作）
+if model_loader.ready:
+    load_job_runner()
+
+# 模型狀態：載入與預熱期間定期檢查，就緒後重新執行整頁以啟用 DETECT
+def render_model_status(polling):
+    if model_loader.state == "failed":
+        st.error(f"❌ Model failed to load: {model_loader.error}")
+        # 載入器被快取，失敗（例如暫時的網路錯誤）時清除快取重新載入，不必重新啟動伺服器
+        if st.button("Retry loading model", key="retry_model_btn"):
+            start_model_loader.clear()
+            st.rerun()
+        return
+    if not model_loader.ready:
+        label = {"loading": "Loading model", "tuning": "Tuning CPU settings"}.get(model_loader.state,
+                                                                                 "Warming up model")
+        st.markdown(f'<div class="model-status">⏳ {label}<span class="loading-dots"></span></div>',
+                    unsafe_allow_html=True)
+    elif polling:
+        st.rerun()
+
+# 顯示分析進度
+def render_progress(placeholder, text, done, total, analysis):
+    """分析進行中：顯示已完成片段數、暫時的整體分數，以及目前為止的標註"""
+    with placeholder.container():
+        st.markdown(f'''
+        <div class="loading-container">
+            <div class="loading-wheel"></div>
+            <div class="loading-text">
+                🤖 Analyzed {done} / {total} segments · running AI score {analysis["overall_score"]:.0%}<span class="loading-dots"></span>
+            </div>
+        </div>
+        ''', unsafe_allow_html=True)
+        st.progress(done / total)
+        # 只顯示第一頁，長文件每批更新時不必重送整篇
+        highlighted = highlight_range_html(
+            text, highlight_intervals(analysis["spans"], analysis["scores"]), 0, page_end(text, 0))
+        st.markdown(f'<div class="highlighted-text">{highlighted}</div>', unsafe_allow_html=True)
+
+# 報告鍵：文字內容雜湊 + 分析設定
+def report_key(text, settings):
+    return content_key("report", text, SCORER, settings)
+
+# 效能除錯面板
+def render_debug_panel(trace):
+    """顯示本次分析各階段耗時與累計計數器"""
+    with st.expander("🔧 Performance debug", expanded=False):
+        if trace:
+            st.markdown("**This run**")
+            st.table([{"stage": stage, "ms": round(seconds * 1000, 1)}
+                      for stage, seconds in sorted(trace["stages"].items(), key=lambda item: -item[1])])
+            st.json(trace["counters"])
+        snapshot = METRICS.snapshot()
+        st.markdown("**Since startup**")
+        st.table([{"stage": stage, "count": entry["count"], "avg ms": round(entry["seconds"] / entry["count"] * 1000, 1)}
+                  for stage, entry in sorted(snapshot["stages"].items())])
+        st.json(snapshot["counters"])
+
+# 報告圖表：第一次顯示時建立，之後由 session 中保存的規格直接重繪
+def report_figure(report, name, build):
+    if name not in report["figures"]:
+        report["figures"][name] = build()
+    return report["figures"][name]
+
+# 每個片段在近似重複索引中的比對等級（沒有設定索引時為 None；結果存在報告中，重新執行不必再查詢）
+def submission_source():
+    return f"submission:{session_id()}"
+
+def report_matches(report):
+    if near_duplicate_index is None:
+        return None
+    if "matches" not in report:
+        with METRICS.span("near_duplicate"):
+            report["matches"] = near_duplicate_index.classify_segments(report["analysis"]["segments"],
+                                                                       exclude_source=submission_source())
+    return report["matches"]
+
+# 記錄本次提交的片段；索引中（包含本 session 先前的版本）已有相同片段的不重複加入
+def record_submission(report):
+    report_matches(report)
+    segments = report["analysis"]["segments"]
+    known = near_duplicate_index.classify_segments(segments)
+    near_duplicate_index.add((segment for segment, bucket in zip(segments, known) if bucket != MATCH_BUCKETS[0]),
+                             source=submission_source())
+
+# 標註文字的頁碼（每份報告各自記錄）
+def page_key(report):
+    return f"page_{report['key']}"
+
+# 時間軸放大到視窗 [first, last)，標註文字跳到該區段開頭所在的頁
+def zoom_report(report, first, last):
+    if report.get("view") == (first, last):
+        return False
+    report["view"] = (first, last)
+    if "pages" in report:
+        st.session_state[page_key(report)] = page_of(report["pages"], report["analysis"]["spans"][first][0]) + 1
+    return True
+
+# 顯示分析報告
+def render_report(report, scroll=False):
+    """由 session 中保存的結果繪製報告，不需重新推論"""
+    # plotly 只在第一次顯示報告時才匯入，不影響第一個頁面的載入時間
+    from charts import create_classification_chart, create_donut_chart, create_timeline_chart
+    
+    text, analysis = report["text"], report["analysis"]
+    overall_score = analysis["overall_score"]
+    ai_percentage = overall_score * 100
+    segments, segment_scores = analysis["segments"], analysis["scores"]
+    
+    # 結果展示 - 添加報告標題 (與 Enter Text to Analyze 相同樣式)
+    st.markdown('<div id="results"></div>', unsafe_allow_html=True)
+    st.markdown('<h3 style="text-align: center;">📋 AI Detector Report</h3>', unsafe_allow_html=True)
+    
+    # 剛完成偵測時自動滾動到結果區域（重新執行時不捲動）
+    if scroll:
+        st.markdown('''
+    <script>
+        // 滾動到結果區域
+        setTimeout(function() {
+            var element = document.getElementById("results");
+            if (element) {
+                element.scrollIntoView({ behavior: "smooth", block: "start" });
+            }
+        }, 200);
+    </script>
+        ''', unsafe_allow_html=True)
     
-    for i in range(0, len(words), segment_size//2):  # 重疊分段
-        segment = ' '.join(words[i:i+segment_size])
-        if len(segment.split()) < 10:  # 太短的片段跳過
-            continue
+    # 使用container來包含所有內容
+    with st.container():
+        st.markdown('<div class="result-container">', unsafe_allow_html=True)
+        
+        # 簡化布局 - 只顯示圓環圖和信心分數
+        col1, col2, col3 = st.columns([1, 2, 1])
         
-        result = clf(segment, truncation=True)[0]
-        is_ai = result["label"].endswith("1")
-        score = result["score"] if is_ai else 1 - result["score"]
+        with col1:
+            st.markdown(f'''
+            <div class="metric-container">
+                <div class="metric-label">Confidence Score</div>
+                <div class="metric-value">{overall_score:.2%}</div>
+            </div>
+            ''', unsafe_allow_html=True)
+        
+        with col2:
+            # 圓環圖
+            with METRICS.span("donut_chart"):
+                fig = report_figure(report, "donut", lambda: create_donut_chart(ai_percentage))
+                st.plotly_chart(fig, width="stretch", key="donut_chart")
         
-        segments.append(segment)
-        scores.append(score)
+        with col3:
+            # 空白或其他內容
+            st.markdown('<div style="height: 100%;"></div>', unsafe_allow_html=True)
     
-    return segments, scores
-
-# 創建圓環圖
-def create_donut_chart(ai_percentage):
-    """創建類似參考圖的圓環圖"""
-    # 只顯示 AI 部分為紅色漸層，其餘為淺灰
-    labels = ['AI Generated', 'Human Written']
-    values = [ai_percentage, 100 - ai_percentage]
+    # 詳細分析區
+    st.markdown("---")
     
-    # 使用漸層紅色和淺灰色
-    if ai_percentage > 0:
-        colors = ['#fd373b', '#f0f0f0']
-    else:
-        colors = ['#f0f0f0', '#4ade80']
+    col1, col2 = st.columns([1, 1], gap="large")
     
-    fig = go.Figure(data=[go.Pie(
-        labels=labels,
-        values=values,
-        hole=.75,
-        marker=dict(
-            colors=colors,
-            line=dict(color='#ffffff', width=3)
-        ),
-        textinfo='none',
-        hovertemplate='<b>%{label}</b><br>%{value:.1f}%<extra></extra>'
-    )])
+    with col1:
+        st.markdown('<div class="analysis-header">📊 Text Analysis Breakdown</div>', unsafe_allow_html=True)
+        
+        if segments and segment_scores:
+            # 統計資料
+            stats = {
+                "Total Words": len(text.split()),
+                "AI Segments": sum(1 for s in segment_scores if s > 0.5),
+                "Human Segments": sum(1 for s in segment_scores if s <= 0.5),
+                "Avg AI Score": f"{sum(segment_scores) / len(segment_scores) * 100:.1f}%"
+            }
+            
+            cols = st.columns(4)
+            for i, (label, value) in enumerate(stats.items()):
+                with cols[i]:
+                    st.metric(label, value)
+            
+            # 分數時間軸：整篇（或放大的區段）降採樣成固定數量的桶；點選或框選長條即放大該區段
+            first, last = report.setdefault("view", (0, len(segment_scores)))
+            with METRICS.span("analysis_chart"):
+                fig_timeline = report_figure(report, f"timeline:{first}:{last}", lambda: create_timeline_chart(
+                    score_buckets(analysis["spans"], segment_scores, TIMELINE_BUCKETS, first, last), len(text)))
+                event = st.plotly_chart(fig_timeline, width="stretch", on_select="rerun",
+                                        selection_mode=("points", "box"),
+                                        key=f"timeline_{report['key']}_{first}_{last}")
+            selected = [point["customdata"] for point in event.selection.points if point.get("curve_number") == 0]
+            if selected and zoom_report(report, min(int(c[0]) - 1 for c in selected), max(int(c[1]) for c in selected)):
+                st.rerun()
+            if (first, last) != (0, len(segment_scores)):
+                st.caption(f"Showing segments {first + 1}–{last} of {len(segment_scores)}")
+                st.button("Show whole document", key=f"unzoom_{report['key']}",
+                          on_click=zoom_report, args=(report, 0, len(segment_scores)))
     
-    fig.update_layout(
-        annotations=[dict(
-            text=f'{ai_percentage:.0f}%',
-            x=0.5, y=0.5,
-            font_size=36,
-            font=dict(color='#fd373b', family="Arial", weight=700),
-            showarrow=False
-        ), dict(
-            text='AI Content',
-            x=0.5, y=0.42,
-            font_size=14,
-            font=dict(color='#999'),
-            showarrow=False
-        )],
-        showlegend=False,
-        paper_bgcolor='rgba(255,255,255,0)',
-        plot_bgcolor='rgba(255,255,255,0)',
-        margin=dict(t=10, b=10, l=10, r=10),
-        height=200
-    )
+    with col2:
+        st.markdown('<div class="analysis-header">🎯 Content Classification</div>', unsafe_allow_html=True)
+        
+        # Calculate real percentages based on segment analysis
+        if segments and segment_scores:
+            matches = report_matches(report)
+            if matches:
+                # Count segments by their closest match in the near-duplicate index
+                identical_segments, minor_segments, paraphrased_segments, unique_segments = (
+                    matches.count(bucket) for bucket in MATCH_BUCKETS)
+            else:
+                # Count segments in each category based on their scores
+                identical_segments = sum(1 for s in segment_scores if s > 0.8)
+                minor_segments = sum(1 for s in segment_scores if 0.6 < s <= 0.8)
+                paraphrased_segments = sum(1 for s in segment_scores if 0.4 < s <= 0.6)
+                unique_segments = sum(1 for s in segment_scores if s <= 0.4)
+            
+            total_segments = len(segment_scores)
+            if total_segments > 0:
+                identical_pct = round((identical_segments / total_segments) * 100)
+                minor_pct = round((minor_segments / total_segments) * 100)
+                paraphrased_pct = round((paraphrased_segments / total_segments) * 100)
+                unique_pct = round((unique_segments / total_segments) * 100)
+                
+                # Ensure percentages add up to 100%
+                total = identical_pct + minor_pct + paraphrased_pct + unique_pct
+                if total != 100:
+                    diff = 100 - total
+                    unique_pct += diff
+            else:
+                # Fallback if no segments
+                identical_pct = 0
+                minor_pct = 0
+                paraphrased_pct = 0
+                unique_pct = 100
+        else:
+            # If no segment analysis, estimate based on overall score
+            if ai_percentage > 80:
+                identical_pct = int(ai_percentage - 20)
+                minor_pct = 20
+                paraphrased_pct = 10
+                unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
+            elif ai_percentage > 60:
+                identical_pct = 10
+                minor_pct = int(ai_percentage - 30)
+                paraphrased_pct = 20
+                unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
+            elif ai_percentage > 40:
+                identical_pct = 5
+                minor_pct = 15
+                paraphrased_pct = int(ai_percentage - 10)
+                unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
+            else:
+                identical_pct = 0
+                minor_pct = 5
+                paraphrased_pct = int(ai_percentage)
+                unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
+        
+        # Create donut chart for classification with controlled container
+        values = [identical_pct, minor_pct, paraphrased_pct, unique_pct]
+        fig_class = report_figure(report, "classification", lambda: create_classification_chart(values, ai_percentage))
+        
+        # Use empty container to control plotly chart styling
+        with st.empty():
+            st.plotly_chart(fig_class, width="stretch", key="class_donut")
+        
+        # Legend with colored dots
+        st.markdown(f'''
+        <div class="classification-legend">
+            <div class="legend-item">
+                <span class="legend-dot" style="background: #e74c3c;"></span>
+                <span class="legend-text"><strong>{identical_pct}%</strong> Identical</span>
+            </div>
+            <div class="legend-item">
+                <span class="legend-dot" style="background: #f39c12;"></span>
+                <span class="legend-text"><strong>{minor_pct}%</strong> Minor changes</span>
+            </div>
+            <div class="legend-item">
+                <span class="legend-dot" style="background: #3498db;"></span>
+                <span class="legend-text"><strong>{paraphrased_pct}%</strong> Paraphrased</span>
+            </div>
+            <div class="legend-item">
+                <span class="legend-dot" style="background: #2ecc71;"></span>
+                <span class="legend-text"><strong>{unique_pct}%</strong> Unique text</span>
+            </div>
+        </div>
+        ''', unsafe_allow_html=True)
+        if segments and segment_scores:
+            st.caption(f"Matched against {len(near_duplicate_index):,} known segments" if report.get("matches")
+                       else "Estimated from segment AI scores (no near-duplicate index configured)")
+        
+        # Detection Result moved here (below legend)
+        st.markdown(f'''
+        <div style="text-align: center; margin-top: 1.5rem; padding: 1rem; background: #f8f8f8; border-radius: 10px;">
+            <div class="metric-label">Detection Result</div>
+            <div class="metric-value {'ai-detected' if ai_percentage > 50 else 'human-detected'}" style="font-size: 1.8rem;">
+                {'🤖 AI Generated' if ai_percentage > 50 else '✍️ Human Written'}
+            </div>
+        </div>
+        ''', unsafe_allow_html=True)
     
-    return fig
-
-# 創建分析細節圖表
-def create_analysis_chart(segments, scores):
-    """創建文字片段分析圖表"""
-    fig = go.Figure()
+    # 關閉 result-container
+    st.markdown('</div>', unsafe_allow_html=True)
     
-    # 加入柱狀圖
-    colors = ['#fd373b' if s > 0.5 else '#4ade80' for s in scores]
-    fig.add_trace(go.Bar(
-        y=[f"Segment {i+1}" for i in range(len(scores))],
-        x=[s * 100 for s in scores],
-        orientation='h',
-        marker=dict(color=colors),
-        text=[f'{s*100:.1f}%' for s in scores],
-        textposition='outside',
-        hovertemplate='<b>Segment %{y}</b><br>AI Score: %{x:.1f}%<extra></extra>'
-    ))
+    # 標註文字展示（預設展開）
+    st.markdown('<div class="section-header">📝 View Highlighted Text</div>', unsafe_allow_html=True)
+    if segments and segment_scores:
+        with METRICS.span("highlight"):
+            if "intervals" not in report:
+                report["intervals"] = highlight_intervals(analysis["spans"], segment_scores)
+                report["pages"] = page_bounds(text)
+            pages = report["pages"]
+            page = 1
+            if len(pages) > 1:
+                # 分頁：只把目前這一頁送到瀏覽器
+                page = st.number_input(f"Page (of {len(pages)})", min_value=1, max_value=len(pages),
+                                       key=page_key(report))
+                start, end = pages[page - 1]
+                st.caption(f"Characters {start + 1:,}–{end:,} of {len(text):,}")
+            st.markdown(f'<div class="highlighted-text">{page_html(text, report["intervals"], pages, page - 1)}</div>',
+                        unsafe_allow_html=True)
+    else:
+        st.text(text)
     
-    fig.update_layout(
-        xaxis_title="AI Probability (%)",
-        yaxis_title="Text Segments",
-        paper_bgcolor='#ffffff',
-        plot_bgcolor='#f8f8f8',
-        font=dict(color='#333'),
-        xaxis=dict(gridcolor='#e0e0e0', range=[0, 105]),
-        yaxis=dict(gridcolor='#e0e0e0'),
-        margin=dict(l=0, r=0, t=30, b=0),
-        height=400
-    )
+    # 建議 - 移到最下面
+    st.markdown('<div class="section-header">💡 Recommendations</div>', unsafe_allow_html=True)
+    if ai_percentage > 70:
+        st.warning("⚠️ High AI content detected. Consider rewriting for authenticity.")
+    elif ai_percentage > 40:
+        st.info("ℹ️ Moderate AI content. Some sections may need revision.")
+    else:
+        st.success("✅ Content appears to be primarily human-written.")
     
-    return fig
+    # 快取命中統計
+    cache_info = result_cache.info()
+    st.caption(
+        f"Result cache · documents {cache_info['document_hits']} hits / {cache_info['document_misses']} misses"
+        f" · segments {cache_info['segment_hits']} hits / {cache_info['segment_misses']} misses"
+    )
 
-# 標註文字
-def highlight_text(text, segments, scores):
-    """根據分析結果標註文字"""
-    if not segments or not scores:
-        return text
-    
-    # 簡單的標註邏輯：將高 AI 分數的片段標紅
-    highlighted = text
-    for segment, score in zip(segments, scores):
-        if score > 0.7 and len(segment) > 20:
-            # 使用 HTML 標籤標註
-            highlighted = highlighted.replace(
-                segment,
-                f'<span class="ai-highlight">{segment}</span>'
-            )
+# 目前頁面追蹤的工作 id（存在網址中，重新整理頁面後仍在）
+def job_ids():
+    return [job_id for job_id in st.query_params.get("jobs", "").split(",") if job_id]
+
+def set_job_ids(ids):
+    if ids:
+        st.query_params["jobs"] = ",".join(ids)
+    else:
+        st.query_params.pop("jobs", None)
+
+# 上傳檔案區：送出背景工作並列出進度
+def render_upload_section(settings):
+    st.markdown('<div class="section-header">📂 Analyze Files in the Background</div>', unsafe_allow_html=True)
+    files = st.file_uploader(
+        "Upload files",
+        type=["txt", "md"],
+        accept_multiple_files=True,
+        label_visibility="collapsed",
+        key="job_files"
+    )
+    if st.button("Queue for analysis", key="queue_btn", disabled=not files or not model_loader.ready):
+        ids = job_ids()
+        for uploaded in files:
+            text = normalize_text(uploaded.getvalue().decode("utf-8", errors="replace"))
+            if text:
+                ids.append(load_job_runner().submit(uploaded.name, text, settings))
+        set_job_ids(ids)
     
-    return highlighted
+    jobs = job_store.jobs(job_ids())
+    if jobs:
+        # 只有在還有未完成的工作時才定期輪詢
+        polling = any(job["status"] not in FINISHED_STATES for job in jobs)
+        st.fragment(run_every=JOB_POLL_SECONDS if polling else None)(render_jobs)(polling)
+
+def render_jobs(polling):
+    """工作列表：排隊與執行中的工作顯示進度與暫時分數，可取消；完成後可開啟報告"""
+    jobs = job_store.jobs(job_ids())
+    for job in jobs:
+        with st.container(border=True):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(
+                    f'<div class="job-name">📄 {html.escape(job["name"])} '
+                    f'<span class="job-status">· {job["status"]}</span></div>',
+                    unsafe_allow_html=True
+                )
+                if job["status"] == "running" and job["total"]:
+                    st.progress(job["done"] / job["total"], text=f'{job["done"]} / {job["total"]} segments')
+                if job["partial"]:
+                    st.caption(f'AI score {job["partial"]["overall_score"]:.0%} · '
+                               f'{job["partial"]["flagged"]} of {job["done"]} segments likely AI')
+                if job["error"]:
+                    st.error(job["error"])
+            with col2:
+                if job["status"] not in FINISHED_STATES:
+                    if st.button("Cancel", key=f'cancel_{job["id"]}', width="stretch"):
+                        job_store.cancel(job["id"])
+                        st.rerun(scope="fragment")
+                else:
+                    if job["status"] == "done" and st.button("Open report", key=f'open_{job["id"]}',
+                                                             width="stretch"):
+                        st.session_state.open_job = job["id"]
+                        st.session_state.scroll_to_report = True
+                        st.rerun()
+                    if st.button("Remove", key=f'remove_{job["id"]}', width="stretch"):
+                        set_job_ids([job_id for job_id in job_ids() if job_id != job["id"]])
+                        st.rerun()
+    # 全部完成後重新執行整頁，停止輪詢
+    if polling and all(job["status"] in FINISHED_STATES for job in jobs):
+        st.rerun()
+
+# 使用者開啟的背景工作報告（保存在 session 中，重新執行時不再讀取資料庫）
+def open_job_report():
+    job_id = st.session_state.get("open_job")
+    if job_id is None:
+        return None
+    report = st.session_state.get("job_report")
+    if report is None or report["key"] != job_id:
+        loaded = job_store.result(job_id)
+        if loaded is None:
+            del st.session_state.open_job
+            return None
+        text, analysis = loaded
+        report = {"key": job_id, "text": text, "settings": None, "analysis": analysis, "figures": {}}
+        st.session_state.job_report = report
+    return report
 
 # 主介面
 def main():
@@ -197,12 +575,10 @@ def main():
     ''', unsafe_allow_html=True)
     
     # Logo Section - larger size
-    logo_path = "assets/logo.png"
-    if os.path.exists(logo_path):
+    if os.path.exists("static/logo.png"):
         col1, col2, col3 = st.columns([2, 3, 2])
         with col2:
-            logo = Image.open(logo_path)
-            st.image(logo, width='stretch')
+            st.image("/app/static/logo.png", width='stretch')
     
     # Subtitle only
     st.markdown('<p class="subtitle">Maintain the authenticity of your writing by identifying AI-generated content</p>', unsafe_allow_html=True)
@@ -235,27 +611,6 @@ Most importantly, raising climate awareness among the public is crucial. Global
 
 Earth is our only home. Faced with an accelerating warming trend, now is the best time to act. Even small changes in daily life can help cool our planet and secure a more hopeful future for the next generation."""
         
-        # 載入範例文字連結樣式
-        st.markdown('''
-        <style>
-        .sample-text-link {
-            color: #fd373b;
-            text-decoration: none;
-            font-size: 0.95rem;
-            cursor: pointer;
-            display: inline-flex;
-            align-items: center;
-            gap: 0.5rem;
-            margin-top: 0.5rem;
-            transition: opacity 0.2s;
-        }
-        .sample-text-link:hover {
-            opacity: 0.8;
-            text-decoration: underline;
-        }
-        </style>
-        ''', unsafe_allow_html=True)
-        
         if st.button("⬇ Load Sample Text", key="sample_btn", help="Click to load a sample text for testing", type="tertiary"):
             st.session_state.text_area_input = sample_text
             st.rerun()
@@ -278,12 +633,27 @@ Earth is our only home. Faced with an accelerating warming trend, now is the bes
         analyze_button = st.button(
             "✦ DETECT AI",
             type="primary",
-            use_container_width=True,
-            key="detect_btn"
+            width="stretch",
+            key="detect_btn",
+            disabled=not model_loader.ready
         )
+    # 模型載入與預熱期間顯示狀態，就緒前每秒檢查一次
+    polling = model_loader.state in ("loading", "tuning", "warming")
+    st.fragment(run_every=1.0 if polling else None)(render_model_status)(polling)
     
-    if analyze_button and text:
+    # session 中的報告只在文字與設定都相同時顯示；只有真正修改文字才需要重新偵測
+    settings = analysis_settings()
+    previous = st.session_state.get("report")
+    key = report_key(normalize_text(text), settings) if text else None
+    report = previous if previous and previous["key"] == key else None
+    # 點擊 DETECT 時改回顯示輸入文字的報告
+    if analyze_button:
+        st.session_state.pop("open_job", None)
+    job_report = open_job_report()
+    
+    if analyze_button and text and report is None:
         loading_placeholder = st.empty()
+        METRICS.start_trace("detect", mode=ANALYSIS_MODE, chars=len(text))
         try:
             # 立即添加自動滾動錨點和JavaScript
             st.markdown('<div id="loading-section"></div>', unsafe_allow_html=True)
@@ -310,279 +680,55 @@ Earth is our only home. Faced with an accelerating warming trend, now is the bes
                 </div>
                 ''', unsafe_allow_html=True)
             
-            # 加入短暫延遲讓動畫效果更明顯
-            time.sleep(0.5)
-            
-            # 執行分析
-            # 整體分析
-            result = clf(text, truncation=True, max_length=512)[0]
-            is_ai = result["label"].endswith("1")
-            overall_score = result["score"] if is_ai else 1 - result["score"]
-            ai_percentage = overall_score * 100
-            
-            # 分段分析
-            segments, segment_scores = analyze_text_segments(text, clf, tokenizer)
+            # 執行分析（整體分數與分段分析）
+            text = normalize_text(text)
+            session_clf = session_client()
+            _, tokenizer = model_loader.result()
+            with METRICS.span("analysis"):
+                if (previous and previous["settings"] == settings
+                        and reanalysis_plan(text, previous["text"], previous["analysis"], settings["mode"])):
+                    # 增量模式：小幅修改只重新推論修改過的段落；大幅修改或換成其他文件時逐批整篇分析
+                    analysis = reanalyze_document(text, previous["text"], previous["analysis"], session_clf,
+                                                  tokenizer, batch_size=SUBMIT_SIZE, cache=result_cache, **settings)
+                else:
+                    # 依文件順序逐批推論，每批完成就更新進度、暫時分數與標註
+                    for done, total, analysis in iter_analysis(text, session_clf, tokenizer, batch_size=SUBMIT_SIZE,
+                                                               cache=result_cache, chunk_size=STREAM_CHUNK, **settings):
+                        if done < total:
+                            render_progress(loading_placeholder, text, done, total, analysis)
+            report = {"key": key, "text": text, "settings": settings, "analysis": analysis, "figures": {}}
+            st.session_state.report = report
+            if near_duplicate_index is not None and NEAR_DUP_RECORD:
+                # 先比對再記錄為已知文字，之後其他人的提交與本篇重複時可比對到
+                record_submission(report)
             
             # 清除加載動畫
             loading_placeholder.empty()
             
-            # 結果展示 - 添加報告標題 (與 Enter Text to Analyze 相同樣式)
-            st.markdown('<div id="results"></div>', unsafe_allow_html=True)
-            st.markdown('<h3 style="text-align: center;">📋 AI Detector Report</h3>', unsafe_allow_html=True)
-            
-            # 自動滾動到結果區域
-            st.markdown('''
-        <script>
-            // 滾動到結果區域
-            setTimeout(function() {
-                var element = document.getElementById("results");
-                if (element) {
-                    element.scrollIntoView({ behavior: "smooth", block: "start" });
-                }
-            }, 200);
-        </script>
-            ''', unsafe_allow_html=True)
-            
-            # 使用container來包含所有內容
-            with st.container():
-                st.markdown('<div class="result-container">', unsafe_allow_html=True)
-                
-                # 簡化布局 - 只顯示圓環圖和信心分數
-                col1, col2, col3 = st.columns([1, 2, 1])
-                
-                with col1:
-                    st.markdown(f'''
-                    <div class="metric-container">
-                        <div class="metric-label">Confidence Score</div>
-                        <div class="metric-value">{overall_score:.2%}</div>
-                    </div>
-                    ''', unsafe_allow_html=True)
-                
-                with col2:
-                    # 圓環圖
-                    fig = create_donut_chart(ai_percentage)
-                    st.plotly_chart(fig, use_container_width=True, key="donut_chart")
-                
-                with col3:
-                    # 空白或其他內容
-                    st.markdown('<div style="height: 100%;"></div>', unsafe_allow_html=True)
-            
-            # 詳細分析區
-            st.markdown("---")
-            
-            # 注入CSS來樣式化columns
-            st.markdown('''
-            <style>
-            /* Target the columns that contain analysis sections */
-            .row-widget.stHorizontalBlock > [data-testid="column"]:nth-child(1) > div:first-child {
-                background: #f5f5f5 !important;
-                border: 1px solid #e0e0e0 !important;
-                border-radius: 20px !important;
-                padding: 1.8rem !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.05) !important;
-            }
-            
-            .row-widget.stHorizontalBlock > [data-testid="column"]:nth-child(2) > div:first-child {
-                background: #f5f5f5 !important;
-                border: 1px solid #e0e0e0 !important;
-                border-radius: 20px !important;
-                padding: 1.8rem !important;
-                box-shadow: 0 2px 8px rgba(0, 0, 0, 0.05) !important;
-            }
-            
-            /* Style section headers */
-            .analysis-header, .section-header {
-                color: #1a1a1a;
-                padding-bottom: 1rem;
-                border-bottom: 2px solid rgba(253, 55, 59, 0.1);
-                margin-bottom: 1.5rem;
-                font-size: 1.5rem;
-                font-weight: bold;
-            }
-            
-            .section-header {
-                margin-top: 2rem;
-            }
-            </style>
-            ''', unsafe_allow_html=True)
-            
-            col1, col2 = st.columns([1, 1], gap="large")
-            
-            with col1:
-                st.markdown('<div class="analysis-header">📊 Text Analysis Breakdown</div>', unsafe_allow_html=True)
-                
-                if segments and segment_scores:
-                    # 統計資料
-                    stats = {
-                        "Total Words": len(text.split()),
-                        "AI Segments": sum(1 for s in segment_scores if s > 0.5),
-                        "Human Segments": sum(1 for s in segment_scores if s <= 0.5),
-                        "Avg AI Score": f"{np.mean(segment_scores)*100:.1f}%"
-                    }
-                    
-                    cols = st.columns(4)
-                    for i, (label, value) in enumerate(stats.items()):
-                        with cols[i]:
-                            st.metric(label, value)
-                    
-                    # 分段分析圖表
-                    fig_segments = create_analysis_chart(segments[:10], segment_scores[:10])
-                    st.plotly_chart(fig_segments, use_container_width=True)
-            
-            with col2:
-                st.markdown('<div class="analysis-header">🎯 Content Classification</div>', unsafe_allow_html=True)
-                
-                # Calculate real percentages based on segment analysis
-                if segments and segment_scores:
-                    # Count segments in each category based on their scores
-                    identical_segments = sum(1 for s in segment_scores if s > 0.8)
-                    minor_segments = sum(1 for s in segment_scores if 0.6 < s <= 0.8)
-                    paraphrased_segments = sum(1 for s in segment_scores if 0.4 < s <= 0.6)
-                    unique_segments = sum(1 for s in segment_scores if s <= 0.4)
-                    
-                    total_segments = len(segment_scores)
-                    if total_segments > 0:
-                        identical_pct = round((identical_segments / total_segments) * 100)
-                        minor_pct = round((minor_segments / total_segments) * 100)
-                        paraphrased_pct = round((paraphrased_segments / total_segments) * 100)
-                        unique_pct = round((unique_segments / total_segments) * 100)
-                        
-                        # Ensure percentages add up to 100%
-                        total = identical_pct + minor_pct + paraphrased_pct + unique_pct
-                        if total != 100:
-                            diff = 100 - total
-                            unique_pct += diff
-                    else:
-                        # Fallback if no segments
-                        identical_pct = 0
-                        minor_pct = 0
-                        paraphrased_pct = 0
-                        unique_pct = 100
-                else:
-                    # If no segment analysis, estimate based on overall score
-                    if ai_percentage > 80:
-                        identical_pct = int(ai_percentage - 20)
-                        minor_pct = 20
-                        paraphrased_pct = 10
-                        unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
-                    elif ai_percentage > 60:
-                        identical_pct = 10
-                        minor_pct = int(ai_percentage - 30)
-                        paraphrased_pct = 20
-                        unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
-                    elif ai_percentage > 40:
-                        identical_pct = 5
-                        minor_pct = 15
-                        paraphrased_pct = int(ai_percentage - 10)
-                        unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
-                    else:
-                        identical_pct = 0
-                        minor_pct = 5
-                        paraphrased_pct = int(ai_percentage)
-                        unique_pct = 100 - identical_pct - minor_pct - paraphrased_pct
-                
-                # Create donut chart for classification with controlled container
-                labels = ['Identical', 'Minor changes', 'Paraphrased', 'Unique text']
-                values = [identical_pct, minor_pct, paraphrased_pct, unique_pct]
-                colors = ['#e74c3c', '#f39c12', '#3498db', '#2ecc71']
-                
-                fig_class = go.Figure(data=[go.Pie(
-                    labels=labels,
-                    values=values,
-                    hole=.65,
-                    marker=dict(
-                        colors=colors,
-                        line=dict(color='#ffffff', width=2)
-                    ),
-                    textinfo='none',
-                    hovertemplate='<b>%{label}</b><br>%{value}%<extra></extra>'
-                )])
-                
-                fig_class.update_layout(
-                    showlegend=False,
-                    paper_bgcolor='rgba(245,245,245,0)',
-                    plot_bgcolor='rgba(245,245,245,0)',
-                    margin=dict(t=0, b=0, l=0, r=0),
-                    height=200,
-                    annotations=[dict(
-                        text=f'{ai_percentage:.0f}%',
-                        x=0.5, y=0.55,
-                        font_size=32,
-                        font=dict(color='#1a1a1a', weight=700),
-                        showarrow=False
-                    ), dict(
-                        text='AI Generated Text',
-                        x=0.5, y=0.42,
-                        font_size=12,
-                        font=dict(color='#666'),
-                        showarrow=False
-                    )]
-                )
-                
-                # Use empty container to control plotly chart styling
-                with st.empty():
-                    st.plotly_chart(fig_class, use_container_width=True, key="class_donut")
-                
-                # Legend with colored dots
-                st.markdown(f'''
-                <div class="classification-legend">
-                    <div class="legend-item">
-                        <span class="legend-dot" style="background: #e74c3c;"></span>
-                        <span class="legend-text"><strong>{identical_pct}%</strong> Identical</span>
-                    </div>
-                    <div class="legend-item">
-                        <span class="legend-dot" style="background: #f39c12;"></span>
-                        <span class="legend-text"><strong>{minor_pct}%</strong> Minor changes</span>
-                    </div>
-                    <div class="legend-item">
-                        <span class="legend-dot" style="background: #3498db;"></span>
-                        <span class="legend-text"><strong>{paraphrased_pct}%</strong> Paraphrased</span>
-                    </div>
-                    <div class="legend-item">
-                        <span class="legend-dot" style="background: #2ecc71;"></span>
-                        <span class="legend-text"><strong>{unique_pct}%</strong> Unique text</span>
-                    </div>
-                </div>
-                ''', unsafe_allow_html=True)
-                
-                # Detection Result moved here (below legend)
-                st.markdown(f'''
-                <div style="text-align: center; margin-top: 1.5rem; padding: 1rem; background: #f8f8f8; border-radius: 10px;">
-                    <div class="metric-label">Detection Result</div>
-                    <div class="metric-value {'ai-detected' if ai_percentage > 50 else 'human-detected'}" style="font-size: 1.8rem;">
-                        {'🤖 AI Generated' if ai_percentage > 50 else '✍️ Human Written'}
-                    </div>
-                </div>
-                ''', unsafe_allow_html=True)
-            
-            # 關閉 result-container
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            # 標註文字展示（預設展開）
-            st.markdown('<div class="section-header">📝 View Highlighted Text</div>', unsafe_allow_html=True)
-            if segments and segment_scores:
-                highlighted = highlight_text(text, segments, segment_scores)
-                st.markdown(f'<div class="highlighted-text">{highlighted}</div>', unsafe_allow_html=True)
-            else:
-                st.text(text)
-            
-            # 建議 - 移到最下面
-            st.markdown('<div class="section-header">💡 Recommendations</div>', unsafe_allow_html=True)
-            if ai_percentage > 70:
-                st.warning("⚠️ High AI content detected. Consider rewriting for authenticity.")
-            elif ai_percentage > 40:
-                st.info("ℹ️ Moderate AI content. Some sections may need revision.")
-            else:
-                st.success("✅ Content appears to be primarily human-written.")
+            render_report(report, scroll=True)
+            if METRICS_DEBUG or st.query_params.get("debug") == "1":
+                render_debug_panel(METRICS.current_trace())
         
         except Exception as e:
             loading_placeholder.empty()
             st.error(f"Error during analysis: {str(e)}")
             st.stop()
+        finally:
+            METRICS.finish_trace()
+    
+    elif job_report is not None:
+        render_report(job_report, scroll=st.session_state.pop("scroll_to_report", False))
+    
+    elif report is not None:
+        # 其他互動造成的重新執行（或再次點擊 DETECT）：直接重繪保存的報告
+        render_report(report, scroll=analyze_button)
     
     elif analyze_button and not text:
         st.warning("⚠️ Please enter text to analyze!")
     
+    # 大型檔案或多個檔案：背景分析
+    render_upload_section(settings)
+    
     # Footer
     st.markdown("---")
     st.markdown(
@@ -0,0 +1,238 @@
+"""CPU 執行參數自動調校：torch 執行緒數、批次大小與 token 視窗長度
+
+- sweep()：以已載入的模型推論合成視窗做短暫量測，在每批延遲不超過目標的設定中選出吞吐量最高者
+- 結果依主機（主機名稱與可用核心數）、模型與後端存進本機 JSON 設定檔，之後啟動時直接套用
+- apply_profile()：設定 torch 執行緒數；批次大小由呼叫端帶入
+
+預設只調校不影響分數的設定（執行緒數、批次大小）。視窗長度會改變每個視窗的內容，因此改變分數，
+只有以 --window-tokens 指定多個長度時才會量測，且呼叫端須明確要求才會套用（profile_settings(window=True)）。
+不同視窗長度每個視窗涵蓋的文字量不同，因此以每秒 token 數比較（同一視窗長度下即等同每秒視窗數）。
+ONNX 後端的執行緒數在建立 session 時決定，只調校批次大小（與指定的視窗長度）。
+
+用法：
+    python autotune.py --model ./local-model
+    python autotune.py --model ./local-model --backend int8 --latency-ms 250
+    python autotune.py --model ./local-model --window-tokens 128 256    # 也比較視窗長度（套用後分數會改變）
+    python autotune.py --model ./local-model --show
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+
+from backends import BACKENDS
+from detector import BATCH_SIZE, MODEL_NAME, WINDOW_TOKENS, classify_ids
+from metrics import METRICS
+from startup import WARMUP_TEXT, model_source
+
+PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ai-text-detector", "autotune.json")
+# 每批（一次前向傳遞）延遲的上限：互動使用時一批視窗的等待時間
+LATENCY_TARGET_MS = 500
+BATCH_CHOICES = (1, 4, 8, 16, 32, 64)
+# 預設不調整視窗長度（改變視窗長度會改變分數）
+WINDOW_CHOICES = (WINDOW_TOKENS,)
+# 執行緒數只對 PyTorch 後端有效
+THREADED_BACKENDS = ("pytorch", "int8")
+# 每個設定至少量測的次數與時間
+MIN_REPEATS = 3
+MIN_SECONDS = 0.3
+
+
+def available_cpus():
+    """本行程可使用的核心數（考慮 CPU affinity）"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def thread_choices(cpus=None):
+    """1、2、4…直到可用核心數，並包含核心數本身"""
+    cpus = cpus or available_cpus()
+    choices = {cpus}
+    threads = 1
+    while threads < cpus:
+        choices.add(threads)
+        threads *= 2
+    return sorted(choices)
+
+
+def host_key(model_name, backend, cpus=None):
+    return f"{socket.gethostname()}/{cpus or available_cpus()}cpu/{model_name}/{backend}"
+
+
+def get_threads():
+    import torch
+
+    return torch.get_num_threads()
+
+
+def set_threads(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+
+
+def sample_ids(tokenizer, length):
+    """長度為 length 個 token 的合成視窗（不含特殊 token）"""
+    sample = tokenizer(WARMUP_TEXT, add_special_tokens=False)["input_ids"]
+    return (sample * (length // len(sample) + 1))[:length]
+
+
+def measure(clf, tokenizer, batch_size, window_tokens, min_repeats=MIN_REPEATS, min_seconds=MIN_SECONDS):
+    """一批 batch_size 個、各 window_tokens 個 token 的視窗，回傳每批耗時的中位數（秒）"""
+    batch = [sample_ids(tokenizer, window_tokens)] * batch_size
+    classify_ids(clf, tokenizer, batch)  # 新的形狀先推論一次
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_repeats or time.perf_counter() - started < min_seconds:
+        start = time.perf_counter()
+        classify_ids(clf, tokenizer, batch)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def sweep(clf, tokenizer, latency_ms=LATENCY_TARGET_MS, threads=None, batch_sizes=BATCH_CHOICES,
+          window_choices=WINDOW_CHOICES, min_seconds=MIN_SECONDS, log=None):
+    """量測各設定，回傳 (最佳設定, 全部量測結果)
+
+    先以預設批次大小與視窗長度比較各執行緒數；再以最快的執行緒數，對每個視窗長度
+    由小到大增加批次大小，延遲超過目標後不再加大。threads 為 None 時不調整執行緒數。
+    """
+    results = []
+
+    def run(n_threads, batch_size, window_tokens):
+        if n_threads:
+            set_threads(n_threads)
+        seconds = measure(clf, tokenizer, batch_size, window_tokens, min_seconds=min_seconds)
+        result = {"threads": n_threads, "batch_size": batch_size, "window_tokens": window_tokens,
+                  "latency_ms": seconds * 1000, "segments_per_second": batch_size / seconds,
+                  "tokens_per_second": batch_size * window_tokens / seconds}
+        results.append(result)
+        if log:
+            log(result)
+        return result
+
+    original_threads = get_threads() if threads else None
+    try:
+        best_threads = threads[0] if threads else None
+        if threads and len(threads) > 1:
+            best_threads = max((run(n, BATCH_SIZE, WINDOW_TOKENS) for n in threads),
+                               key=lambda r: r["tokens_per_second"])["threads"]
+        for window_tokens in window_choices:
+            for batch_size in sorted(batch_sizes):
+                if run(best_threads, batch_size, window_tokens)["latency_ms"] > latency_ms:
+                    break
+    finally:
+        if original_threads:
+            set_threads(original_threads)
+
+    within = [r for r in results if r["latency_ms"] <= latency_ms]
+    # 沒有設定達到延遲目標時選延遲最低的
+    best = max(within, key=lambda r: r["tokens_per_second"]) if within else min(results, key=lambda r: r["latency_ms"])
+    return best, results
+
+
+def load_profiles(path=PROFILE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_profile(model_name, backend, path=PROFILE_PATH):
+    """本主機、模型與後端的設定檔；沒有調校過時回傳 None"""
+    return load_profiles(path).get(host_key(model_name, backend))
+
+
+def save_profile(profile, path=PROFILE_PATH):
+    """寫入設定檔（保留其他主機與模型的項目）；先寫暫存檔再取代，避免中斷時留下半個檔案"""
+    profiles = load_profiles(path)
+    profiles[profile["key"]] = profile
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def tune(clf, tokenizer, model_name, backend, latency_ms=LATENCY_TARGET_MS, path=PROFILE_PATH, log=None, **kwargs):
+    """執行 sweep 並存成本主機的設定檔，回傳設定檔"""
+    threads = thread_choices() if backend in THREADED_BACKENDS else None
+    with METRICS.span("autotune"):
+        best, results = sweep(clf, tokenizer, latency_ms, threads, log=log, **kwargs)
+    profile = dict(best, key=host_key(model_name, backend), host=socket.gethostname(), cpus=available_cpus(),
+                   model=model_name, backend=backend, latency_target_ms=latency_ms,
+                   tuned_at=time.strftime("%Y-%m-%dT%H:%M:%S"), results=results)
+    save_profile(profile, path)
+    return profile
+
+
+def apply_profile(profile):
+    """套用設定檔中的執行緒數"""
+    if profile and profile.get("threads"):
+        set_threads(profile["threads"])
+    return profile
+
+
+def autotune_model(clf, tokenizer, model_name, backend, retune=False, latency_ms=LATENCY_TARGET_MS, path=PROFILE_PATH):
+    """套用已存的設定檔；沒有（或 retune）時先調校，回傳設定檔"""
+    profile = None if retune else load_profile(model_name, backend, path)
+    if profile is None:
+        profile = tune(clf, tokenizer, model_name, backend, latency_ms, path)
+    return apply_profile(profile)
+
+
+def profile_settings(profile, window=False):
+    """設定檔對應的分析參數（token 視窗長度，重疊一半）
+
+    視窗長度會改變分數，只有 window 為 True 時才帶入；沒有設定檔或 window 為 False 時為空。
+    """
+    if not profile or not window:
+        return {}
+    return {"window_tokens": profile["window_tokens"], "stride": profile["window_tokens"] // 2}
+
+
+def print_result(result, file=sys.stdout):
+    threads = result["threads"] or "-"
+    print(f"{threads:>7} {result['batch_size']:>5} {result['window_tokens']:>6} {result['latency_ms']:>9.1f}"
+          f" {result['segments_per_second']:>9.1f} {result['tokens_per_second']:>9.0f}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=model_source(MODEL_NAME), help="model name or local model directory")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch")
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_TARGET_MS, help="max latency of one batch")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BATCH_CHOICES))
+    parser.add_argument("--window-tokens", type=int, nargs="+", default=list(WINDOW_CHOICES),
+                        help="window lengths to compare (other lengths change scores and are only applied on request)")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="measuring time per setting")
+    parser.add_argument("--profile", default=PROFILE_PATH, help="profile JSON file")
+    parser.add_argument("--show", action="store_true", help="print the saved profile for this host instead of tuning")
+    args = parser.parse_args(argv)
+
+    if args.show:
+        profile = load_profile(args.model, args.backend, args.profile)
+        if profile is None:
+            sys.exit(f"No profile for {host_key(args.model, args.backend)} in {args.profile}")
+        print(json.dumps({k: v for k, v in profile.items() if k != "results"}, indent=2))
+        return
+
+    from detector import load_model
+
+    clf, tokenizer = load_model(args.model, args.backend)
+    print(f"Tuning {args.model} ({args.backend}) on {available_cpus()} CPUs,"
+          f" latency target {args.latency_ms:.0f} ms per batch")
+    print(f"{'threads':>7} {'batch':>5} {'window':>6} {'batch ms':>9} {'windows/s':>9} {'tokens/s':>9}")
+    profile = tune(clf, tokenizer, args.model, args.backend, args.latency_ms, args.profile, log=print_result,
+                   batch_sizes=args.batch_sizes, window_choices=args.window_tokens, min_seconds=args.min_seconds)
+    print("Chosen:")
+    print_result(profile)
+    print(f"Saved to {args.profile} as {profile['key']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""CPU 推論後端：PyTorch、PyTorch 動態 int8 量化、ONNX Runtime
+
+每個後端都提供相同的批次分類介面：
+- classify(texts)：文字列表 -> AI 機率列表
+- classify_ids(id_lists)：已 tokenize（不含特殊 token）的視窗 -> AI 機率列表
+- __call__(inputs, ...)：與 transformers pipeline 相同的呼叫方式，可直接取代 clf
+"""
+import hashlib
+import os
+
+BACKENDS = ("pytorch", "int8", "onnx")
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai-text-detector", "onnx")
+
+
+class Backend:
+    """共用的前處理與輸出格式；子類別只需實作 _forward"""
+
+    name = None
+
+    def __init__(self, tokenizer, ai_index=1, max_length=512):
+        self.tokenizer = tokenizer
+        self.ai_index = ai_index
+        self.max_length = max_length
+
+    def _forward(self, input_ids, attention_mask):
+        """輸入 numpy int64 陣列，回傳 AI 機率列表"""
+        raise NotImplementedError
+
+    def classify(self, texts):
+        if not texts:
+            return []
+        batch = self.tokenizer(list(texts), truncation=True, max_length=self.max_length,
+                               padding=True, return_tensors="np")
+        return self._forward(batch["input_ids"].astype("int64"), batch["attention_mask"].astype("int64"))
+
+    def classify_ids(self, id_lists):
+        from detector import add_special_tokens
+
+        if not id_lists:
+            return []
+        features = [{"input_ids": add_special_tokens(self.tokenizer, ids)} for ids in id_lists]
+        batch = self.tokenizer.pad(features, return_tensors="np")
+        return self._forward(batch["input_ids"].astype("int64"), batch["attention_mask"].astype("int64"))
+
+    def __call__(self, inputs, truncation=True, max_length=None, batch_size=None, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        batch_size = batch_size or len(texts) or 1
+        scores = []
+        for start in range(0, len(texts), batch_size):
+            scores.extend(self.classify(texts[start:start+batch_size]))
+        return [{"label": "LABEL_1", "score": score} for score in scores]
+
+
+class TorchBackend(Backend):
+    """PyTorch fp32；quantize=True 時對 Linear 層做動態 int8 量化"""
+
+    def __init__(self, model, tokenizer, quantize=False):
+        import torch
+        from detector import ai_label_index
+
+        super().__init__(tokenizer, ai_label_index(model))
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.name = "int8" if quantize else "pytorch"
+        self.model = model
+
+    def _forward(self, input_ids, attention_mask):
+        import torch
+
+        with torch.inference_mode():
+            logits = self.model(input_ids=torch.from_numpy(input_ids),
+                                attention_mask=torch.from_numpy(attention_mask)).logits
+        return logits.softmax(dim=-1)[:, self.ai_index].tolist()
+
+
+class OnnxBackend(Backend):
+    """ONNX Runtime（啟用全部圖最佳化）"""
+
+    name = "onnx"
+
+    def __init__(self, onnx_path, tokenizer, ai_index=1, intra_op_threads=0):
+        import onnxruntime as ort
+
+        super().__init__(tokenizer, ai_index)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def _forward(self, input_ids, attention_mask):
+        import numpy as np
+
+        logits = self.session.run(["logits"], {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(logits) / np.exp(logits).sum(axis=-1, keepdims=True)
+        return probs[:, self.ai_index].tolist()
+
+
+def export_onnx(model, tokenizer, onnx_path):
+    """將分類模型匯出為 ONNX（batch 與序列長度為動態維度）
+
+    先寫到暫存檔再取代，匯出中斷或多個行程同時匯出時不會留下不完整的快取檔案。
+    torch.onnx.export 需要 onnx 套件（選用相依套件，不在 requirements.txt 中）。
+    """
+    import torch
+
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    sample = tokenizer(["export sample text"] * 2, return_tensors="pt", padding=True)
+    model.eval()
+    tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"]),
+        tmp_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=17,
+        dynamo=False,
+    )
+    os.replace(tmp_path, onnx_path)
+    return onnx_path
+
+
+def weights_fingerprint(model_name):
+    """模型權重的指紋：權重檔的名稱、大小與修改時間（Hub 模型的快照路徑含 commit，換版本時也會改變）"""
+    if os.path.isdir(model_name):
+        model_dir = model_name
+    else:
+        from transformers.utils import cached_file
+
+        model_dir = os.path.dirname(cached_file(model_name, "config.json"))
+    digest = hashlib.sha1(os.path.abspath(model_dir).encode())
+    for name in sorted(os.listdir(model_dir)):
+        if name.endswith((".safetensors", ".bin", ".json")):
+            info = os.stat(os.path.join(model_dir, name))
+            digest.update(f"{name}:{info.st_size}:{info.st_mtime_ns}".encode())
+    return digest.hexdigest()[:16]
+
+
+def load_backend(name, model_name, cache_dir=ONNX_CACHE_DIR):
+    """載入指定後端，回傳 (backend, tokenizer)"""
+    from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+    from detector import ai_label_index
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name!r} (expected one of {BACKENDS})")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if name == "onnx":
+        # 第一次使用時匯出並快取 ONNX 檔案；權重更新後指紋不同，會重新匯出
+        onnx_path = os.path.join(cache_dir, model_name.strip("/").replace("/", "--"), weights_fingerprint(model_name),
+                                 "model.onnx")
+        if not os.path.exists(onnx_path):
+            export_onnx(AutoModelForSequenceClassification.from_pretrained(model_name), tokenizer, onnx_path)
+        config = AutoConfig.from_pretrained(model_name)
+        return OnnxBackend(onnx_path, tokenizer, ai_label_index(config)), tokenizer
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    return TorchBackend(model, tokenizer, quantize=(name == "int8")), tokenizer
@@ -0,0 +1,256 @@
+"""不需瀏覽器的批次評分工具
+
+讀取 JSONL（每行一個 {"id": ..., "text": ...}）或一個包含 .txt/.md 的資料夾，
+以多執行緒分析，並逐筆寫出 JSONL 或 CSV。輸出檔同時作為檢查點：
+重新執行時會跳過輸出中已有的 id，並先移除失敗的紀錄再重試，每個 id 只會有一筆紀錄。
+
+用法：
+    python batch_score.py submissions.jsonl -o scores.jsonl
+    python batch_score.py essays/ -o scores.csv --workers 4 --segments
+    python batch_score.py submissions.jsonl -o scores.jsonl --processes 4
+    python batch_score.py books/ -o scores.jsonl --stream    # 超大檔案逐塊讀取，記憶體用量固定
+    python batch_score.py submissions.jsonl -o scores.jsonl --cascade cascade.json    # 先以前置模型判定
+    python batch_score.py submissions.jsonl -o scores.jsonl --autotune    # 使用（或先建立）本主機的調校設定檔
+    python batch_score.py submissions.jsonl -o scores.jsonl --autotune --autotune-window    # 連同視窗長度（分數會改變）
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from detector import AGGREGATIONS, MODEL_NAME, MODES, analyze_document, load_model
+from backends import BACKENDS
+from streaming import STREAM_MODES, iter_file_chunks, iter_string_chunks, stream_document
+
+TEXT_SUFFIXES = (".txt", ".md")
+CSV_FIELDS = ["id", "overall_score", "label", "n_segments", "error"]
+
+
+# 讀取輸入
+def iter_documents(path, id_field="id", text_field="text", stream=False):
+    """逐筆產出 (id, 文字)，不會一次把整個語料讀進記憶體；stream 時資料夾中的檔案改為逐塊讀取的產生器"""
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(TEXT_SUFFIXES):
+                    file_path = os.path.join(root, name)
+                    if stream:
+                        yield os.path.relpath(file_path, path), iter_file_chunks(file_path)
+                        continue
+                    with open(file_path, encoding="utf-8", errors="replace") as f:
+                        yield os.path.relpath(file_path, path), f.read()
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield str(record.get(id_field, line_number)), record[text_field]
+
+
+def compact_output(output_path):
+    """續跑前整理既有的輸出檔（檢查點），回傳已完成的 id
+
+    失敗的紀錄會重試，因此與中斷時寫到一半的行一起移除，同一個 id 只保留第一筆成功的紀錄，
+    續跑後每個 id 在輸出檔中只出現一次。需要整理時先寫暫存檔再取代，避免中斷時留下半個檔案。
+    """
+    if not os.path.exists(output_path):
+        return set()
+    is_csv = output_path.endswith(".csv")
+    with open(output_path, encoding="utf-8", newline="") as f:
+        if is_csv:
+            # 寫到一半的列缺少後面的欄位（值為 None）
+            rows = [(row, None if None in row.values() else row) for row in csv.DictReader(f)]
+        else:
+            rows = []
+            for line in f:
+                try:
+                    rows.append((line, json.loads(line)))
+                except ValueError:
+                    rows.append((line, None))
+    done, kept = set(), []
+    for raw, record in rows:
+        if record is not None and not record.get("error") and record["id"] not in done:
+            done.add(record["id"])
+            kept.append(raw)
+    if len(kept) == len(rows) and (is_csv or all(raw.endswith("\n") for raw in kept)):
+        return done
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        if is_csv:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(kept)
+        else:
+            f.writelines(raw if raw.endswith("\n") else raw + "\n" for raw in kept)
+    os.replace(tmp_path, output_path)
+    return done
+
+
+# 評分
+def score_document(doc_id, text, clf, tokenizer, include_segments=False, stream=False, **settings):
+    """分析單一文件，回傳一筆可寫出的結果；stream 時 text 可為文字片段的產生器"""
+    try:
+        if stream:
+            chunks = iter_string_chunks(text) if isinstance(text, str) else text
+            analysis = stream_document(chunks, clf, tokenizer, **settings)
+            analysis["spans"] = zip(analysis["starts"], analysis["ends"])
+        else:
+            analysis = analyze_document(text, clf, tokenizer, **settings)
+    except Exception as e:
+        return {"id": doc_id, "error": f"{type(e).__name__}: {e}"}
+
+    record = {
+        "id": doc_id,
+        "overall_score": round(analysis["overall_score"], 6),
+        "label": "AI" if analysis["overall_score"] > 0.5 else "Human",
+        "n_segments": len(analysis["scores"]),
+    }
+    if include_segments:
+        record["segments"] = [
+            {"start": start, "end": end, "score": round(score, 6)}
+            for (start, end), score in zip(analysis["spans"], analysis["scores"])
+        ]
+    return record
+
+
+def score_documents(documents, clf, tokenizer, workers=1, include_segments=False, **settings):
+    """以執行緒池分析文件，依輸入順序逐筆產出結果；同時進行中的文件數有上限"""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for doc_id, text in documents:
+            pending.append(pool.submit(score_document, doc_id, text, clf, tokenizer, include_segments, **settings))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+# 寫出結果
+class ResultWriter:
+    """逐筆附加寫出 JSONL 或 CSV，每筆都 flush，隨時中斷都能續跑"""
+
+    def __init__(self, output_path):
+        self.is_csv = output_path.endswith(".csv")
+        new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self._file = open(output_path, "a", encoding="utf-8", newline="")
+        if not new_file and not self._ends_with_newline(output_path):
+            self._file.write("\n")  # 上次中斷時寫到一半的行，另起新行
+        if self.is_csv:
+            self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if new_file:
+                self._writer.writeheader()
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def write(self, record):
+        if self.is_csv:
+            self._writer.writerow(record)
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score documents for AI-generated content without the web UI.")
+    parser.add_argument("input", help="JSONL file or directory of .txt/.md files")
+    parser.add_argument("-o", "--output", required=True, help="output .jsonl or .csv (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes sharing memory-mapped weights (pytorch backend only)")
+    parser.add_argument("--threads-per-worker", type=int, help="torch threads per process (default: cores / processes)")
+    parser.add_argument("--model", default=MODEL_NAME, help="model name or local model directory")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch")
+    parser.add_argument("--mode", choices=MODES, default="sentences")
+    parser.add_argument("--aggregation", choices=AGGREGATIONS, default="length_weighted")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--budget", type=int, help="max inferences per document in adaptive mode")
+    parser.add_argument("--stream", action="store_true",
+                        help="read and score each document block by block with bounded memory (not adaptive mode)")
+    parser.add_argument("--cascade", help="cascade prefilter JSON from cascade.py train")
+    parser.add_argument("--cascade-low", type=float, help="override the prefilter's 'human' threshold")
+    parser.add_argument("--cascade-high", type=float, help="override the prefilter's 'AI' threshold")
+    parser.add_argument("--autotune", action="store_true",
+                        help="use this host's tuned threads and batch size (tuning first if needed)")
+    parser.add_argument("--autotune-window", action="store_true",
+                        help="with --autotune, also use the profile's window length (changes scores)")
+    parser.add_argument("--segments", action="store_true", help="include per-segment spans and scores (JSONL only)")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--text-field", default="text")
+    args = parser.parse_args(argv)
+
+    if args.stream and args.mode not in STREAM_MODES:
+        parser.error(f"--stream supports --mode {', '.join(STREAM_MODES)}")
+    if args.stream and args.processes > 1:
+        parser.error("--stream cannot be combined with --processes")
+    if args.cascade and args.processes > 1:
+        parser.error("--cascade cannot be combined with --processes")
+    if args.autotune_window and not args.autotune:
+        parser.error("--autotune-window requires --autotune")
+    if args.autotune and args.processes > 1:
+        parser.error("--autotune cannot be combined with --processes")
+
+    done = compact_output(args.output)
+    if done:
+        print(f"Resuming: {len(done)} documents already scored", file=sys.stderr)
+    documents = (
+        (doc_id, text)
+        for doc_id, text in iter_documents(args.input, args.id_field, args.text_field, args.stream)
+        if doc_id not in done
+    )
+
+    settings = {"mode": args.mode, "aggregation": args.aggregation, "batch_size": args.batch_size}
+    if args.stream:
+        settings["stream"] = True
+    else:
+        settings["budget"] = args.budget
+    if args.processes > 1:
+        if args.backend != "pytorch":
+            parser.error("--processes requires --backend pytorch")
+        from worker_pool import score_documents_parallel
+        records = score_documents_parallel(documents, args.model, args.processes, args.threads_per_worker,
+                                           args.segments, **settings)
+    else:
+        from cascade import cascade_classifier
+
+        clf, tokenizer = load_model(args.model, args.backend)
+        if args.autotune:
+            from autotune import autotune_model, profile_settings
+
+            profile = autotune_model(clf, tokenizer, args.model, args.backend)
+            settings["batch_size"] = profile["batch_size"]
+            # 前置模型的門檻依訓練時的視窗長度而定，使用前置模型時不改變視窗長度
+            if not args.cascade:
+                settings.update(profile_settings(profile, args.autotune_window))
+        clf = cascade_classifier(clf, tokenizer, args.cascade, args.cascade_low, args.cascade_high, args.mode)
+        records = score_documents(documents, clf, tokenizer, args.workers, args.segments, **settings)
+
+    writer = ResultWriter(args.output)
+    scored = failed = 0
+    try:
+        for record in records:
+            writer.write(record)
+            if record.get("error"):
+                failed += 1
+                print(f"{record['id']}: {record['error']}", file=sys.stderr)
+            else:
+                scored += 1
+    finally:
+        writer.close()
+        print(f"Scored {scored} documents ({failed} failed) -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
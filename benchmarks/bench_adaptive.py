@@ -0,0 +1,98 @@
+"""比較固定 token 視窗與自適應細分所需的推論次數，以及找到混合作者邊界的準確度
+
+替身分類器依「AI 詞彙」所佔比例給分，因此人類段落、AI 段落與兩者交界的分數都可預期。
+最後檢查不同 budget 下的推論次數不超過 max(budget, 初始區塊數)，超過時以結束碼 1 結束。
+
+用法：
+    python -m benchmarks.bench_adaptive
+    python -m benchmarks.bench_adaptive --words 2000 20000 --budget 40
+"""
+import argparse
+import math
+import sys
+
+import numpy as np
+
+from detector import ADAPTIVE_BLOCK_TOKENS, analyze_document
+from benchmarks.stub_model import StubTokenizer, make_text, token_id
+
+AI_VOCAB = ("furthermore delve crucial landscape leverage moreover tapestry "
+            "comprehensive pivotal intricate navigate realm foster seamless").split()
+AI_IDS = {token_id(w) for w in AI_VOCAB} | {token_id(w + ".") for w in AI_VOCAB}
+
+
+def make_ai_text(n_words, seed=0):
+    rng = np.random.default_rng(seed)
+    words = rng.choice(AI_VOCAB, size=n_words)
+    return ' '.join(' '.join(words[i:i+12]) + '.' for i in range(0, n_words, 12))
+
+
+class MarkerClassifier:
+    """AI 機率由視窗中 AI 詞彙的比例決定，並記錄推論的視窗數"""
+
+    def __init__(self):
+        self.windows_scored = 0
+
+    def classify_ids(self, id_lists):
+        self.windows_scored += len(id_lists)
+        fractions = [sum(i in AI_IDS for i in ids) / max(len(ids), 1) for ids in id_lists]
+        return [1 / (1 + math.exp(-12 * (f - 0.5))) for f in fractions]
+
+
+def boundary_error(analysis, boundary):
+    """分數跨過 0.5 的相鄰視窗交界與真實邊界的字元距離（找不到時為 None）"""
+    crossings = [
+        analysis["spans"][k][1]
+        for k in range(len(analysis["scores"]) - 1)
+        if (analysis["scores"][k] > 0.5) != (analysis["scores"][k+1] > 0.5)
+    ]
+    return min((abs(c - boundary) for c in crossings), default=None)
+
+
+def check_budget(text, tokenizer, budgets):
+    """adaptive 模式的推論次數不可超過 max(budget, 初始區塊數)；回傳是否全部符合"""
+    n_blocks = -(-len(tokenizer(text)["input_ids"]) // ADAPTIVE_BLOCK_TOKENS)
+    ok = True
+    for budget in budgets:
+        clf = MarkerClassifier()
+        analyze_document(text, clf, tokenizer, mode="adaptive", budget=budget)
+        limit = max(budget, n_blocks)
+        ok &= clf.windows_scored <= limit
+        print(f"{budget:>7} {n_blocks:>7} {clf.windows_scored:>8} {limit:>6}"
+              f" {'ok' if clf.windows_scored <= limit else 'OVER BUDGET':>11}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--budget", type=int, help="inference budget for adaptive mode (default: fixed-mode count)")
+    args = parser.parse_args()
+
+    tokenizer = StubTokenizer()
+    print(f"{'words':>7} {'document':>9} {'mode':>9} {'windows':>8} {'score':>6} {'boundary err':>13}")
+    for n_words in args.words:
+        human = make_text(n_words, seed=n_words)
+        ai = make_ai_text(n_words, seed=n_words)
+        # 前 60% 人類、後 40% AI 的混合文件
+        head = ' '.join(human.split()[:n_words * 6 // 10])
+        mixed = head + ' ' + ' '.join(ai.split()[:n_words * 4 // 10])
+        for name, text, boundary in (("human", human, None), ("ai", ai, None), ("mixed", mixed, len(head))):
+            for mode in ("tokens", "adaptive"):
+                clf = MarkerClassifier()
+                analysis = analyze_document(text, clf, tokenizer, mode=mode, budget=args.budget)
+                error = boundary_error(analysis, boundary) if boundary is not None else None
+                print(f"{n_words:>7} {name:>9} {mode:>9} {clf.windows_scored:>8} {analysis['overall_score']:>6.2f}"
+                      f" {'-' if error is None else str(error) + ' chars':>13}")
+
+    # 以最小的混合文件檢查 budget 上限（包含比初始區塊數還小的 budget）
+    n_words = min(args.words)
+    head = ' '.join(make_text(n_words, seed=n_words).split()[:n_words * 6 // 10])
+    mixed = head + ' ' + ' '.join(make_ai_text(n_words, seed=n_words).split()[:n_words * 4 // 10])
+    print(f"\n{'budget':>7} {'blocks':>7} {'windows':>8} {'limit':>6} {'':>11}")
+    if not check_budget(mixed, tokenizer, [1, 2, 5, 10, 20, 40] + ([args.budget] if args.budget else [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
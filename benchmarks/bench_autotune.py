@@ -0,0 +1,73 @@
+"""執行參數自動調校：調校本身的耗時，以及預設設定與調校後設定的端到端吞吐量
+
+先以 autotune.sweep 量測並選出設定（存到暫存設定檔，不影響本機的設定檔），再分別以
+預設設定（torch 預設執行緒數、BATCH_SIZE、WINDOW_TOKENS）與調校後的設定分析同一批文件。
+替身模型不使用 torch，執行緒數沒有影響；實際效果請以 --model 指定真正的模型量測。
+
+用法：
+    python -m benchmarks.bench_autotune --model ./local-model
+    python -m benchmarks.bench_autotune --model ./local-model --backend int8 --latency-ms 250 --output autotune.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from autotune import LATENCY_TARGET_MS, apply_profile, get_threads, print_result, profile_settings, set_threads, tune
+from backends import BACKENDS
+from detector import BATCH_SIZE, analyze_document, load_model
+from benchmarks.stub_model import StubClassifier, StubTokenizer, make_text
+
+
+def time_corpus(documents, clf, tokenizer, mode, **settings):
+    start = time.perf_counter()
+    windows = sum(len(analyze_document(text, clf, tokenizer, mode=mode, **settings)["scores"]) for text in documents)
+    return time.perf_counter() - start, windows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="local model directory (default: offline stub model)")
+    parser.add_argument("--backend", choices=BACKENDS, default="pytorch")
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--words", type=int, default=1500, help="words per document")
+    parser.add_argument("--mode", choices=("sentences", "tokens"), default="tokens")
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_TARGET_MS)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    clf, tokenizer = load_model(args.model, args.backend) if args.model else (StubClassifier(), StubTokenizer())
+    documents = [make_text(args.words, seed=i) for i in range(args.documents)]
+    default_threads = get_threads()
+
+    print(f"{'threads':>7} {'batch':>5} {'window':>6} {'batch ms':>9} {'windows/s':>9} {'tokens/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        profile = tune(clf, tokenizer, args.model or "stub", args.backend, args.latency_ms,
+                       os.path.join(tmp, "autotune.json"), log=print_result)
+        tune_s = time.perf_counter() - start
+    print(f"Chosen in {tune_s:.1f}s:")
+    print_result(profile)
+
+    set_threads(default_threads)
+    default_s, default_windows = time_corpus(documents, clf, tokenizer, args.mode, batch_size=BATCH_SIZE)
+    apply_profile(profile)
+    tuned_s, tuned_windows = time_corpus(documents, clf, tokenizer, args.mode, batch_size=profile["batch_size"],
+                                         **profile_settings(profile))
+    set_threads(default_threads)
+
+    print(f"{'config':>8} {'seconds':>8} {'docs/s':>7} {'windows':>8}")
+    print(f"{'default':>8} {default_s:>8.2f} {len(documents) / default_s:>7.2f} {default_windows:>8}")
+    print(f"{'tuned':>8} {tuned_s:>8.2f} {len(documents) / tuned_s:>7.2f} {tuned_windows:>8}"
+          f"  ({default_s / tuned_s:.2f}x)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model or "stub", "backend": args.backend, "mode": args.mode,
+                       "tune_seconds": tune_s, "profile": profile, "default_threads": default_threads,
+                       "default_seconds": default_s, "tuned_seconds": tuned_s}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
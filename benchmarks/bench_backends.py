@@ -0,0 +1,116 @@
+"""比較各推論後端的分數偏差、延遲、吞吐量與常駐記憶體
+
+每個後端在獨立子行程中載入，記憶體量測才不會互相影響。
+
+用法：
+    python -m benchmarks.bench_backends                          # ModernBERT（需下載模型）
+    python -m benchmarks.bench_backends --model ./local-model    # 本機模型目錄
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from backends import BACKENDS
+from detector import MODEL_NAME
+from benchmarks.stub_model import make_text
+
+CJK_SAMPLE = ("近年來，「全球暖化」已不只是課本上的名詞，而是我們每天都能感受到的現象。"
+              "從破紀錄的熱浪、頻繁的豪雨到越來越長的夏天，氣候變遷的影響已遍及全世界。")
+
+
+def parity_corpus(n_texts=64):
+    """固定內容的比對語料：長短不一的英文段落與中文段落"""
+    texts = [make_text(20 + (i * 37) % 300, seed=i) for i in range(n_texts - 4)]
+    return texts + [CJK_SAMPLE, CJK_SAMPLE * 3, CJK_SAMPLE[:30], CJK_SAMPLE * 8]
+
+
+def resident_memory_mb():
+    """目前行程的常駐記憶體（Linux /proc，其他平台以 ru_maxrss 近似）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(name, model, batch_size, repeat):
+    """在目前行程中量測單一後端，回傳結果 dict"""
+    from backends import load_backend
+
+    base_rss = resident_memory_mb()
+    start = time.perf_counter()
+    backend, _ = load_backend(name, model)
+    load_seconds = time.perf_counter() - start
+
+    texts = parity_corpus()
+    backend.classify(texts[:batch_size])  # 預熱
+    latencies = []
+    for _ in range(repeat):
+        scores = []
+        for i in range(0, len(texts), batch_size):
+            start = time.perf_counter()
+            scores.extend(backend.classify(texts[i:i+batch_size]))
+            latencies.append(time.perf_counter() - start)
+
+    return {
+        "backend": name,
+        "load_seconds": load_seconds,
+        "batch_p50_ms": statistics.median(latencies) * 1000,
+        "batch_p95_ms": statistics.quantiles(latencies, n=20)[-1] * 1000 if len(latencies) > 1 else latencies[0] * 1000,
+        "texts_per_second": len(texts) * repeat / sum(latencies),
+        "rss_mb": resident_memory_mb(),
+        "model_rss_mb": resident_memory_mb() - base_rss,
+        "scores": scores,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.model, args.batch_size, args.repeat)))
+        return
+
+    results = []
+    for name in args.backends:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_backends", "--worker", name, "--model", args.model,
+             "--batch-size", str(args.batch_size), "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    # 以第一個後端（預設為 pytorch fp32）為基準計算分數偏差
+    reference = results[0]["scores"]
+    print(f"{'backend':>8} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'texts/s':>8} {'RSS MB':>8}"
+          f" {'max drift':>10} {'mean drift':>11} {'flips':>6}")
+    for result in results:
+        drift = [abs(a - b) for a, b in zip(result["scores"], reference)]
+        result["max_drift"] = max(drift)
+        result["mean_drift"] = sum(drift) / len(drift)
+        result["label_flips"] = sum(1 for a, b in zip(result["scores"], reference) if (a > 0.5) != (b > 0.5))
+        print(f"{result['backend']:>8} {result['load_seconds']:>7.2f} {result['batch_p50_ms']:>8.1f}"
+              f" {result['batch_p95_ms']:>8.1f} {result['texts_per_second']:>8.1f} {result['rss_mb']:>8.0f}"
+              f" {result['max_drift']:>10.2e} {result['mean_drift']:>11.2e} {result['label_flips']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""前置模型（cascade）：不同一致率目標下略過的視窗比例、與完整模型的一致率、整體分數誤差與端到端耗時
+
+預設以替身模型當作「完整模型」（STUB_SEED 的替身模型對這份語料的判定有 AI 也有人類；
+多數種子的替身模型把所有視窗都判為 AI，無法評估），也可用 --model 指定真正的模型。
+語料混合數種文體（一般段落、中文、條列、制式文字、對話），依文件分成訓練 / 校準 / 保留三組，
+報告中的數字都來自保留組。替身模型的前向傳遞遠比 ModernBERT 便宜，實際模型上的加速
+應以略過的視窗比例估計。
+
+用法：
+    python -m benchmarks.bench_cascade
+    python -m benchmarks.bench_cascade --documents 600 --targets 0.95 0.99 --output cascade.json
+    python -m benchmarks.bench_cascade --model ./local-model --documents 200
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from cascade import CascadeClassifier, CascadeModel, collect_windows, evaluate, split_documents
+from detector import analyze_document, load_model
+from benchmarks.stub_model import StubClassifier, StubTokenizer, make_cjk_text, make_text
+
+STUB_SEED = 4
+GENRES = ("prose", "cjk", "list", "boilerplate", "dialogue")
+LIST_ITEMS = ("install the package", "restart the server", "check the logs", "update the config",
+              "run the tests", "open a ticket", "back up the data", "rotate the keys")
+BOILERPLATE = ("All rights reserved. Copyright {year} Example Corp. Terms of service apply. "
+               "Contact support at +1-555-{num:04d} or visit our website for more information. ")
+DIALOGUE = ('"Are you coming?" she asked. "Not yet!" he said. "Why?" "Because it is late." ',
+            '"Did you see it?" "Yes!" "Where?" "Over there, by the river." ')
+
+
+def make_document(genre, rng, n_words):
+    if genre == "prose":
+        return make_text(n_words, seed=int(rng.integers(1 << 30)))
+    if genre == "cjk":
+        return make_cjk_text(n_words * 2, seed=int(rng.integers(1 << 30)))
+    if genre == "list":
+        return "\n".join(f"- Step {i + 1}: {rng.choice(LIST_ITEMS)}" for i in range(n_words // 5))
+    if genre == "boilerplate":
+        return "".join(BOILERPLATE.format(year=int(rng.integers(1990, 2030)), num=int(rng.integers(10000)))
+                       for _ in range(n_words // 25 + 1))
+    return "".join(rng.choice(DIALOGUE) for _ in range(n_words // 15 + 1))
+
+
+def make_corpus(n_documents, seed=0):
+    rng = np.random.default_rng(seed)
+    return [(i, make_document(GENRES[i % len(GENRES)], rng, int(rng.integers(80, 600)))) for i in range(n_documents)]
+
+
+def time_analysis(documents, clf, tokenizer, mode):
+    start = time.perf_counter()
+    for _, text in documents:
+        analyze_document(text, clf, tokenizer, mode=mode)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="local model directory (default: offline stub model)")
+    parser.add_argument("--documents", type=int, default=400)
+    parser.add_argument("--mode", choices=("sentences", "tokens", "words"), default="sentences")
+    parser.add_argument("--targets", type=float, nargs="+", default=[0.95, 0.98, 0.99, 0.995])
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    clf, tokenizer = load_model(args.model) if args.model else (StubClassifier(seed=STUB_SEED), StubTokenizer())
+    documents = make_corpus(args.documents)
+    x, scores, owners = collect_windows(documents, clf, tokenizer, args.mode)
+    train, calibration, holdout = split_documents(owners, (0.6, 0.2, 0.2))
+    held_out_documents = [documents[i] for i in np.unique(owners[holdout])]
+    print(f"{len(scores)} windows in {len(documents)} documents,"
+          f" {(scores > 0.5).mean():.1%} judged AI by the full model")
+
+    baseline_s = time_analysis(held_out_documents, clf, tokenizer, args.mode)
+    results = []
+    print(f"{'target':>7} {'low':>6} {'high':>6} {'skipped':>8} {'agree skip':>10} {'agree all':>9}"
+          f" {'doc MAE':>8} {'flips':>5} {'speedup':>7}")
+    for target in args.targets:
+        model = CascadeModel.fit(x[train], scores[train], x[calibration], scores[calibration], target)
+        report = evaluate(model, x[holdout], scores[holdout], owners[holdout])
+        cascade_s = time_analysis(held_out_documents, CascadeClassifier(clf, tokenizer, model), tokenizer, args.mode)
+        report.update({"target_agreement": target, "baseline_seconds": baseline_s, "cascade_seconds": cascade_s})
+        results.append(report)
+        print(f"{target:>7.3f} {report['low']:>6.3f} {report['high']:>6.3f} {report['skipped_fraction']:>8.1%}"
+              f" {report['agreement_skipped']:>10.2%} {report['agreement_overall']:>9.2%}"
+              f" {report['overall_score_mae']:>8.4f} {report['label_flips']:>5} {baseline_s / cascade_s:>6.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model or "stub", "mode": args.mode, "documents": args.documents,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""比較原本以 str.replace 逐段標註與依字元位置一次輸出的標註速度
+
+用法：
+    python -m benchmarks.bench_highlight
+    python -m benchmarks.bench_highlight --words 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+from detector import word_windows
+from highlight import highlight_html
+from benchmarks.stub_model import make_text
+
+
+def legacy_highlight(text, segments, scores):
+    """原本在不斷變長的 HTML 上對每個片段呼叫 str.replace 的實作，作為比較基準"""
+    highlighted = text
+    for segment, score in zip(segments, scores):
+        if score > 0.7 and len(segment) > 20:
+            highlighted = highlighted.replace(
+                segment,
+                f'<span class="ai-highlight">{segment}</span>'
+            )
+    return highlighted
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--legacy-limit", type=int, default=100000,
+                        help="skip the legacy implementation above this many words")
+    args = parser.parse_args()
+
+    print(f"{'words':>8} {'windows':>8} {'legacy ms':>10} {'offset ms':>10} {'speedup':>8}")
+    for n_words in args.words:
+        text = make_text(n_words, seed=n_words)
+        windows = word_windows(text)
+        rng = random.Random(n_words)
+        scores = [rng.random() for _ in windows]
+        segments = [" ".join(text[w.start:w.end].split()) for w in windows]
+        spans = [(w.start, w.end) for w in windows]
+
+        offset = timed(highlight_html, text, spans, scores)
+        if n_words <= args.legacy_limit:
+            legacy = timed(legacy_highlight, text, segments, scores)
+            print(f"{n_words:>8} {len(windows):>8} {legacy * 1000:>10.1f} {offset * 1000:>10.1f} {legacy / offset:>7.1f}x")
+        else:
+            print(f"{n_words:>8} {len(windows):>8} {'skipped':>10} {offset * 1000:>10.1f} {'':>8}")
+
+
+if __name__ == "__main__":
+    main()
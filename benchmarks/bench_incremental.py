@@ -0,0 +1,113 @@
+"""增量重新分析：與整篇重新分析比較結果與耗時（各模式、英文與中文、文件開頭 / 中間 / 結尾的修改與刪除）
+
+每個案例都檢查 reanalyze_document 的結果：
+- 視窗依位置排序且在原文範圍內，片段文字與字元位置一致
+- 每個視窗的分數等於以替身模型重新推論該片段的分數（沿用的分數沒有對錯位置）
+- 沒有被任何視窗涵蓋的字元與整篇重新分析相同（修改處不會漏掉）
+- 整篇重算時（rescored 為 None）結果與 analyze_document 完全相同；否則整體分數差距不超過 SCORE_TOLERANCE
+- 除了 adaptive 模式（一律整篇重算），這些小幅修改都必須走增量路徑（中文以句末標點為安全邊界）
+有案例不符合時以結束碼 1 結束。
+
+用法：
+    python -m benchmarks.bench_incremental
+    python -m benchmarks.bench_incremental --words 5000 --modes tokens sentences
+"""
+import argparse
+import sys
+import time
+
+from detector import MODES, analyze_document, classify_ids, reanalyze_document, score_segments
+from benchmarks.stub_model import StubClassifier, StubTokenizer, make_cjk_text, make_text
+
+# 增量結果的視窗切法可能與整篇重算不同（例如開頭插入後整篇的視窗錯開），整體分數只要求相近
+SCORE_TOLERANCE = 0.01
+INSERTS = {"en": " A brand new sentence was inserted here by the editor.", "zh": "這是編輯時新加入的一句話。"}
+
+
+def make_edits(text, insert):
+    """修改後的文字：開頭 / 中間 / 結尾插入、中間與開頭刪除、中間替換一個字元"""
+    middle = len(text) // 2
+    return {
+        "insert start": insert.lstrip() + " " + text,
+        "insert middle": text[:middle] + insert + text[middle:],
+        "insert end": text + insert,
+        "delete middle": text[:middle] + text[middle + 200:],
+        "delete start": text[150:],
+        "replace middle": text[:middle] + "X" + text[middle + 1:],
+    }
+
+
+def uncovered(text, spans):
+    """沒有被任何視窗涵蓋的非空白字元位置"""
+    covered = bytearray(len(text))
+    for start, end in spans:
+        covered[start:end] = b"\1" * (end - start)
+    return {i for i, char in enumerate(text) if not covered[i] and not char.isspace()}
+
+
+def rescore(segments, clf, tokenizer, mode):
+    if mode in ("tokens", "sentences"):
+        return classify_ids(clf, tokenizer, [tokenizer(s, add_special_tokens=False)["input_ids"] for s in segments])
+    return score_segments(segments, clf, tokenizer=tokenizer)
+
+
+def check(text, incremental, fresh, clf, tokenizer, mode, previous):
+    """回傳不符合的項目（空列表表示通過）"""
+    problems = []
+    if incremental["rescored"] is None and mode != "adaptive" and previous["spans"]:
+        problems.append("fell back to a full re-run")
+    spans = incremental["spans"]
+    if any(s > e or s < 0 or e > len(text) for s, e in spans) or [s for s, _ in spans] != sorted(s for s, _ in spans):
+        problems.append("spans out of order or out of range")
+    expected = [text[s:e] if mode in ("tokens", "sentences") else " ".join(text[s:e].split()) for s, e in spans]
+    if incremental["segments"] != expected:
+        problems.append("segments do not match spans")
+    elif incremental["segments"] and max(abs(a - b) for a, b in zip(
+            incremental["scores"], rescore(incremental["segments"], clf, tokenizer, mode))) > 1e-6:
+        problems.append("scores do not match their segments")
+    if uncovered(text, spans) != uncovered(text, fresh["spans"]):
+        problems.append("uncovered text differs from a full analysis")
+    if incremental["rescored"] is None:
+        if (incremental["spans"], incremental["scores"]) != (fresh["spans"], fresh["scores"]):
+            problems.append("full recompute differs from analyze_document")
+    elif abs(incremental["overall_score"] - fresh["overall_score"]) > SCORE_TOLERANCE:
+        problems.append("overall score differs from a full analysis")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=1500, help="document size (CJK: twice as many characters)")
+    parser.add_argument("--modes", choices=MODES, nargs="+", default=list(MODES))
+    args = parser.parse_args()
+
+    clf, tokenizer = StubClassifier(call_overhead_ms=0), StubTokenizer()
+    documents = {"en": make_text(args.words), "zh": make_cjk_text(args.words * 2)}
+    failures = 0
+    print(f"{'lang':>4} {'mode':>9} {'edit':>14} {'windows':>7} {'rescored':>8} {'full ms':>8} {'incr ms':>8}"
+          f" {'score diff':>10}  result")
+    for language, text in documents.items():
+        for mode in args.modes:
+            previous = analyze_document(text, clf, tokenizer, mode=mode)
+            for name, edited in make_edits(text, INSERTS[language]).items():
+                start = time.perf_counter()
+                fresh = analyze_document(edited, clf, tokenizer, mode=mode)
+                full_s = time.perf_counter() - start
+                start = time.perf_counter()
+                incremental = reanalyze_document(edited, text, previous, clf, tokenizer, mode=mode)
+                incremental_s = time.perf_counter() - start
+                problems = check(edited, incremental, fresh, clf, tokenizer, mode, previous)
+                failures += bool(problems)
+                rescored = "full" if incremental["rescored"] is None else incremental["rescored"]
+                print(f"{language:>4} {mode:>9} {name:>14} {len(incremental['spans']):>7} {rescored:>8}"
+                      f" {full_s * 1000:>8.1f} {incremental_s * 1000:>8.1f}"
+                      f" {abs(incremental['overall_score'] - fresh['overall_score']):>10.4f}"
+                      f"  {'; '.join(problems) or 'ok'}")
+
+    if failures:
+        print(f"{failures} case(s) failed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
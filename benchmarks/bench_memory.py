@@ -0,0 +1,86 @@
+"""比較整篇分析與串流分析的峰值記憶體：整篇讀入 + 片段文字 + 標註 HTML vs 逐塊讀取、只保留視窗分數
+
+使用替身模型，語料先寫入暫存檔，兩種方式都從檔案開始量測。峰值記憶體以 tracemalloc
+量測 Python 配置的記憶體，不含 PyTorch 的原生張量記憶體。
+
+用法：
+    python -m benchmarks.bench_memory
+    python -m benchmarks.bench_memory --words 10000 100000 1000000 --mode tokens
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from detector import analyze_document
+from highlight import highlight_html
+from streaming import STREAM_BLOCK_CHARS, STREAM_MODES, iter_file_chunks, stream_document
+from benchmarks.stub_model import StubClassifier, StubTokenizer, make_text
+
+
+def full_analysis(path, clf, tokenizer, mode):
+    """目前介面的做法：整篇讀入，保留片段文字、分數與標註 HTML"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    analysis = analyze_document(text, clf, tokenizer, mode=mode)
+    highlighted = highlight_html(text, analysis["spans"], analysis["scores"])
+    return analysis["overall_score"], len(analysis["scores"]), highlighted
+
+
+def streamed_analysis(path, clf, tokenizer, mode, block_chars):
+    result = stream_document(iter_file_chunks(path, block_chars), clf, tokenizer, mode=mode, block_chars=block_chars)
+    return result["overall_score"], len(result["scores"])
+
+
+def measure(fn, *args):
+    """回傳 (結果, 秒數, 峰值 MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, nargs="+", default=[10000, 30000, 100000, 300000])
+    parser.add_argument("--mode", choices=STREAM_MODES, default="sentences")
+    parser.add_argument("--block-chars", type=int, default=STREAM_BLOCK_CHARS)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    clf, tokenizer = StubClassifier(), StubTokenizer()
+    results = []
+    print(f"{'words':>8} {'text MB':>8} {'full MB':>8} {'stream MB':>9} {'full s':>7} {'stream s':>8}"
+          f" {'full score':>10} {'stream score':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_words in args.words:
+            path = os.path.join(tmp, f"corpus_{n_words}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(make_text(n_words, seed=n_words))
+            text_mb = os.path.getsize(path) / 2**20
+
+            (full_score, full_windows, _), full_s, full_mb = measure(full_analysis, path, clf, tokenizer, args.mode)
+            (stream_score, stream_windows), stream_s, stream_mb = measure(
+                streamed_analysis, path, clf, tokenizer, args.mode, args.block_chars)
+            results.append({
+                "words": n_words, "text_mb": text_mb,
+                "full_peak_mb": full_mb, "stream_peak_mb": stream_mb,
+                "full_seconds": full_s, "stream_seconds": stream_s,
+                "full_windows": full_windows, "stream_windows": stream_windows,
+                "full_score": full_score, "stream_score": stream_score,
+            })
+            print(f"{n_words:>8} {text_mb:>8.2f} {full_mb:>8.2f} {stream_mb:>9.2f} {full_s:>7.2f} {stream_s:>8.2f}"
+                  f" {full_score:>10.4f} {stream_score:>12.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"mode": args.mode, "block_chars": args.block_chars, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
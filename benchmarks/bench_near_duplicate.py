@@ -0,0 +1,114 @@
+"""近似重複索引：寫入速度、索引大小、查詢延遲 p50/p95、各等級的比對結果與行程峰值記憶體
+
+語料為 Zipf 分布的隨機詞（替身模型的範例句重複度太高，不適合量測比對）。查詢分為
+原文片段、5% 詞被替換、20% 詞被替換、50% 詞被替換與不在索引中的新文字。
+
+用法：
+    python -m benchmarks.bench_near_duplicate
+    python -m benchmarks.bench_near_duplicate --segments 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+from near_duplicate import NearDuplicateIndex
+
+SEGMENT_WORDS = 50
+VARIANTS = (("exact", 0.0), ("edit_5pct", 0.05), ("edit_20pct", 0.2), ("edit_50pct", 0.5), ("unseen", None))
+
+
+def make_vocab(size=20000, seed=0):
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 9))) for _ in range(size)]
+    return words, [1 / (rank + 1) for rank in range(size)]
+
+
+def make_segment(rng, vocab, n_words=SEGMENT_WORDS):
+    words, weights = vocab
+    return rng.choices(words, weights, k=n_words)
+
+
+def mutate(rng, words, fraction, vocab):
+    words = list(words)
+    for i in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[i] = rng.choice(vocab[0])
+    return " ".join(words)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run(n_segments, queries, vocab, tmp):
+    path = os.path.join(tmp, f"index_{n_segments}.db")
+    index = NearDuplicateIndex(path)
+    rng = random.Random(n_segments)
+    # 只保留要查詢的片段，其餘片段寫入後即丟棄
+    sampled = set(rng.sample(range(n_segments), min(queries, n_segments)))
+    kept = []
+
+    def segments():
+        for i in range(n_segments):
+            words = make_segment(rng, vocab)
+            if i in sampled:
+                kept.append(words)
+            yield " ".join(words)
+
+    start = time.perf_counter()
+    index.add(segments(), source="corpus")
+    build_seconds = time.perf_counter() - start
+
+    result = {
+        "segments": n_segments,
+        "build_seconds": build_seconds,
+        "inserts_per_second": n_segments / build_seconds,
+        "index_mb": sum(os.path.getsize(path + suffix) for suffix in ("", "-wal") if os.path.exists(path + suffix))
+                    / 2**20,
+    }
+    for name, fraction in VARIANTS:
+        timings, buckets = [], {}
+        for words in kept:
+            text = " ".join(make_segment(rng, vocab)) if fraction is None else mutate(rng, words, fraction, vocab)
+            start = time.perf_counter()
+            match = index.query(text)
+            timings.append(time.perf_counter() - start)
+            buckets[match["bucket"]] = buckets.get(match["bucket"], 0) + 1
+        result[name] = {"p50_ms": percentile(timings, 0.5) * 1000, "p95_ms": percentile(timings, 0.95) * 1000,
+                        "buckets": buckets}
+    result["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200, help="queries per variant")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    vocab = make_vocab()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_segments in args.segments:
+            result = run(n_segments, args.queries, vocab, tmp)
+            results.append(result)
+            print(f"\n{n_segments} segments: built in {result['build_seconds']:.1f}s"
+                  f" ({result['inserts_per_second']:.0f}/s), index {result['index_mb']:.1f} MB,"
+                  f" max RSS {result['max_rss_mb']:.0f} MB")
+            print(f"{'query':>12} {'p50 ms':>8} {'p95 ms':>8}  buckets")
+            for name, _ in VARIANTS:
+                entry = result[name]
+                print(f"{name:>12} {entry['p50_ms']:>8.3f} {entry['p95_ms']:>8.3f}  {entry['buckets']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""偵測流程的離線基準測試：各階段延遲 p50/p95、片段/秒與峰值記憶體，並可與先前結果比較
+
+預設使用替身模型與固定內容的英文、中文語料，不需要網路；--model 可指定本機模型目錄。
+峰值記憶體以 tracemalloc 量測 Python 配置的記憶體（含 NumPy），不含 PyTorch 的原生張量記憶體。
+
+用法：
+    python -m benchmarks.bench_pipeline                              # 替身模型
+    python -m benchmarks.bench_pipeline --model ./local-model        # 本機真實模型
+    python -m benchmarks.bench_pipeline --output baseline.json
+    python -m benchmarks.bench_pipeline --compare baseline.json      # 變慢超過門檻時以狀態碼 1 結束
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from detector import MODES, analyze_document, analyze_text_segments, split_segments
+from highlight import highlight_html
+from charts import create_donut_chart, create_timeline_chart
+from visualize import score_buckets
+from benchmarks.stub_model import StubClassifier, StubTokenizer, make_cjk_text, make_text
+
+SIZES = (100, 1000, 10000, 100000)
+LANGUAGES = ("en", "zh")
+CASES = ("segments", "document", "highlight", "charts")
+
+
+def load_pipeline(model):
+    if model == "stub":
+        return StubClassifier(), StubTokenizer()
+    from detector import load_model
+    return load_model(model)
+
+
+def make_corpus(language, size, seed=0):
+    """英文以字數、中文以字元數控制大小"""
+    return make_text(size, seed) if language == "en" else make_cjk_text(size, seed)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure(fn, repeat):
+    """執行 repeat 次取延遲，再額外執行一次以 tracemalloc 量測峰值記憶體"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+def run_case(case, text, clf, tokenizer, mode, analysis):
+    """回傳 (要量測的函式, 片段數)"""
+    if case == "segments":
+        return lambda: analyze_text_segments(text, clf, tokenizer), len(split_segments(text))
+    if case == "document":
+        return lambda: analyze_document(text, clf, tokenizer, mode=mode), len(analysis["scores"])
+    if case == "highlight":
+        # 分數平均分布在各標註等級，讓標註成本不受模型校準影響（替身模型的分數幾乎都低於門檻）
+        scores = [(i * 0.37) % 1 for i in range(len(analysis["spans"]))]
+        return lambda: highlight_html(text, analysis["spans"], scores), len(scores)
+    if case == "charts":
+        def build():
+            create_donut_chart(analysis["overall_score"] * 100)
+            create_timeline_chart(score_buckets(analysis["spans"], analysis["scores"]), len(text))
+        return build, len(analysis["scores"])
+    raise ValueError(f"Unknown benchmark case: {case!r}")
+
+
+def run(args):
+    clf, tokenizer = load_pipeline(args.model)
+    results = []
+    print(f"{'case':>10} {'lang':>4} {'size':>7} {'segments':>8} {'p50 ms':>9} {'p95 ms':>9} {'seg/s':>9} {'peak MB':>8}")
+    for language in args.languages:
+        for size in args.sizes:
+            text = make_corpus(language, size, seed=size)
+            analysis = analyze_document(text, clf, tokenizer, mode=args.mode)
+            for case in args.cases:
+                fn, n_segments = run_case(case, text, clf, tokenizer, args.mode, analysis)
+                fn()  # 預熱
+                timings, peak = measure(fn, args.repeat)
+                p50 = percentile(timings, 0.5)
+                result = {
+                    "case": case, "language": language, "size": size, "segments": n_segments,
+                    "p50_ms": p50 * 1000, "p95_ms": percentile(timings, 0.95) * 1000,
+                    "segments_per_second": n_segments / p50 if p50 else 0.0,
+                    "peak_mb": peak / 2**20,
+                }
+                results.append(result)
+                print(f"{case:>10} {language:>4} {size:>7} {n_segments:>8} {result['p50_ms']:>9.2f}"
+                      f" {result['p95_ms']:>9.2f} {result['segments_per_second']:>9.0f} {result['peak_mb']:>8.2f}")
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """與基準比較 p50，回傳變慢超過 threshold（比例）且超過 min_delta_ms 的項目"""
+    previous = {(r["case"], r["language"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'case':>10} {'lang':>4} {'size':>7} {'base ms':>9} {'now ms':>9} {'change':>8}")
+    for result in results:
+        old = previous.get((result["case"], result["language"], result["size"]))
+        if old is None or not old["p50_ms"]:
+            continue
+        change = result["p50_ms"] / old["p50_ms"] - 1
+        # 次毫秒等級的項目只有雜訊，需同時超過絕對門檻才算變慢
+        slower = change > threshold and result["p50_ms"] - old["p50_ms"] > min_delta_ms
+        flag = "  SLOWER" if slower else ""
+        print(f"{result['case']:>10} {result['language']:>4} {result['size']:>7} {old['p50_ms']:>9.2f}"
+              f" {result['p50_ms']:>9.2f} {change:>+8.0%}{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="stub", help="'stub' (offline stand-in) or a model name / local directory")
+    parser.add_argument("--mode", choices=MODES, default="sentences")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--languages", nargs="+", choices=LANGUAGES, default=list(LANGUAGES))
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from a previous --output run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="flag p50 slowdowns above this fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = {
+        "meta": {
+            "model": args.model, "mode": args.mode, "repeat": args.repeat,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpu_count": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""多 session 同時送出時，比較直接呼叫 clf 與共用 InferenceScheduler 的負載測試
+
+用法：
+    python -m benchmarks.bench_scheduler --sessions 30 --long-words 20000
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from detector import BATCH_SIZE, analyze_document
+from inference_server import SUBMIT_SIZE, InferenceScheduler, SessionClient, model_batch_fn
+from benchmarks.stub_model import StubClassifier, StubTokenizer, make_text
+
+
+def run_sessions(documents, make_clf, tokenizer, mode, batch_size):
+    """每個文件一個執行緒同時送出，回傳 (總時間, 各文件延遲, 各文件結果)"""
+    barrier = threading.Barrier(len(documents) + 1)
+    latencies = [0.0] * len(documents)
+    results = [None] * len(documents)
+
+    def worker(i, text):
+        clf = make_clf(i)
+        barrier.wait()
+        start = time.perf_counter()
+        results[i] = analyze_document(text, clf, tokenizer, mode=mode, batch_size=batch_size)
+        latencies[i] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=worker, args=(i, t)) for i, t in enumerate(documents)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies, results
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--short-words", type=int, default=300)
+    parser.add_argument("--long-words", type=int, default=20000)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--mode", choices=["words", "tokens"], default="tokens")
+    args = parser.parse_args()
+
+    clf, tokenizer = StubClassifier(call_overhead_ms=2.0), StubTokenizer()
+    # 第一個 session 上傳長文件，其他都是短文
+    documents = [make_text(args.long_words, 0)] + [
+        make_text(args.short_words, i) for i in range(1, args.sessions)
+    ]
+
+    direct_time, direct_lat, direct_results = run_sessions(
+        documents, lambda i: clf, tokenizer, args.mode, BATCH_SIZE)
+
+    scheduler = InferenceScheduler(model_batch_fn(clf, tokenizer), args.max_batch_size, args.max_wait_ms)
+    sched_time, sched_lat, sched_results = run_sessions(
+        documents, lambda i: SessionClient(scheduler, f"session-{i}"), tokenizer, args.mode, SUBMIT_SIZE)
+    scheduler.close()
+
+    # 結果必須與直接呼叫一致
+    for a, b in zip(direct_results, sched_results):
+        assert len(a["scores"]) == len(b["scores"])
+        assert max((abs(x - y) for x, y in zip(a["scores"], b["scores"])), default=0.0) < 1e-6
+
+    print(f"{'':>10} {'wall s':>8} {'short p50':>10} {'short p95':>10} {'long s':>8}")
+    for name, wall, lat in (("direct", direct_time, direct_lat), ("scheduler", sched_time, sched_lat)):
+        short = lat[1:]
+        print(f"{name:>10} {wall:>8.3f} {percentile(short, 50):>10.3f} {percentile(short, 95):>10.3f} {lat[0]:>8.3f}")
+    stats = scheduler.stats
+    print(f"scheduler: {stats['batches']} batches, avg {stats['items'] / max(stats['batches'], 1):.1f} items,"
+          f" max {stats['max_batch']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""比較逐段推論與批次推論的 analyze_text_segments 速度
+
+用法：
+    python -m benchmarks.bench_segments                 # 使用離線替身模型
+    python -m benchmarks.bench_segments --model real    # 使用 ModernBERT（需下載模型）
+"""
+import argparse
+import time
+
+from detector import analyze_document, analyze_text_segments, to_ai_score
+from benchmarks.stub_model import StubClassifier, StubTokenizer, make_text
+
+
+def legacy_analyze(text, clf, segment_size=50):
+    """原本每個片段呼叫一次 clf 的實作，作為比較基準"""
+    words = text.split()
+    segments = []
+    scores = []
+    for i in range(0, len(words), segment_size//2):
+        segment = ' '.join(words[i:i+segment_size])
+        if len(segment.split()) < 10:
+            continue
+        scores.append(to_ai_score(clf(segment, truncation=True)[0]))
+        segments.append(segment)
+    return segments, scores
+
+
+def load_classifier(name):
+    if name == "stub":
+        return StubClassifier(), StubTokenizer()
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+    model_name = "AICodexLab/answerdotai-ModernBERT-base-ai-detector"
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer), tokenizer
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--words", type=int, nargs="+", default=[500, 2000, 5000])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    clf, tokenizer = load_classifier(args.model)
+    print(f"{'words':>7} {'segments':>9} {'mode':>10} {'seconds':>9} {'speedup':>8} {'max diff':>9}")
+
+    for n_words in args.words:
+        text = make_text(n_words)
+        base_time, (segments, base_scores) = best_of(lambda: legacy_analyze(text, clf), args.repeat)
+        print(f"{n_words:>7} {len(segments):>9} {'per-seg':>10} {base_time:>9.3f} {1.0:>8.2f} {0.0:>9.1e}")
+
+        for batch_size in args.batch_sizes:
+            elapsed, (batched_segments, scores) = best_of(
+                lambda: analyze_text_segments(text, clf, tokenizer, batch_size=batch_size), args.repeat)
+            assert batched_segments == segments
+            diff = max((abs(a - b) for a, b in zip(scores, base_scores)), default=0.0)
+            print(f"{n_words:>7} {len(segments):>9} {'batch=' + str(batch_size):>10} "
+                  f"{elapsed:>9.3f} {base_time / elapsed:>8.2f} {diff:>9.1e}")
+
+        # 整篇只 tokenize 一次的 token 視窗模式與依句子邊界裝箱的模式（含整體分數）
+        for mode in ("tokens", "sentences"):
+            elapsed, analysis = best_of(lambda: analyze_document(text, clf, tokenizer, mode=mode), args.repeat)
+            print(f"{n_words:>7} {len(analysis['scores']):>9} {mode:>10} "
+                  f"{elapsed:>9.3f} {base_time / elapsed:>8.2f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
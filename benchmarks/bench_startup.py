@@ -0,0 +1,98 @@
+"""冷啟動量測：主要套件的匯入時間、第一個可互動頁面、模型就緒與第一個結果的時間
+
+每次量測都在新的 Python 行程中執行（以 Streamlit AppTest 執行 app.py），
+包含模組匯入與模型載入的成本；作業系統的檔案快取不會被清除。
+
+用法：
+    python -m benchmarks.bench_startup --model ./local-model
+    python -m benchmarks.bench_startup --model ./local-model --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ("streamlit", "numpy", "plotly.graph_objects", "torch", "transformers")
+SAMPLE_WORDS = 300
+POLL_SECONDS = 0.5
+
+
+def import_time(module):
+    """在新行程中匯入一個模組，回傳秒數"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    return float(subprocess.check_output([sys.executable, "-c", code], cwd=APP_DIR).decode().strip().splitlines()[-1])
+
+
+def run_app(timeout):
+    """子行程：執行 app.py，量測第一個頁面、DETECT 可用（模型就緒）與第一個結果的時間"""
+    start = time.perf_counter()
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+    from streamlit.testing.v1 import AppTest
+    from benchmarks.stub_model import make_text
+
+    at = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=timeout)
+    at.run()
+    first_page = time.perf_counter() - start
+    while at.button(key="detect_btn").disabled:
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("model did not become ready")
+        # 每次重新執行整頁也會佔用 CPU，間隔太短會拖慢背景載入
+        time.sleep(POLL_SECONDS)
+        at.run()
+    model_ready = time.perf_counter() - start
+    at.text_area(key="text_area_input").set_value(make_text(SAMPLE_WORDS)).run()
+    at.button(key="detect_btn").click().run()
+    if at.exception or at.error:
+        raise RuntimeError(f"analysis failed: {[e.value for e in at.exception or at.error]}")
+    first_result = time.perf_counter() - start
+    print(json.dumps({"first_page": first_page, "model_ready": model_ready, "first_result": first_result}))
+
+
+def app_startup(model, timeout):
+    env = dict(os.environ)
+    if model:
+        env["MODEL_DIR"] = model
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", "--timeout", str(timeout)],
+        cwd=APP_DIR, env=env, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="local model directory (sets MODEL_DIR for the app)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_app(args.timeout)
+        return
+
+    imports = {module: import_time(module) for module in MODULES}
+    print(f"{'module':>22} {'import s':>9}")
+    for module, seconds in imports.items():
+        print(f"{module:>22} {seconds:>9.2f}")
+
+    runs = [app_startup(args.model, args.timeout) for _ in range(args.runs)]
+    print(f"\n{'stage':>22} {'median s':>9} {'min s':>7} {'max s':>7}")
+    summary = {}
+    for stage in ("first_page", "model_ready", "first_result"):
+        values = [run[stage] for run in runs]
+        summary[stage] = statistics.median(values)
+        print(f"{stage:>22} {summary[stage]:>9.2f} {min(values):>7.2f} {max(values):>7.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model, "imports": imports, "runs": runs, "median": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
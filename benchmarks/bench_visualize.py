@@ -0,0 +1,92 @@
+"""報告繪製成本與送到瀏覽器的資料量：整篇標註 HTML + 前 10 段長條圖 vs 分數時間軸 + 單頁標註
+
+時間包含建立 Plotly 圖表並序列化成 JSON（Streamlit 送出圖表時也會序列化），
+資料量為圖表 JSON 與標註 HTML 的位元組數。新版的標註區間、分頁與圖表在第一次顯示時建立後
+存在報告中，之後換頁只需輸出一頁（page ms）。分數為隨機值，讓各標註等級都有出現。
+
+用法：
+    python -m benchmarks.bench_visualize
+    python -m benchmarks.bench_visualize --segments 100 1000 10000 50000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+import plotly.graph_objects as go
+
+from charts import create_timeline_chart
+from detector import word_windows
+from highlight import highlight_html, highlight_intervals
+from visualize import TIMELINE_BUCKETS, page_bounds, page_html, score_buckets
+from benchmarks.stub_model import make_text
+
+# words 模式的視窗為 50 字、重疊一半，每 25 個字約一個視窗
+WORDS_PER_SEGMENT = 25
+
+
+def legacy_chart(scores):
+    """原本只畫前 10 段的水平長條圖，作為比較基準"""
+    scores = scores[:10]
+    fig = go.Figure(go.Bar(y=[f"Segment {i+1}" for i in range(len(scores))], x=[s * 100 for s in scores],
+                           orientation='h', text=[f'{s*100:.1f}%' for s in scores]))
+    fig.update_layout(height=400)
+    return fig
+
+
+def legacy_render(text, spans, scores):
+    html = highlight_html(text, spans, scores)
+    return len(legacy_chart(scores).to_json()) + len(html)
+
+
+def paged_render(text, spans, scores):
+    """新版：第一次顯示報告時計算標註區間與分頁，送出時間軸與第一頁"""
+    intervals = highlight_intervals(spans, scores)
+    pages = page_bounds(text)
+    fig = create_timeline_chart(score_buckets(spans, scores, TIMELINE_BUCKETS), len(text))
+    return len(fig.to_json()) + len(page_html(text, intervals, pages, 0))
+
+
+def timed(fn, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'segments':>8} {'chars':>9} {'legacy ms':>9} {'legacy KB':>9} {'paged ms':>9} {'paged KB':>9}"
+          f" {'page ms':>8}")
+    for n_segments in args.segments:
+        text = make_text(n_segments * WORDS_PER_SEGMENT, seed=n_segments)
+        spans = [(w.start, w.end) for w in word_windows(text)]
+        rng = random.Random(n_segments)
+        scores = [rng.random() for _ in spans]
+        timed(paged_render, text, spans, scores, repeat=1)  # 預熱 Plotly
+        legacy_s, legacy_bytes = timed(legacy_render, text, spans, scores, repeat=args.repeat)
+        paged_s, paged_bytes = timed(paged_render, text, spans, scores, repeat=args.repeat)
+        intervals, pages = highlight_intervals(spans, scores), page_bounds(text)
+        page_s, _ = timed(page_html, text, intervals, pages, len(pages) // 2, repeat=args.repeat)
+        results.append({"segments": len(spans), "chars": len(text), "legacy_seconds": legacy_s,
+                        "legacy_bytes": legacy_bytes, "paged_seconds": paged_s, "paged_bytes": paged_bytes,
+                        "page_seconds": page_s})
+        print(f"{len(spans):>8} {len(text):>9} {legacy_s * 1000:>9.1f} {legacy_bytes / 1024:>9.1f}"
+              f" {paged_s * 1000:>9.1f} {paged_bytes / 1024:>9.1f} {page_s * 1000:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""多行程 worker 的吞吐量與記憶體擴展性
+
+對 1, 2, 4, ... 個 worker（上限為 CPU 核心數）各跑一次相同語料，回報
+文件/秒、相對 1 個 worker 的加速，以及所有 worker 的 RSS 與 PSS 總和
+（PSS 會把共用的映射權重平均分攤，較能反映實際記憶體用量）。
+
+用法：
+    python -m benchmarks.bench_workers --model ./local-model --docs 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+from detector import MODEL_NAME
+from worker_pool import resolve_model_dir, score_documents_parallel
+from benchmarks.stub_model import make_text
+
+
+def process_memory_mb(pid):
+    """讀取 /proc/<pid>/smaps_rollup 的 RSS 與 PSS（MB）"""
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key = line.split(":")[0]
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(line.split()[1]) / 1024
+    return memory
+
+
+def run(model, processes, documents, threads):
+    start = time.perf_counter()
+    memory = {"rss": 0.0, "pss": 0.0}
+    records = score_documents_parallel(iter(documents), model, processes, threads)
+    for count, _ in enumerate(records, 1):
+        if count == len(documents):
+            # 最後一筆結果回來時 worker 仍在執行，量測其記憶體
+            for child in multiprocessing.active_children():
+                for key, value in process_memory_mb(child.pid).items():
+                    memory[key] += value
+    elapsed = time.perf_counter() - start
+    return {"processes": processes, "threads_per_worker": threads, "seconds": elapsed,
+            "docs_per_second": len(documents) / elapsed, "total_rss_mb": memory["rss"],
+            "total_pss_mb": memory["pss"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--processes", type=int, nargs="+")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = args.processes or [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cores]
+    documents = [(f"doc{i}", make_text(args.words, seed=i)) for i in range(args.docs)]
+    # Hub 名稱與 worker 一樣使用本機快取的 snapshot（快取中的檔案是連到 blob 的符號連結，getsize 會跟隨）
+    model_dir = resolve_model_dir(args.model)
+    model_size = sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(model_dir) for name in files if name.endswith(".safetensors")
+    ) / 2**20
+
+    print(f"model weights: {model_size:.0f} MB, cores: {cores}")
+    print(f"{'workers':>8} {'docs/s':>8} {'speedup':>8} {'RSS MB':>8} {'PSS MB':>8} {'N x model':>10}")
+    results = []
+    for processes in counts:
+        result = run(args.model, processes, documents, args.threads_per_worker)
+        results.append(result)
+        print(f"{processes:>8} {result['docs_per_second']:>8.2f}"
+              f" {result['docs_per_second'] / results[0]['docs_per_second']:>8.2f}"
+              f" {result['total_rss_mb']:>8.0f} {result['total_pss_mb']:>8.0f} {processes * model_size:>10.0f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""離線基準測試用的小型替身模型（模擬 text-classification pipeline）"""
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# 替身 tokenizer 的切詞規則：每個中日韓字元各自成為一個 token，其餘以空白切開
+TOKEN_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]|[^\s\u3400-\u9fff\uf900-\ufaff]+')
+CJK_PHRASES = ("近年來", "全球暖化", "已不只是", "課本上的名詞", "而是我們", "每天都能感受到的現象",
+               "從破紀錄的熱浪", "頻繁的豪雨", "到越來越長的夏天", "氣候變遷的影響", "已遍及全世界",
+               "政府與企業", "應該共同承擔責任", "學生也能", "從日常生活做起")
+
+
+def make_text(n_words, seed=0):
+    """產生固定內容的英文測試文字"""
+    rng = np.random.default_rng(seed)
+    vocab = ("the model text human writing analysis climate energy policy "
+             "students research results global data process future change "
+             "however important because between several different").split()
+    words = rng.choice(vocab, size=n_words)
+    lines = []
+    for i in range(0, n_words, 12):
+        lines.append(' '.join(words[i:i+12]) + '.')
+    return ' '.join(lines)
+
+
+def make_cjk_text(n_chars, seed=0):
+    """產生約 n_chars 個字、以中文標點斷句的固定內容測試文字"""
+    rng = np.random.default_rng(seed)
+    parts = []
+    length = 0
+    while length < n_chars:
+        phrases = rng.choice(CJK_PHRASES, size=rng.integers(2, 5))
+        sentence = "，".join(phrases) + rng.choice(["。", "！", "？"])
+        parts.append(sentence)
+        length += len(sentence)
+    return "".join(parts)
+
+
+def token_id(word, vocab_size=8192):
+    return zlib.crc32(word.encode()) % vocab_size
+
+
+class StubTokenizer:
+    """以空白（中文為逐字）切詞的替身 tokenizer，支援 offset mapping"""
+
+    cls_token_id = 1
+    sep_token_id = 2
+
+    def __init__(self, vocab_size=8192):
+        self.vocab_size = vocab_size
+        self._words = {}  # token id -> 最近一次對應的詞，供 batch_decode 使用
+
+    def __call__(self, text, return_offsets_mapping=False, **kwargs):
+        spans = [m.span() for m in TOKEN_PATTERN.finditer(text)]
+        ids = [token_id(text[s:e], self.vocab_size) for s, e in spans]
+        self._words.update(zip(ids, (text[s:e] for s, e in spans)))
+        encoding = {"input_ids": ids}
+        if return_offsets_mapping:
+            encoding["offset_mapping"] = spans
+        return encoding
+
+    def batch_decode(self, id_lists, skip_special_tokens=True):
+        return [" ".join(self._words.get(i, "") for i in ids) for ids in id_lists]
+
+
+class StubClassifier:
+    """以 NumPy 實作的迷你分類器，呼叫介面與 transformers pipeline 相同"""
+
+    def __init__(self, dim=128, layers=2, vocab_size=8192, max_length=512,
+                 call_overhead_ms=1.0, seed=0):
+        rng = np.random.default_rng(seed)
+        self.vocab_size = vocab_size
+        self.max_length = max_length
+        self.call_overhead = call_overhead_ms / 1000
+        self.embedding = rng.standard_normal((vocab_size, dim)).astype(np.float32)
+        self.layers = [rng.standard_normal((dim, dim)).astype(np.float32) / np.sqrt(dim)
+                       for _ in range(layers)]
+        self.head = rng.standard_normal(dim).astype(np.float32) / np.sqrt(dim)
+        self.forward_calls = 0
+        # 真實模型在 CPU 上的並行呼叫會互相搶核心，這裡以鎖讓前向傳遞依序執行
+        self._lock = threading.Lock()
+
+    def encode(self, text, truncation=False):
+        ids = [token_id(w, self.vocab_size) for w in TOKEN_PATTERN.findall(text)]
+        if truncation:
+            ids = ids[:self.max_length]
+        return ids
+
+    def classify_ids(self, id_lists):
+        """一次前向傳遞：補齊到批次最長長度後計算 AI 機率"""
+        with self._lock:
+            return self._forward(id_lists)
+
+    def _forward(self, id_lists):
+        self.forward_calls += 1
+        # 模擬框架每次前向傳遞的固定成本
+        if self.call_overhead:
+            time.sleep(self.call_overhead)
+
+        longest = max(len(ids) for ids in id_lists)
+        padded = np.zeros((len(id_lists), longest), dtype=np.int64)
+        mask = np.zeros((len(id_lists), longest), dtype=np.float32)
+        for row, ids in enumerate(id_lists):
+            padded[row, :len(ids)] = ids
+            mask[row, :len(ids)] = 1.0
+
+        hidden = self.embedding[padded]
+        for weight in self.layers:
+            hidden = np.maximum(hidden @ weight, 0.0)
+        pooled = (hidden * mask[..., None]).sum(axis=1) / np.maximum(mask.sum(axis=1, keepdims=True), 1.0)
+        logits = pooled @ self.head
+        return (1 / (1 + np.exp(-logits))).tolist()
+
+    def __call__(self, inputs, truncation=False, max_length=None, batch_size=1, **kwargs):
+        single = isinstance(inputs, str)
+        texts = [inputs] if single else list(inputs)
+
+        results = []
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start+batch_size]
+            probs = self.classify_ids([self.encode(t, truncation) or [0] for t in chunk])
+            for p in probs:
+                if p >= 0.5:
+                    results.append({"label": "LABEL_1", "score": p})
+                else:
+                    results.append({"label": "LABEL_0", "score": 1 - p})
+
+        return results
@@ -0,0 +1,438 @@
+"""先用便宜的模型判斷：風格 / 統計特徵 + 校準過的邏輯迴歸，有把握的視窗不必經過 transformer
+
+- extract_features()：以 NumPy 一次計算整批視窗的特徵（句長變異、type-token ratio、標點分布……）
+- CascadeModel：標準化 + 邏輯迴歸 + Platt 校準，輸出「完整模型會判為 AI」的機率 p
+- CascadeClassifier：包住 clf，p > high 直接判為 AI、p < low 直接判為人類，
+  其餘視窗才送進完整模型；介面與 backends.Backend 相同，可直接取代 clf
+
+訓練標籤是完整模型在同一批視窗上的判定（分數 > 0.5），因此報告中的一致率就是與完整模型的
+一致率。被前置模型判定的視窗，分數為校準資料中同一判定的視窗在完整模型上的平均分數，
+整體分數的彙整方式不受影響。
+
+用法：
+    python cascade.py train corpus.jsonl --output cascade.json --target-agreement 0.99
+    python cascade.py evaluate heldout.jsonl --cascade cascade.json --low 0.02 --high 0.98
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+from itertools import islice
+
+import numpy as np
+
+from backends import BACKENDS
+from detector import (BATCH_SIZE, MODEL_NAME, MODES, WINDOW_TOKENS, build_windows, classify_ids, load_model,
+                      score_windows, to_ai_score)
+from metrics import METRICS
+
+FEATURES = (
+    "log_chars", "log_words", "mean_word_length", "type_token_ratio",
+    "sentence_length_mean", "sentence_length_std", "comma_rate", "period_rate", "question_exclaim_rate",
+    "colon_semicolon_rate", "quote_paren_rate", "dash_rate", "digit_rate", "upper_rate",
+    "newline_rate", "bullet_line_rate", "cjk_rate",
+)
+TARGET_AGREEMENT = 0.99
+L2_PENALTY = 1.0
+FIT_ITERATIONS = 25
+
+# 字元類別（含全形標點）
+SENTENCE_ENDS = ".!?。！？"
+PUNCTUATION = {
+    "comma": ",，、",
+    "period": ".。",
+    "question_exclaim": "!?！？",
+    "colon_semicolon": ":;：；",
+    "quote_paren": "\"'()[]“”‘’「」『』（）【】",
+    "dash": "-–—",
+}
+BULLETS = "-*•·"
+NOT_WORD = "".join(PUNCTUATION.values()) + BULLETS + " \t\r\n\u3000\xa0"
+WORD_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]|[^\W\u3400-\u9fff\uf900-\ufaff]+')
+
+
+def codes(chars):
+    return np.array([ord(c) for c in chars], dtype=np.uint32)
+
+
+def sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -30, 30)))
+
+
+def extract_features(texts):
+    """整批視窗的特徵矩陣（len(texts) × len(FEATURES)，float64）
+
+    所有視窗接成一個字碼陣列，字元類別、詞與句子的計數都以 bincount 依視窗彙整；
+    只有 type-token ratio 需要逐個視窗取詞集合。
+    """
+    n = len(texts)
+    lengths = np.array([len(t) for t in texts], dtype=np.int64)
+    cps = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    if not len(cps):
+        return np.zeros((n, len(FEATURES)))
+    owner = np.repeat(np.arange(n), lengths)
+    first = np.zeros(len(cps), dtype=bool)
+    first[(np.cumsum(lengths) - lengths)[lengths > 0]] = True
+
+    def per_text(mask, weights=None):
+        return np.bincount(owner[mask], weights=None if weights is None else weights[mask], minlength=n)
+
+    chars = np.maximum(lengths, 1).astype(np.float64)
+    is_cjk = ((cps >= 0x3400) & (cps <= 0x9FFF)) | ((cps >= 0xF900) & (cps <= 0xFAFF))
+    is_newline = cps == 10
+    is_word = ~np.isin(cps, codes(NOT_WORD)) & ~np.isin(cps, codes(SENTENCE_ENDS))
+    # 詞的開頭：前一個字元不是詞的一部分；中文每個字都是一個詞
+    prev_word = np.concatenate(([False], is_word[:-1])) & ~first
+    word_start = is_word & (~prev_word | is_cjk)
+    words = per_text(word_start).astype(np.float64)
+
+    # 句子：遇到句尾標點或視窗開頭即開始新的一句，依視窗彙整每句的詞數
+    sentence = np.cumsum(np.isin(cps, codes(SENTENCE_ENDS)) | first) - 1
+    sentence_words = np.bincount(sentence[word_start], minlength=sentence[-1] + 1)
+    sentence_owner = np.zeros(len(sentence_words), dtype=np.int64)
+    sentence_owner[sentence] = owner
+    has_words = sentence_words > 0
+    n_sentences = np.maximum(np.bincount(sentence_owner[has_words], minlength=n), 1)
+    sentence_sum = np.bincount(sentence_owner[has_words], weights=sentence_words[has_words], minlength=n)
+    sentence_sq = np.bincount(sentence_owner[has_words], weights=sentence_words[has_words] ** 2, minlength=n)
+    sentence_mean = sentence_sum / n_sentences
+    sentence_std = np.sqrt(np.maximum(sentence_sq / n_sentences - sentence_mean ** 2, 0))
+
+    # 條列：行首（略過空白）為項目符號
+    line_start = first | np.concatenate(([False], is_newline[:-1]))
+    bullets = per_text(line_start & np.isin(cps, codes(BULLETS)))
+    lines = np.maximum(per_text(line_start), 1)
+
+    ttr = np.array([len(set(w)) / len(w) if w else 0.0
+                    for w in (WORD_PATTERN.findall(t.lower()) for t in texts)])
+    columns = {
+        "log_chars": np.log1p(lengths),
+        "log_words": np.log1p(words),
+        "mean_word_length": per_text(is_word) / np.maximum(words, 1),
+        "type_token_ratio": ttr,
+        "sentence_length_mean": sentence_mean,
+        "sentence_length_std": sentence_std,
+        "digit_rate": per_text((cps >= 48) & (cps <= 57)) / chars,
+        "upper_rate": per_text((cps >= 65) & (cps <= 90)) / chars,
+        "newline_rate": per_text(is_newline) / chars,
+        "bullet_line_rate": bullets / lines,
+        "cjk_rate": per_text(is_cjk) / chars,
+    }
+    for name, marks in PUNCTUATION.items():
+        columns[f"{name}_rate"] = per_text(np.isin(cps, codes(marks))) / chars
+    return np.column_stack([columns[name] for name in FEATURES]).astype(np.float64)
+
+
+# 模型
+def fit_logistic(x, y, l2=L2_PENALTY, iterations=FIT_ITERATIONS):
+    """以 Newton 法（IRLS）訓練帶 L2 的邏輯迴歸，回傳 (權重, 截距)"""
+    design = np.column_stack([x, np.ones(len(x))])
+    penalty = np.full(design.shape[1], l2)
+    penalty[-1] = 0.0  # 截距不加懲罰
+    theta = np.zeros(design.shape[1])
+    for _ in range(iterations):
+        p = sigmoid(design @ theta)
+        gradient = design.T @ (p - y) + penalty * theta
+        hessian = (design * (p * (1 - p))[:, None]).T @ design + np.diag(penalty + 1e-9)
+        step = np.linalg.solve(hessian, gradient)
+        theta -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    return theta[:-1], theta[-1]
+
+
+def choose_threshold(p, agree, target, floor=0.5):
+    """由高往低加入視窗，回傳讓 p > 門檻的視窗與完整模型一致率仍 ≥ target 的最低門檻（不低於 floor；沒有則為 1.0）"""
+    order = np.argsort(-p, kind="stable")
+    p_sorted = p[order]
+    precision = np.cumsum(agree[order]) / np.arange(1, len(p) + 1)
+    # 取前 k 個時門檻為第 k+1 個的分數；同分時不能切開，p > 門檻才恰好是前 k 個
+    thresholds = np.append(p_sorted[1:], floor)
+    valid = np.flatnonzero((precision >= target) & (p_sorted > thresholds) & (thresholds >= floor))
+    if not len(valid):
+        return 1.0
+    return float(thresholds[valid.max()])
+
+
+class CascadeModel:
+    """標準化 → 邏輯迴歸 → Platt 校準；low / high 為直接判定的門檻"""
+
+    def __init__(self, mean, scale, weights, bias, calibration=(1.0, 0.0), low=0.0, high=1.0,
+                 ai_score=1.0, human_score=0.0, info=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.calibration = tuple(calibration)
+        self.low, self.high = low, high
+        self.ai_score, self.human_score = ai_score, human_score
+        self.info = info or {}
+
+    @classmethod
+    def fit(cls, x, scores, x_calibration, scores_calibration, target_agreement=TARGET_AGREEMENT, l2=L2_PENALTY):
+        """以訓練集擬合，校準集做 Platt 校準、依 target_agreement 選門檻並取得直接判定時的分數"""
+        labels, labels_calibration = scores > 0.5, scores_calibration > 0.5
+        mean, scale = x.mean(axis=0), x.std(axis=0)
+        scale[scale == 0] = 1.0
+        weights, bias = fit_logistic((x - mean) / scale, labels, l2)
+        model = cls(mean, scale, weights, bias)
+        a, b = fit_logistic(model.logit(x_calibration)[:, None], labels_calibration, l2=0.0)
+        model.calibration = (float(a[0]), float(b))
+        p = model.predict_proba(x_calibration)
+        model.high = choose_threshold(p, labels_calibration, target_agreement)
+        model.low = 1 - choose_threshold(1 - p, ~labels_calibration, target_agreement)
+        ai, human = model.decide(p)
+        if ai.any():
+            model.ai_score = float(scores_calibration[ai].mean())
+        if human.any():
+            model.human_score = float(scores_calibration[human].mean())
+        return model
+
+    def logit(self, x):
+        return ((x - self.mean) / self.scale) @ self.weights + self.bias
+
+    def predict_proba(self, x):
+        a, b = self.calibration
+        return sigmoid(a * self.logit(x) + b)
+
+    def decide(self, p, low=None, high=None):
+        """回傳 (直接判為 AI, 直接判為人類) 兩個布林陣列"""
+        low = self.low if low is None else low
+        high = self.high if high is None else high
+        return p > high, p < low
+
+    def predict(self, x, low=None, high=None):
+        """回傳 (分數, 是否已判定)；未判定的視窗分數為 NaN，需交給完整模型"""
+        ai, human = self.decide(self.predict_proba(x), low, high)
+        scores = np.where(ai, self.ai_score, np.where(human, self.human_score, np.nan))
+        return scores, ai | human
+
+    # 存檔
+    def to_dict(self):
+        return {
+            "features": list(FEATURES), "mean": self.mean.tolist(), "scale": self.scale.tolist(),
+            "weights": self.weights.tolist(), "bias": self.bias, "calibration": list(self.calibration),
+            "low": self.low, "high": self.high, "ai_score": self.ai_score, "human_score": self.human_score,
+            "info": self.info,
+        }
+
+    def check_windows(self, mode, window_tokens=WINDOW_TOKENS):
+        """特徵（長度、句子統計）取決於視窗形狀，門檻只對訓練時的分析模式與視窗長度成立"""
+        trained_mode = self.info.get("mode")
+        if trained_mode is None:
+            return
+        if mode != trained_mode:
+            raise ValueError(f"Cascade prefilter was trained on {trained_mode!r} windows, not {mode!r}; "
+                             f"retrain it with --mode {mode}")
+        trained_tokens = self.info.get("window_tokens", WINDOW_TOKENS)
+        if mode != "words" and window_tokens != trained_tokens:
+            raise ValueError(f"Cascade prefilter was trained on {trained_tokens}-token windows, not {window_tokens}; "
+                             f"retrain it with --window-tokens {window_tokens}")
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path, low=None, high=None):
+        """讀取模型；low / high 不為 None 時覆寫存檔中的門檻"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["features"] != list(FEATURES):
+            raise ValueError(f"{path} was trained with different features; retrain it with this version")
+        return cls(data["mean"], data["scale"], data["weights"], data["bias"], data["calibration"],
+                   data["low"] if low is None else low, data["high"] if high is None else high,
+                   data["ai_score"], data["human_score"], data.get("info"))
+
+
+class CascadeClassifier:
+    """包住 clf：前置模型有把握的視窗直接回傳，其餘才送進完整模型"""
+
+    def __init__(self, clf, tokenizer, model):
+        self.clf = clf
+        self.tokenizer = tokenizer
+        self.model = model
+
+    def _route(self, texts, full_scores):
+        """前置模型判定有把握的視窗，其餘以 full_scores(索引) 取得完整模型分數"""
+        if not texts:
+            return []
+        with METRICS.span("cascade"):
+            scores, decided = self.model.predict(extract_features(texts))
+        uncertain = np.flatnonzero(~decided).tolist()
+        scores = scores.tolist()
+        METRICS.increment("cascade_windows_total", len(texts) - len(uncertain), route="prefilter")
+        METRICS.increment("cascade_windows_total", len(uncertain), route="model")
+        if uncertain:
+            for i, score in zip(uncertain, full_scores(uncertain)):
+                scores[i] = float(score)
+        return scores
+
+    def classify(self, texts):
+        texts = list(texts)
+        return self._route(texts, lambda idx: [
+            to_ai_score(result) for result in self.clf([texts[i] for i in idx], truncation=True, batch_size=len(idx))])
+
+    def classify_ids(self, id_lists):
+        texts = self.tokenizer.batch_decode(id_lists, skip_special_tokens=True) if id_lists else []
+        return self._route(texts, lambda idx: classify_ids(self.clf, self.tokenizer, [id_lists[i] for i in idx]))
+
+    def __call__(self, inputs, truncation=True, max_length=None, batch_size=None, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        batch_size = batch_size or len(texts) or 1
+        scores = []
+        for start in range(0, len(texts), batch_size):
+            scores.extend(self.classify(texts[start:start+batch_size]))
+        return [{"label": "LABEL_1", "score": score} for score in scores]
+
+
+def cascade_classifier(clf, tokenizer, path, low=None, high=None, mode=None, window_tokens=WINDOW_TOKENS):
+    """有指定模型檔時回傳 CascadeClassifier，否則原樣回傳 clf；指定 mode 時檢查與訓練時的視窗相同"""
+    if not path:
+        return clf
+    model = CascadeModel.load(path, low, high)
+    if mode is not None:
+        model.check_windows(mode, window_tokens)
+    return CascadeClassifier(clf, tokenizer, model)
+
+
+def cascade_fingerprint(path, low=None, high=None):
+    """模型檔內容與門檻的雜湊；重新訓練或調整門檻後，快取的分數不會被沿用"""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read())
+    digest.update(f"{low}:{high}".encode())
+    return digest.hexdigest()[:16]
+
+
+# 訓練資料與報告
+def window_texts(text, windows, tokenizer, mode):
+    """前置模型在推論時看到的文字：token 視窗為解碼後的文字，words 視窗為正規化後的片段"""
+    if mode in ("tokens", "sentences"):
+        return tokenizer.batch_decode([w.input_ids for w in windows], skip_special_tokens=True)
+    return [" ".join(text[w.start:w.end].split()) for w in windows]
+
+
+def collect_windows(documents, clf, tokenizer, mode="sentences", batch_size=BATCH_SIZE, window_tokens=WINDOW_TOKENS):
+    """以完整模型評分每篇文件的視窗，回傳 (特徵, 完整模型分數, 文件編號)"""
+    features, scores, owners = [], [], []
+    for doc_index, (_, text) in enumerate(documents):
+        windows = build_windows(text, tokenizer, mode, window_tokens=window_tokens, stride=window_tokens // 2)
+        if not windows:
+            continue
+        _, window_scores = score_windows(text, windows, clf, tokenizer, mode, batch_size)
+        features.append(extract_features(window_texts(text, windows, tokenizer, mode)))
+        scores.extend(window_scores)
+        owners.extend([doc_index] * len(windows))
+    if not features:
+        raise ValueError("No windows found in the corpus")
+    return np.vstack(features), np.array(scores), np.array(owners)
+
+
+def split_documents(owners, fractions, seed=0):
+    """依文件（不是視窗）隨機分組，同一篇的視窗不會同時出現在訓練與評估資料"""
+    docs = np.unique(owners)
+    np.random.RandomState(seed).shuffle(docs)
+    bounds = (np.cumsum(fractions) * len(docs)).round().astype(int)
+    return [np.isin(owners, part) for part in np.split(docs, bounds[:-1])]
+
+
+def evaluate(model, x, scores, owners, low=None, high=None):
+    """前置模型在一組視窗上的表現：略過比例、被略過視窗與完整模型的一致率、整體分數誤差"""
+    labels = scores > 0.5
+    ai, human = model.decide(model.predict_proba(x), low, high)
+    decided = ai | human
+    cascade_scores = np.where(ai, model.ai_score, np.where(human, model.human_score, scores))
+    # 每篇文件的整體分數（視窗平均）與只用完整模型時的差距
+    docs, doc_index = np.unique(owners, return_inverse=True)
+    counts = np.bincount(doc_index)
+    full_overall = np.bincount(doc_index, weights=scores) / counts
+    cascade_overall = np.bincount(doc_index, weights=cascade_scores) / counts
+    agreeing = (ai & labels) | (human & ~labels)
+    return {
+        "windows": int(len(scores)),
+        "documents": int(len(docs)),
+        "low": model.low if low is None else low,
+        "high": model.high if high is None else high,
+        "skipped_fraction": float(decided.mean()),
+        "skipped_ai": int(ai.sum()),
+        "skipped_human": int(human.sum()),
+        "agreement_skipped": float(agreeing.sum() / decided.sum()) if decided.any() else 1.0,
+        "agreement_overall": float((agreeing.sum() + (~decided).sum()) / len(scores)),
+        "overall_score_mae": float(np.abs(full_overall - cascade_overall).mean()),
+        "label_flips": int(((full_overall > 0.5) != (cascade_overall > 0.5)).sum()),
+    }
+
+
+def print_report(name, report):
+    print(f"{name}: {report['windows']} windows in {report['documents']} documents, "
+          f"thresholds low={report['low']:.3f} high={report['high']:.3f}")
+    print(f"  skipped {report['skipped_fraction']:.1%} of windows "
+          f"({report['skipped_ai']} as AI, {report['skipped_human']} as human)")
+    print(f"  agreement with the full model: {report['agreement_skipped']:.2%} on skipped windows, "
+          f"{report['agreement_overall']:.2%} overall")
+    print(f"  document score MAE {report['overall_score_mae']:.4f}, "
+          f"{report['label_flips']} document label flips")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train or evaluate the cheap-first cascade prefilter.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("train", "fit the prefilter on windows scored by the full model"),
+                            ("evaluate", "report skip rate and agreement of a trained prefilter")):
+        command = sub.add_parser(name, help=help_text)
+        command.add_argument("input", help="JSONL file or directory of .txt/.md files")
+        command.add_argument("--model", default=MODEL_NAME, help="model name or local model directory")
+        command.add_argument("--backend", choices=BACKENDS, default="pytorch")
+        command.add_argument("--mode", choices=[m for m in MODES if m != "adaptive"], default="sentences")
+        command.add_argument("--window-tokens", type=int, default=WINDOW_TOKENS,
+                             help="token window length (tokens / sentences modes)")
+        command.add_argument("--batch-size", type=int, default=32)
+        command.add_argument("--limit", type=int, help="use only the first N documents")
+        command.add_argument("--low", type=float, help="decide 'human' below this probability")
+        command.add_argument("--high", type=float, help="decide 'AI' above this probability")
+        command.add_argument("--report", help="write the held-out report to this JSON file")
+    train = sub.choices["train"]
+    train.add_argument("--output", required=True, help="cascade model JSON file")
+    train.add_argument("--target-agreement", type=float, default=TARGET_AGREEMENT,
+                       help="agreement with the full model required on skipped calibration windows")
+    train.add_argument("--holdout", type=float, default=0.2, help="fraction of documents held out for the report")
+    train.add_argument("--calibration", type=float, default=0.2, help="fraction of documents used for calibration")
+    sub.choices["evaluate"].add_argument("--cascade", required=True, help="cascade model JSON file")
+    args = parser.parse_args(argv)
+
+    from batch_score import iter_documents
+
+    clf, tokenizer = load_model(args.model, args.backend)
+    documents = islice(iter_documents(args.input), args.limit)
+    x, scores, owners = collect_windows(documents, clf, tokenizer, args.mode, args.batch_size, args.window_tokens)
+
+    if args.command == "train":
+        train_mask, calibration_mask, holdout_mask = split_documents(
+            owners, (1 - args.holdout - args.calibration, args.calibration, args.holdout))
+        model = CascadeModel.fit(x[train_mask], scores[train_mask], x[calibration_mask], scores[calibration_mask],
+                                 args.target_agreement)
+        if args.low is not None:
+            model.low = args.low
+        if args.high is not None:
+            model.high = args.high
+        report = evaluate(model, x[holdout_mask], scores[holdout_mask], owners[holdout_mask])
+        model.info = {"model": args.model, "backend": args.backend, "mode": args.mode,
+                      "window_tokens": args.window_tokens,
+                      "target_agreement": args.target_agreement, "holdout": report}
+        model.save(args.output)
+        print(f"Saved {args.output}", file=sys.stderr)
+        print_report("held-out", report)
+    else:
+        model = CascadeModel.load(args.cascade, args.low, args.high)
+        model.check_windows(args.mode, args.window_tokens)
+        report = evaluate(model, x, scores, owners)
+        print_report(args.input, report)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
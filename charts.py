@@ -0,0 +1,142 @@
+"""分析報告的 Plotly 圖表（不依賴 Streamlit，可單獨匯入與量測）"""
+import numpy as np
+import plotly.graph_objects as go
+
+
+# 創建圓環圖
+def create_donut_chart(ai_percentage):
+    """創建類似參考圖的圓環圖"""
+    # 只顯示 AI 部分為紅色漸層，其餘為淺灰
+    labels = ['AI Generated', 'Human Written']
+    values = [ai_percentage, 100 - ai_percentage]
+    
+    # 使用漸層紅色和淺灰色
+    if ai_percentage > 0:
+        colors = ['#fd373b', '#f0f0f0']
+    else:
+        colors = ['#f0f0f0', '#4ade80']
+    
+    fig = go.Figure(data=[go.Pie(
+        labels=labels,
+        values=values,
+        hole=.75,
+        marker=dict(
+            colors=colors,
+            line=dict(color='#ffffff', width=3)
+        ),
+        textinfo='none',
+        hovertemplate='<b>%{label}</b><br>%{value:.1f}%<extra></extra>'
+    )])
+    
+    fig.update_layout(
+        annotations=[dict(
+            text=f'{ai_percentage:.0f}%',
+            x=0.5, y=0.5,
+            font_size=36,
+            font=dict(color='#fd373b', family="Arial", weight=700),
+            showarrow=False
+        ), dict(
+            text='AI Content',
+            x=0.5, y=0.42,
+            font_size=14,
+            font=dict(color='#999'),
+            showarrow=False
+        )],
+        showlegend=False,
+        paper_bgcolor='rgba(255,255,255,0)',
+        plot_bgcolor='rgba(255,255,255,0)',
+        margin=dict(t=10, b=10, l=10, r=10),
+        height=200
+    )
+    
+    return fig
+
+# 創建分數時間軸
+def create_timeline_chart(buckets, length):
+    """整篇（或放大的區段）分數時間軸：每桶一條由最低到最高分數的長條，折線為平均分數
+
+    buckets 為 visualize.score_buckets() 的結果，length 為原文字元數；長條可點選或框選以放大該區段。
+    """
+    length = max(length, 1)
+    middle = (buckets["start"] + buckets["end"]) / 2 / length * 100
+    width = np.maximum((buckets["end"] - buckets["start"]) / length * 100, 0.1)
+    low, high, mean = buckets["min"] * 100, buckets["max"] * 100, buckets["mean"] * 100
+    customdata = np.column_stack([buckets["first"] + 1, buckets["last"], low, high, mean])
+
+    fig = go.Figure()
+    # 最低到最高分數（至少 2% 高，分數一致時仍看得見）
+    fig.add_trace(go.Bar(
+        x=middle,
+        y=np.maximum(high - low, 2),
+        base=np.minimum(low, 98),
+        width=width,
+        marker=dict(color=high, colorscale=[[0, '#4ade80'], [0.5, '#f5c542'], [1, '#fd373b']], cmin=0, cmax=100),
+        customdata=customdata,
+        hovertemplate='<b>Segments %{customdata[0]:d}–%{customdata[1]:d}</b><br>'
+                      'Max %{customdata[3]:.1f}% · Mean %{customdata[4]:.1f}% · Min %{customdata[2]:.1f}%'
+                      '<extra></extra>'
+    ))
+    fig.add_trace(go.Scatter(
+        x=middle, y=mean, mode='lines', line=dict(color='#333', width=1), hoverinfo='skip'
+    ))
+    fig.add_hline(y=50, line=dict(color='#999', dash='dash', width=1))
+
+    fig.update_layout(
+        xaxis_title="Position in document (%)",
+        yaxis_title="AI Probability (%)",
+        paper_bgcolor='#ffffff',
+        plot_bgcolor='#f8f8f8',
+        font=dict(color='#333'),
+        xaxis=dict(gridcolor='#e0e0e0'),
+        yaxis=dict(gridcolor='#e0e0e0', range=[0, 100]),
+        showlegend=False,
+        bargap=0,
+        clickmode='event+select',
+        dragmode='select',
+        margin=dict(l=0, r=0, t=30, b=0),
+        height=400
+    )
+    
+    return fig
+
+
+# 創建內容分類圓環圖
+def create_classification_chart(values, ai_percentage):
+    """四類內容比例（Identical / Minor changes / Paraphrased / Unique text），中央顯示 AI 比例"""
+    labels = ['Identical', 'Minor changes', 'Paraphrased', 'Unique text']
+    colors = ['#e74c3c', '#f39c12', '#3498db', '#2ecc71']
+    
+    fig = go.Figure(data=[go.Pie(
+        labels=labels,
+        values=values,
+        hole=.65,
+        marker=dict(
+            colors=colors,
+            line=dict(color='#ffffff', width=2)
+        ),
+        textinfo='none',
+        hovertemplate='<b>%{label}</b><br>%{value}%<extra></extra>'
+    )])
+    
+    fig.update_layout(
+        showlegend=False,
+        paper_bgcolor='rgba(245,245,245,0)',
+        plot_bgcolor='rgba(245,245,245,0)',
+        margin=dict(t=0, b=0, l=0, r=0),
+        height=200,
+        annotations=[dict(
+            text=f'{ai_percentage:.0f}%',
+            x=0.5, y=0.55,
+            font_size=32,
+            font=dict(color='#1a1a1a', weight=700),
+            showarrow=False
+        ), dict(
+            text='AI Generated Text',
+            x=0.5, y=0.42,
+            font_size=12,
+            font=dict(color='#666'),
+            showarrow=False
+        )]
+    )
+    
+    return fig
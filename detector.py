@@ -0,0 +1,559 @@
+"""AI 文字偵測的核心分析邏輯（不依賴 Streamlit，可單獨匯入）"""
+import math
+import re
+from collections import namedtuple
+
+from metrics import METRICS
+
+MODEL_NAME = "AICodexLab/answerdotai-ModernBERT-base-ai-detector"
+
+# 分段參數
+SEGMENT_SIZE = 50
+MIN_SEGMENT_WORDS = 10
+BATCH_SIZE = 16
+
+# token 視窗參數（模型上限 512，需保留 [CLS]/[SEP] 兩個位置）
+WINDOW_TOKENS = 128
+WINDOW_STRIDE = 64
+MIN_WINDOW_TOKENS = 16
+
+# 自適應模式：先以大區塊評分，只細分不確定或與鄰居不一致的區塊
+ADAPTIVE_BLOCK_TOKENS = 510
+ADAPTIVE_UNCERTAINTY = 0.2   # 分數距離 0.5 小於此值視為不確定
+ADAPTIVE_DISAGREEMENT = 0.3  # 與相鄰區塊分數差超過此值視為不一致
+
+MODES = ("words", "tokens", "sentences", "adaptive")
+AGGREGATIONS = ("mean", "length_weighted", "logit_mean", "max_k")
+
+# 一個分析視窗：原文中的字元位置、長度（字數或 token 數）與 token id
+Window = namedtuple("Window", ["start", "end", "size", "input_ids"], defaults=[None])
+
+
+def load_model(model_name=MODEL_NAME, backend="pytorch"):
+    """載入模型，回傳 (clf, tokenizer)；backend 可為 pytorch、int8、onnx"""
+    from backends import load_backend
+
+    return load_backend(backend, model_name)
+
+
+def to_ai_score(result):
+    """將 pipeline 輸出轉換為 AI 機率"""
+    is_ai = result["label"].endswith("1")
+    return result["score"] if is_ai else 1 - result["score"]
+
+
+def ai_label_index(model):
+    """找出模型輸出中代表 AI（label 結尾為 1）的欄位（可傳入模型或其 config）"""
+    config = getattr(model, "config", model)
+    for index, label in config.id2label.items():
+        if str(label).endswith("1"):
+            return int(index)
+    return 1
+
+
+# 切分文字片段
+def word_windows(text, segment_size=SEGMENT_SIZE):
+    """將文字切成 50% 重疊的字詞視窗"""
+    words = [m.span() for m in re.finditer(r'\S+', text)]
+    windows = []
+
+    for i in range(0, len(words), segment_size//2):  # 重疊分段
+        window = words[i:i+segment_size]
+        if len(window) < MIN_SEGMENT_WORDS:  # 太短的片段跳過
+            continue
+        windows.append(Window(window[0][0], window[-1][1], len(window)))
+
+    return windows
+
+
+def split_segments(text, segment_size=SEGMENT_SIZE):
+    """回傳每個字詞視窗以單一空白重新連接的文字"""
+    return [' '.join(text[w.start:w.end].split()) for w in word_windows(text, segment_size)]
+
+
+def token_windows(text, tokenizer, window_tokens=WINDOW_TOKENS, stride=WINDOW_STRIDE):
+    """整篇文字只 tokenize 一次，再依 stride 直接從 input ids 切出視窗"""
+    ids, offsets = tokenize_with_offsets(text, tokenizer)
+    windows = []
+
+    for i in range(0, len(ids), stride):
+        window_ids = ids[i:i+window_tokens]
+        # 太短的尾端視窗跳過（整篇都很短時仍保留一個視窗）
+        if len(window_ids) < MIN_WINDOW_TOKENS and windows:
+            break
+        windows.append(Window(offsets[i][0], offsets[i+len(window_ids)-1][1], len(window_ids), window_ids))
+        if i + window_tokens >= len(ids):  # 已涵蓋到結尾
+            break
+
+    return windows
+
+
+def tokenize_with_offsets(text, tokenizer):
+    """整篇 tokenize 一次（不含特殊 token），回傳 (input ids, 字元位置)"""
+    with METRICS.span("tokenize"):
+        encoding = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            verbose=False,
+        )
+    METRICS.increment("tokens_total", len(encoding["input_ids"]))
+    return encoding["input_ids"], encoding["offset_mapping"]
+
+
+def sentence_windows(text, tokenizer, window_tokens=WINDOW_TOKENS):
+    """依句子與段落邊界（含中文標點）把整句裝進不超過 window_tokens 的不重疊視窗"""
+    from segmentation import pack_windows, sentence_boundaries
+
+    ids, offsets = tokenize_with_offsets(text, tokenizer)
+    return [
+        Window(offsets[i][0], offsets[j-1][1], j - i, ids[i:j])
+        for i, j in pack_windows(ids, offsets, sentence_boundaries(text), window_tokens)
+    ]
+
+
+# 批次推論
+def score_segments(segments, clf, batch_size=BATCH_SIZE, tokenizer=None):
+    """批次推論所有片段，回傳與輸入順序相同的 AI 機率
+
+    tokenizer 為 None 時使用 clf.tokenizer；兩者都沒有時以字元數近似 token 數。
+    """
+    if not segments:
+        return []
+
+    # 依 token 數排序後再分批，讓同一批的片段長度相近以減少 padding（字元數與 token 數的比例因語言與用字而異）
+    tokenizer = tokenizer or getattr(clf, "tokenizer", None)
+    if tokenizer is None:
+        lengths = [len(segment) for segment in segments]
+    else:
+        lengths = [len(tokenizer(segment, add_special_tokens=False)["input_ids"]) for segment in segments]
+    order = sorted(range(len(segments)), key=lambda i: lengths[i])
+    scores = [0.0] * len(segments)
+
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start+batch_size]
+        batch = [segments[i] for i in batch_idx]
+        with METRICS.span("inference"):
+            results = clf(batch, truncation=True, batch_size=len(batch))
+        METRICS.increment("segments_scored_total", len(batch))
+        for i, result in zip(batch_idx, results):
+            scores[i] = to_ai_score(result)
+
+    return scores
+
+
+def add_special_tokens(tokenizer, ids):
+    """為單一視窗加上 [CLS]/[SEP]"""
+    if hasattr(tokenizer, "build_inputs_with_special_tokens"):
+        return tokenizer.build_inputs_with_special_tokens(ids)
+    return [tokenizer.cls_token_id] + list(ids) + [tokenizer.sep_token_id]
+
+
+def classify_ids(clf, tokenizer, id_lists):
+    """將已 tokenize 的視窗直接送進模型，回傳 AI 機率"""
+    # 替身模型或其他後端可自行實作 classify_ids
+    if hasattr(clf, "classify_ids"):
+        return clf.classify_ids(id_lists)
+
+    import torch
+
+    model = clf.model
+    features = [{"input_ids": add_special_tokens(tokenizer, ids)} for ids in id_lists]
+    batch = tokenizer.pad(features, return_tensors="pt").to(model.device)
+    with torch.inference_mode():
+        logits = model(**batch).logits
+    return logits.softmax(dim=-1)[:, ai_label_index(model)].tolist()
+
+
+def score_token_windows(windows, clf, tokenizer, batch_size=BATCH_SIZE):
+    """批次推論 token 視窗，不再重新 tokenize"""
+    if not windows:
+        return []
+
+    order = sorted(range(len(windows)), key=lambda i: windows[i].size)
+    scores = [0.0] * len(windows)
+
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start+batch_size]
+        with METRICS.span("inference"):
+            probs = classify_ids(clf, tokenizer, [windows[i].input_ids for i in batch_idx])
+        METRICS.increment("segments_scored_total", len(batch_idx))
+        for i, prob in zip(batch_idx, probs):
+            scores[i] = float(prob)
+
+    return scores
+
+
+# 整體分數彙整
+def overlap_weights(spans):
+    """計算每個視窗的權重：重疊區域的字元平均分給涵蓋它的視窗，讓每個字元只算一次"""
+    boundaries = sorted({pos for span in spans for pos in span})
+    weights = [0.0] * len(spans)
+    if len(boundaries) < 2:
+        return weights
+
+    # 掃描每個基本區間，統計涵蓋它的視窗數
+    index = {pos: i for i, pos in enumerate(boundaries)}
+    coverage = [0] * len(boundaries)
+    for start, end in spans:
+        coverage[index[start]] += 1
+        coverage[index[end]] -= 1
+    running = 0
+    for i in range(len(coverage)):
+        running += coverage[i]
+        coverage[i] = running
+
+    for w, (start, end) in enumerate(spans):
+        for i in range(index[start], index[end]):
+            weights[w] += (boundaries[i+1] - boundaries[i]) / coverage[i]
+
+    return weights
+
+
+def aggregate_scores(scores, weights=None, strategy="length_weighted", k=3):
+    """將片段分數彙整為整篇 AI 機率"""
+    if not scores:
+        return 0.0
+    if weights is None or not any(weights):
+        weights = [1.0] * len(scores)
+
+    if strategy == "mean":
+        return sum(scores) / len(scores)
+    if strategy == "length_weighted":
+        return sum(s * w for s, w in zip(scores, weights)) / sum(weights)
+    if strategy == "logit_mean":
+        # 在 logit 空間平均，避免少數極端片段被 0~1 的線性平均稀釋
+        eps = 1e-6
+        logits = [math.log(min(max(s, eps), 1 - eps) / (1 - min(max(s, eps), 1 - eps))) for s in scores]
+        mean_logit = sum(x * w for x, w in zip(logits, weights)) / sum(weights)
+        return 1 / (1 + math.exp(-mean_logit))
+    if strategy == "max_k":
+        top = sorted(scores, reverse=True)[:k]
+        return sum(top) / len(top)
+
+    raise ValueError(f"Unknown aggregation strategy: {strategy!r} (expected one of {AGGREGATIONS})")
+
+
+# 分析文字片段
+def analyze_text_segments(text, clf, tokenizer, segment_size=SEGMENT_SIZE, batch_size=BATCH_SIZE):
+    """將文字分段並分析每段的 AI 機率"""
+    segments = split_segments(text, segment_size)
+    scores = score_segments(segments, clf, batch_size, tokenizer)
+    return segments, scores
+
+
+def cached_scores(payloads, score_fn, cache=None):
+    """查詢片段快取，只對未命中的片段呼叫 score_fn(索引列表)"""
+    if cache is None:
+        return score_fn(list(range(len(payloads))))
+
+    keys = [cache.segment_key(p) for p in payloads]
+    scores = cache.get_segments(keys)
+    missing = [i for i, s in enumerate(scores) if s is None]
+    METRICS.increment("cache_hits_total", len(payloads) - len(missing), level="segment")
+    METRICS.increment("cache_misses_total", len(missing), level="segment")
+    if missing:
+        fresh = score_fn(missing)
+        for i, score in zip(missing, fresh):
+            scores[i] = score
+        cache.put_segments([keys[i] for i in missing], fresh)
+    return scores
+
+
+def build_windows(text, tokenizer, mode="words", segment_size=SEGMENT_SIZE,
+                  window_tokens=WINDOW_TOKENS, stride=WINDOW_STRIDE):
+    """依分析模式切出視窗"""
+    with METRICS.span("segmentation"):
+        if mode == "tokens":
+            return token_windows(text, tokenizer, window_tokens, stride)
+        if mode == "sentences":
+            return sentence_windows(text, tokenizer, window_tokens)
+        if mode == "words":
+            return word_windows(text, segment_size)
+    raise ValueError(f"Unknown analysis mode: {mode!r} (expected one of {MODES})")
+
+
+def score_windows(text, windows, clf, tokenizer, mode="words", batch_size=BATCH_SIZE, cache=None):
+    """推論視窗（查詢片段快取），回傳片段文字與分數"""
+    if mode in ("tokens", "sentences"):
+        segments = [text[w.start:w.end] for w in windows]
+        scores = cached_scores(
+            ["tokens:" + ",".join(map(str, w.input_ids)) for w in windows],
+            lambda idx: score_token_windows([windows[i] for i in idx], clf, tokenizer, batch_size),
+            cache,
+        )
+    else:
+        segments = [' '.join(text[w.start:w.end].split()) for w in windows]
+        scores = cached_scores(
+            ["words:" + segment for segment in segments],
+            lambda idx: score_segments([segments[i] for i in idx], clf, batch_size, tokenizer),
+            cache,
+        )
+    return segments, scores
+
+
+# 自適應細分
+def needs_refinement(scores, k):
+    """區塊分數不確定或與相鄰區塊不一致時需要細分；回傳優先度（0 表示不需要）"""
+    uncertainty = ADAPTIVE_UNCERTAINTY - abs(scores[k] - 0.5)
+    neighbors = scores[max(k-1, 0):k] + scores[k+1:k+2]
+    disagreement = max((abs(scores[k] - s) for s in neighbors), default=0.0) - ADAPTIVE_DISAGREEMENT
+    return max(uncertainty, disagreement, 0.0)
+
+
+def adaptive_windows(text, clf, tokenizer, min_tokens=WINDOW_TOKENS, block_tokens=ADAPTIVE_BLOCK_TOKENS,
+                     budget=None, batch_size=BATCH_SIZE, cache=None):
+    """先以不重疊的大區塊評分，再逐輪把需要的區塊對半細分，直到區塊不超過 min_tokens
+    或推論次數用完 budget；回傳 (視窗, 片段文字, 分數)，視窗互不重疊且依文件順序排列
+
+    budget 為 None 時以固定 token 視窗模式所需的推論次數為上限，不會比它多。
+    """
+    ids, offsets = tokenize_with_offsets(text, tokenizer)
+    if not ids:
+        return [], [], []
+
+    def window(i, j):
+        return Window(offsets[i][0], offsets[j-1][1], j - i, ids[i:j])
+
+    # 平均切成不超過 block_tokens 的區塊，避免尾端出現過短的區塊
+    n_blocks = -(-len(ids) // block_tokens)
+    bounds = [len(ids) * b // n_blocks for b in range(n_blocks + 1)]
+    ranges = list(zip(bounds, bounds[1:]))
+    windows = [window(i, j) for i, j in ranges]
+    segments, scores = score_windows(text, windows, clf, tokenizer, "tokens", batch_size, cache)
+    if budget is None:
+        budget = len(range(0, len(ids), WINDOW_STRIDE))
+    used = len(windows)
+
+    while True:
+        # 每個細分花兩次推論；預算不足時先細分最不確定的區塊
+        candidates = [(needs_refinement(scores, k), k) for k, (i, j) in enumerate(ranges) if j - i > min_tokens]
+        # 初始區塊就已超過預算時不再細分
+        candidates = sorted((c for c in candidates if c[0] > 0), reverse=True)[:max(budget - used, 0) // 2]
+        if not candidates:
+            break
+        split = {k for _, k in candidates}
+        children = []
+        for k in sorted(split):
+            i, j = ranges[k]
+            children += [(i, (i + j) // 2), ((i + j) // 2, j)]
+        child_windows = [window(i, j) for i, j in children]
+        child_segments, child_scores = score_windows(text, child_windows, clf, tokenizer, "tokens", batch_size, cache)
+        used += len(children)
+
+        # 以子區塊取代被細分的區塊，維持文件順序
+        fresh = iter(zip(children, child_windows, child_segments, child_scores))
+        refined = ([], [], [], [])
+        for k, item in enumerate(zip(ranges, windows, segments, scores)):
+            for parts in ([next(fresh), next(fresh)] if k in split else [item]):
+                for column, value in zip(refined, parts):
+                    column.append(value)
+        ranges, windows, segments, scores = refined
+
+    return windows, segments, scores
+
+
+def overall_from_segments(text, spans, scores, clf, aggregation="length_weighted"):
+    """由片段分數彙整整體分數"""
+    if scores:
+        # 整體分數由所有片段彙整而來，涵蓋全文且不需額外的前向傳遞
+        return aggregate_scores(scores, overlap_weights(spans), aggregation)
+    if text.strip():
+        # 太短而沒有任何片段時，直接對全文推論一次
+        return to_ai_score(clf(text, truncation=True, max_length=512)[0])
+    return 0.0
+
+
+def document_settings(mode, segment_size, window_tokens, stride, aggregation, budget=None):
+    settings = {"mode": mode, "segment_size": segment_size, "window_tokens": window_tokens,
+                "stride": stride, "aggregation": aggregation}
+    if mode == "adaptive":
+        settings["budget"] = budget
+    return settings
+
+
+# 整篇分析
+def iter_analysis(text, clf, tokenizer, mode="words", segment_size=SEGMENT_SIZE,
+                  window_tokens=WINDOW_TOKENS, stride=WINDOW_STRIDE, batch_size=BATCH_SIZE,
+                  aggregation="length_weighted", cache=None, chunk_size=None, budget=None):
+    """依文件順序逐批推論，每完成 chunk_size 個視窗就產出 (已完成數, 總數, 目前結果)
+
+    chunk_size 為 None 時一次推論全部視窗，只產出最終結果。adaptive 模式的視窗數
+    要到細分結束才確定，因此只產出最終結果；window_tokens 為最細的區塊大小，
+    budget 為推論次數上限。
+    """
+    METRICS.increment("documents_total", mode=mode)
+    if cache is not None:
+        doc_key = cache.document_key(
+            text, document_settings(mode, segment_size, window_tokens, stride, aggregation, budget))
+        cached = cache.get_document(doc_key)
+        METRICS.increment("cache_hits_total" if cached is not None else "cache_misses_total", level="document")
+        if cached is not None:
+            cached["spans"] = [tuple(span) for span in cached["spans"]]
+            yield len(cached["scores"]), len(cached["scores"]), cached
+            return
+
+    if mode == "adaptive":
+        windows, segments, scores = adaptive_windows(text, clf, tokenizer, window_tokens, budget=budget,
+                                                     batch_size=batch_size, cache=cache)
+    else:
+        windows = build_windows(text, tokenizer, mode, segment_size, window_tokens, stride)
+        segments, scores = [], []
+    spans = [(w.start, w.end) for w in windows]
+    chunk_size = chunk_size or max(len(windows), 1)
+
+    for start in range(len(scores), len(windows), chunk_size):
+        chunk_segments, chunk_scores = score_windows(
+            text, windows[start:start+chunk_size], clf, tokenizer, mode, batch_size, cache)
+        segments.extend(chunk_segments)
+        scores.extend(chunk_scores)
+        if len(scores) < len(windows):
+            done = spans[:len(scores)]
+            yield len(scores), len(windows), {
+                "overall_score": aggregate_scores(scores, overlap_weights(done), aggregation),
+                "segments": list(segments),
+                "scores": list(scores),
+                "spans": done,
+            }
+
+    analysis = {
+        "overall_score": overall_from_segments(text, spans, scores, clf, aggregation),
+        "segments": segments,
+        "scores": scores,
+        "spans": spans,
+    }
+    if cache is not None:
+        cache.put_document(doc_key, analysis)
+    yield len(windows), len(windows), analysis
+
+
+def analyze_document(text, clf, tokenizer, mode="words", segment_size=SEGMENT_SIZE,
+                     window_tokens=WINDOW_TOKENS, stride=WINDOW_STRIDE, batch_size=BATCH_SIZE,
+                     aggregation="length_weighted", cache=None, budget=None):
+    """分析整篇文字，回傳整體分數、各片段文字、分數與其在原文中的字元位置"""
+    for _, _, analysis in iter_analysis(text, clf, tokenizer, mode, segment_size, window_tokens,
+                                        stride, batch_size, aggregation, cache, budget=budget):
+        pass
+    return analysis
+
+
+# 增量重新分析
+def common_prefix_length(a, b):
+    """以二分搜尋比較切片，找出共同前綴長度"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix_length(a, b, limit):
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a)-mid:] == b[len(b)-mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def changed_range(old_text, new_text):
+    """回傳修改範圍 (start, old_end, new_end)：old_text[start:old_end] 被換成 new_text[start:new_end]"""
+    start = common_prefix_length(old_text, new_text)
+    suffix = common_suffix_length(old_text, new_text, min(len(old_text), len(new_text)) - start)
+    return start, len(old_text) - suffix, len(new_text) - suffix
+
+
+def reanalysis_plan(text, previous_text, previous, mode="words"):
+    """增量重新分析的範圍：(delta, safe_start, safe_end, before, after, dropped)
+
+    before / after 為修改範圍前後可沿用的視窗索引，dropped 為需要重算的視窗索引。
+    沒有可沿用的結果、adaptive 模式或修改範圍太大（超過一半的視窗）時回傳 None，應整篇重算。
+    """
+    if not previous or not previous["spans"] or text == previous_text or mode == "adaptive":
+        return None
+
+    start, old_end, new_end = changed_range(previous_text, text)
+    delta = new_end - old_end
+
+    # 往外擴到空白處或中文句末標點之後（中文沒有空白），確保保留下來的視窗不會與被修改的字詞相連
+    from segmentation import CJK_SENTENCE_END
+
+    safe_start = max([previous_text.rfind(' ', 0, start), previous_text.rfind('\n', 0, start)]
+                     + [previous_text.rfind(mark, 0, start) + 1 for mark in CJK_SENTENCE_END])
+    ends = [previous_text.find(' ', old_end), previous_text.find('\n', old_end)]
+    ends += [i + 1 for i in (previous_text.find(mark, old_end) for mark in CJK_SENTENCE_END) if i >= 0]
+    safe_end = min([i for i in ends if i >= 0] + [len(previous_text)])
+
+    before, after, dropped = [], [], []
+    for i, (s, e) in enumerate(previous["spans"]):
+        if e <= safe_start:
+            before.append(i)
+        elif s >= safe_end:
+            after.append(i)
+        else:
+            dropped.append(i)
+
+    if len(dropped) > len(previous["spans"]) // 2:
+        return None
+    return delta, safe_start, safe_end, before, after, dropped
+
+
+def reanalyze_document(text, previous_text, previous, clf, tokenizer, mode="words",
+                       segment_size=SEGMENT_SIZE, window_tokens=WINDOW_TOKENS, stride=WINDOW_STRIDE,
+                       batch_size=BATCH_SIZE, aggregation="length_weighted", cache=None, budget=None):
+    """只重新推論與修改範圍重疊的視窗，其餘沿用上次的分數並平移字元位置
+
+    previous 必須是以相同設定對 previous_text 執行 analyze_document 的結果。
+    adaptive 模式的區塊劃分取決於整篇的分數，因此一律整篇重算（見 reanalysis_plan()）。
+    增量結果不寫入整篇文件快取。
+    """
+    plan = reanalysis_plan(text, previous_text, previous, mode)
+    if plan is None:
+        return dict(analyze_document(text, clf, tokenizer, mode, segment_size, window_tokens, stride, batch_size,
+                                     aggregation, cache, budget), rescored=None)
+
+    METRICS.increment("incremental_documents_total", mode=mode)
+    delta, safe_start, safe_end, before, after, dropped = plan
+
+    # 重新切分受影響的區域（新文字座標）
+    region_start = max(safe_start, 0)
+    region_end = safe_end + delta
+    if dropped:
+        region_start = min(region_start, previous["spans"][dropped[0]][0])
+        region_end = max(region_end, max(previous["spans"][i][1] for i in dropped) + delta)
+    region_end = min(region_end, len(text))
+
+    # 只保留與「沒有被保留視窗涵蓋的區間」重疊的新視窗
+    gap_start = max((previous["spans"][i][1] for i in before), default=0)
+    gap_end = min((previous["spans"][i][0] + delta for i in after), default=len(text))
+    region = text[region_start:region_end]
+    windows = [
+        w._replace(start=w.start + region_start, end=w.end + region_start)
+        for w in build_windows(region, tokenizer, mode, segment_size, window_tokens, stride)
+    ]
+    windows = [w for w in windows if w.end > gap_start and w.start < gap_end]
+    segments, scores = score_windows(text, windows, clf, tokenizer, mode, batch_size, cache)
+
+    spans = (
+        [previous["spans"][i] for i in before]
+        + [(w.start, w.end) for w in windows]
+        + [(previous["spans"][i][0] + delta, previous["spans"][i][1] + delta) for i in after]
+    )
+    scores = [previous["scores"][i] for i in before] + scores + [previous["scores"][i] for i in after]
+    segments = [previous["segments"][i] for i in before] + segments + [previous["segments"][i] for i in after]
+
+    analysis = {
+        "overall_score": overall_from_segments(text, spans, scores, clf, aggregation),
+        "segments": segments,
+        "scores": scores,
+        "spans": spans,
+    }
+    # 增量結果的視窗切法與整篇分析不同（分數只是近似），不存進整篇文件快取，以免之後的 analyze_document
+    # 以相同的鍵取回近似結果；新推論的視窗分數已由 score_windows 存進片段快取
+    return dict(analysis, rescored=len(windows))
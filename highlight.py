@@ -0,0 +1,97 @@
+"""以字元位置標註高 AI 分數的文字區段
+
+依分析結果的 spans（原文中的 (start, end) 位置）標註，不必在 HTML 中搜尋片段文字；
+重疊的視窗合併成連續區間，每個位置取覆蓋它的最高分數等級，最後一次線性輸出並跳脫 HTML。
+也可以只輸出原文的一段（分頁顯示時只送出目前這一頁）。
+"""
+import html
+
+HIGHLIGHT_THRESHOLD = 0.7
+MIN_HIGHLIGHT_CHARS = 20
+
+# 分數等級（由高到低）：(下限, CSS class)
+HIGHLIGHT_BANDS = (
+    (0.9, "ai-highlight ai-highlight-high"),
+    (0.8, "ai-highlight ai-highlight-mid"),
+    (HIGHLIGHT_THRESHOLD, "ai-highlight ai-highlight-low"),
+)
+
+
+def score_band(score):
+    """分數對應的等級索引（0 為最高）；低於門檻回傳 None"""
+    for band, (lower, _) in enumerate(HIGHLIGHT_BANDS):
+        if score >= lower:
+            return band
+    return None
+
+
+def highlight_intervals(spans, scores, threshold=HIGHLIGHT_THRESHOLD, min_chars=MIN_HIGHLIGHT_CHARS):
+    """將高分視窗合併成不重疊的 (start, end, band) 區間，依位置排序
+
+    重疊處取最高等級；相鄰且同等級的區間合併為一段。
+    """
+    events = []
+    for (start, end), score in zip(spans, scores):
+        if score <= threshold or end - start <= min_chars:
+            continue
+        band = score_band(score)
+        events.append((start, 1, band))
+        events.append((end, -1, band))
+    if not events:
+        return []
+    events.sort()
+
+    # 掃描線：記錄目前每個等級有幾個視窗覆蓋
+    active = [0] * len(HIGHLIGHT_BANDS)
+    intervals = []
+    position = events[0][0]
+    for offset, delta, band in events:
+        if offset > position:
+            current = next((b for b, count in enumerate(active) if count), None)
+            if current is not None:
+                if intervals and intervals[-1][1] == position and intervals[-1][2] == current:
+                    intervals[-1] = (intervals[-1][0], offset, current)
+                else:
+                    intervals.append((position, offset, current))
+            position = offset
+        active[band] += delta
+    return intervals
+
+
+def escape_text(text):
+    """跳脫 HTML 並保留換行"""
+    return html.escape(text).replace("\n", "<br>")
+
+
+def first_interval_after(intervals, position):
+    """第一個結束位置大於 position 的區間索引（區間不重疊且依位置排序，結束位置也是遞增的）"""
+    lo, hi = 0, len(intervals)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if intervals[mid][1] <= position:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def highlight_range_html(text, intervals, start=0, end=None):
+    """只輸出原文 [start, end) 的標註 HTML；intervals 為 highlight_intervals() 的結果"""
+    end = len(text) if end is None else end
+    parts = []
+    position = start
+    for i in range(first_interval_after(intervals, start), len(intervals)):
+        lo, hi, band = intervals[i]
+        if lo >= end:
+            break
+        lo, hi = max(lo, start), min(hi, end)
+        parts.append(escape_text(text[position:lo]))
+        parts.append(f'<span class="{HIGHLIGHT_BANDS[band][1]}">{escape_text(text[lo:hi])}</span>')
+        position = hi
+    parts.append(escape_text(text[position:end]))
+    return "".join(parts)
+
+
+def highlight_html(text, spans, scores, threshold=HIGHLIGHT_THRESHOLD, min_chars=MIN_HIGHLIGHT_CHARS):
+    """一次線性掃過原文，輸出標註後的 HTML"""
+    return highlight_range_html(text, highlight_intervals(spans, scores, threshold, min_chars))
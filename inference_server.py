@@ -0,0 +1,138 @@
+"""跨 session 共用的推論排程器：統一持有模型，動態組成 micro-batch"""
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from detector import classify_ids, to_ai_score
+from metrics import METRICS
+
+# 透過排程器分析時，每次送進佇列的視窗數（實際批次大小由排程器決定）
+SUBMIT_SIZE = 256
+
+
+def model_batch_fn(clf, tokenizer):
+    """建立排程器使用的批次函式：項目為 ("text", 文字) 或 ("ids", token ids)"""
+    def run(items):
+        scores = [0.0] * len(items)
+        texts = [i for i, (kind, _) in enumerate(items) if kind == "text"]
+        ids = [i for i, (kind, _) in enumerate(items) if kind == "ids"]
+        if texts:
+            results = clf([items[i][1] for i in texts], truncation=True, batch_size=len(texts))
+            for i, result in zip(texts, results):
+                scores[i] = to_ai_score(result)
+        if ids:
+            for i, prob in zip(ids, classify_ids(clf, tokenizer, [items[i][1] for i in ids])):
+                scores[i] = float(prob)
+        return scores
+    return run
+
+
+class InferenceScheduler:
+    """所有 session 將視窗送進佇列，由單一背景執行緒組成 micro-batch 推論
+
+    - max_batch_size：每批最多項目數
+    - max_wait_ms：第一個項目到達後，最多等待多久湊滿一批
+    - 各 session 有自己的佇列，組批時輪流取件，長文件不會餓死短請求
+    """
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=10):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queues = OrderedDict()  # session_id -> deque[(item, future)]
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"batches": 0, "items": 0, "max_batch": 0}
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, session_id, items):
+        """送出多個項目，回傳對應的 Future 列表"""
+        futures = [Future() for _ in items]
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("InferenceScheduler is closed")
+            queue = self._queues.setdefault(session_id, deque())
+            queue.extend(zip(items, futures))
+            self._pending += len(futures)
+            self._cond.notify()
+        return futures
+
+    def map(self, session_id, items, timeout=None):
+        """送出並等待全部結果"""
+        return [f.result(timeout) for f in self.submit(session_id, items)]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _take_batch(self):
+        """輪流從每個 session 的佇列取一件，直到湊滿一批"""
+        batch = []
+        while len(batch) < self.max_batch_size and self._queues:
+            for session_id in list(self._queues):
+                queue = self._queues[session_id]
+                batch.append(queue.popleft())
+                if not queue:
+                    del self._queues[session_id]
+                else:
+                    # 移到最後，下一批從其他 session 開始取
+                    self._queues.move_to_end(session_id)
+                if len(batch) == self.max_batch_size:
+                    break
+        self._pending -= len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+                # 等待更多項目加入，直到湊滿一批或超過 max_wait
+                deadline = time.monotonic() + self.max_wait
+                while self._pending < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+
+            items = [item for item, _ in batch]
+            try:
+                with METRICS.span("model_forward"):
+                    results = self.batch_fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            METRICS.increment("scheduler_batches_total")
+            METRICS.increment("scheduler_items_total", len(batch))
+
+
+class SessionClient:
+    """單一 session 使用的 clf 替代品，介面與 transformers pipeline 相同"""
+
+    def __init__(self, scheduler, session_id):
+        self.scheduler = scheduler
+        self.session_id = session_id
+
+    def __call__(self, inputs, **kwargs):
+        single = isinstance(inputs, str)
+        texts = [inputs] if single else list(inputs)
+        scores = self.scheduler.map(self.session_id, [("text", t) for t in texts])
+        return [{"label": "LABEL_1", "score": score} for score in scores]
+
+    def classify_ids(self, id_lists):
+        return self.scheduler.map(self.session_id, [("ids", list(ids)) for ids in id_lists])
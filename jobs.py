@@ -0,0 +1,188 @@
+"""背景分析工作：大型文件或多個上傳檔在背景執行緒分段分析
+
+- JobStore：SQLite 中的工作佇列，保存狀態、進度、暫時結果與最終結果；
+  重新整理頁面甚至重新啟動服務後，未完成的工作都還在
+- JobRunner：固定數量的背景執行緒（同時執行的工作數上限），依送出順序取出工作，
+  每完成 chunk_size 個視窗就寫回進度，並在兩批之間檢查是否已被取消
+"""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+from detector import iter_analysis
+from metrics import METRICS
+
+# 狀態：queued → running → done / failed / cancelled
+FINISHED_STATES = ("done", "failed", "cancelled")
+# 背景工作每批推論的視窗數；每批寫回一次進度
+JOB_CHUNK = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    text TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    partial TEXT,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+# 列表與輪詢時不讀取原文與結果（可能有數 MB）
+SUMMARY_FIELDS = "id, name, status, done, total, partial, error, created, updated"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobStore:
+    """以 SQLite 保存的工作佇列（執行緒安全）"""
+
+    def __init__(self, db_path):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            self._db.commit()
+            return cursor
+
+    # 送出與查詢
+    def submit(self, name, text, settings):
+        """加入佇列，回傳工作 id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, name, status, text, settings, created, updated) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+            (job_id, name, text, json.dumps(settings), now, now))
+        return job_id
+
+    def jobs(self, job_ids):
+        """回傳工作摘要（不含原文與最終結果），依送出順序排列；不存在的 id 會被略過"""
+        if not job_ids:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {SUMMARY_FIELDS} FROM jobs WHERE id IN ({','.join('?' * len(job_ids))}) ORDER BY created",
+                list(job_ids)).fetchall()
+        return [dict(row, partial=json.loads(row["partial"]) if row["partial"] else None) for row in rows]
+
+    def result(self, job_id):
+        """已完成工作的 (原文, 分析結果)；尚未完成時回傳 None"""
+        with self._lock:
+            row = self._db.execute("SELECT text, result FROM jobs WHERE id = ? AND status = 'done'",
+                                   (job_id,)).fetchone()
+        if row is None:
+            return None
+        analysis = json.loads(row["result"])
+        analysis["spans"] = [tuple(span) for span in analysis["spans"]]
+        return row["text"], analysis
+
+    # 狀態轉換
+    def claim_next(self):
+        """取出最早送出的排隊工作並標為 running，回傳 (id, 原文, 設定) 或 None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, text, settings FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (time.time(), row["id"]))
+            self._db.commit()
+        return row["id"], row["text"], json.loads(row["settings"])
+
+    def update_progress(self, job_id, done, total, partial):
+        """寫回進度與暫時結果；回傳是否已被要求取消"""
+        with self._lock:
+            self._db.execute("UPDATE jobs SET done = ?, total = ?, partial = ?, updated = ? WHERE id = ?",
+                             (done, total, json.dumps(partial), time.time(), job_id))
+            self._db.commit()
+            row = self._db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def finish(self, job_id, status, result=None, error=None):
+        self._execute("UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE id = ?",
+                      (status, json.dumps(result) if result is not None else None, error, time.time(), job_id))
+
+    def cancel(self, job_id):
+        """排隊中的工作直接取消；執行中的工作在下一批完成時停止"""
+        now = time.time()
+        self._execute("UPDATE jobs SET status = 'cancelled', updated = ? WHERE id = ? AND status = 'queued'",
+                      (now, job_id))
+        self._execute("UPDATE jobs SET cancel_requested = 1, updated = ? WHERE id = ? AND status = 'running'",
+                      (now, job_id))
+
+    def requeue_interrupted(self):
+        """服務重新啟動時，把上次執行到一半的工作放回佇列"""
+        return self._execute(
+            "UPDATE jobs SET status = 'queued', done = 0, partial = NULL WHERE status = 'running'").rowcount
+
+    def delete(self, job_id):
+        self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+class JobRunner:
+    """固定數量的背景執行緒，逐一處理佇列中的工作"""
+
+    def __init__(self, store, clf, tokenizer, workers=1, chunk_size=JOB_CHUNK, cache=None, **analysis_kwargs):
+        self.store = store
+        self.clf = clf
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.analysis_kwargs = analysis_kwargs
+        self._wake = threading.Event()
+        store.requeue_interrupted()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, name, text, settings):
+        job_id = self.store.submit(name, text, settings)
+        self._wake.set()
+        return job_id
+
+    def _run(self):
+        while True:
+            job = self.store.claim_next()
+            if job is None:
+                self._wake.wait(timeout=1.0)
+                self._wake.clear()
+                continue
+            self.process(*job)
+
+    def process(self, job_id, text, settings):
+        """分段分析一個工作，每批寫回進度；取消或失敗時記錄狀態"""
+        try:
+            with METRICS.span("job"):
+                for done, total, analysis in iter_analysis(text, self.clf, self.tokenizer, cache=self.cache,
+                                                           chunk_size=self.chunk_size,
+                                                           **self.analysis_kwargs, **settings):
+                    # 暫時結果只保存摘要，每批寫回的資料量不隨文件長度成長
+                    partial = {"overall_score": analysis["overall_score"],
+                               "flagged": sum(1 for score in analysis["scores"] if score > 0.5)}
+                    if self.store.update_progress(job_id, done, total, partial):
+                        raise JobCancelled()
+            self.store.finish(job_id, "done", result=analysis)
+            METRICS.increment("jobs_total", status="done")
+        except JobCancelled:
+            self.store.finish(job_id, "cancelled")
+            METRICS.increment("jobs_total", status="cancelled")
+        except Exception as e:
+            self.store.finish(job_id, "failed", error=f"{type(e).__name__}: {e}")
+            METRICS.increment("jobs_total", status="failed")
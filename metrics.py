@@ -0,0 +1,169 @@
+"""輕量的效能量測：各階段耗時與計數器
+
+- span(stage)：量測一個階段的耗時，累積到該階段的直方圖
+- increment(name, value, **labels)：累加計數器（文件數、片段數、token 數、快取命中……）
+- start_trace / finish_trace：收集同一執行緒內一次請求的各階段耗時，結束時可寫入 JSONL
+- render_prometheus()：Prometheus 文字格式；serve_metrics() 在本機提供 /metrics
+
+每次記錄只有一次 perf_counter 與一次加鎖的 dict 更新，可在正式環境常駐開啟。
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# 階段耗時直方圖的上界（秒）
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def series_name(name, labels):
+    """Prometheus 格式的序列名稱，例如 cache_hits_total{level="segment"}"""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """執行緒安全的計數器與階段耗時直方圖"""
+
+    def __init__(self, prefix="ai_detector", log_path=None):
+        self.prefix = prefix
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._counters = {}  # (名稱, labels) -> 累計值
+        self._stages = {}    # 階段 -> [各區間次數..., 次數, 總秒數]
+        self._local = threading.local()
+
+    # 記錄
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            series = series_name(*key)
+            trace["counters"][series] = trace["counters"].get(series, 0) + value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0] * len(STAGE_BUCKETS) + [0, 0.0]
+            bucket = bisect.bisect_left(STAGE_BUCKETS, seconds)
+            if bucket < len(STAGE_BUCKETS):
+                entry[bucket] += 1
+            entry[-2] += 1
+            entry[-1] += seconds
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace["stages"][stage] = trace["stages"].get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    # 單次請求的追蹤
+    def start_trace(self, name, **fields):
+        """開始收集目前執行緒的階段耗時與計數"""
+        self._local.trace = {"name": name, "time": time.time(), **fields, "stages": {}, "counters": {}}
+        self._local.trace_start = time.perf_counter()
+        return self._local.trace
+
+    def current_trace(self):
+        return getattr(self._local, "trace", None)
+
+    def finish_trace(self):
+        """結束追蹤；有設定 log_path 時附加一行 JSONL，回傳追蹤內容"""
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return None
+        self._local.trace = None
+        trace["total_seconds"] = time.perf_counter() - self._local.trace_start
+        if self.log_path:
+            line = json.dumps(trace, ensure_ascii=False)
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return trace
+
+    @contextmanager
+    def trace(self, name, **fields):
+        trace = self.start_trace(name, **fields)
+        try:
+            yield trace
+        finally:
+            self.finish_trace()
+
+    # 匯出
+    def snapshot(self):
+        """回傳目前所有計數器與各階段的次數、總耗時"""
+        with self._lock:
+            counters = {series_name(*key): value for key, value in self._counters.items()}
+            stages = {stage: {"count": entry[-2], "seconds": entry[-1]} for stage, entry in self._stages.items()}
+        return {"counters": counters, "stages": stages}
+
+    def render_prometheus(self):
+        """Prometheus 文字格式"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            stages = sorted((stage, list(entry)) for stage, entry in self._stages.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{series_name(metric, labels)} {value}")
+
+        metric = f"{self.prefix}_stage_seconds"
+        if stages:
+            lines.append(f"# TYPE {metric} histogram")
+        for stage, entry in stages:
+            cumulative = 0
+            for bound, count in zip(STAGE_BUCKETS, entry):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {entry[-2]}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {entry[-2]}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {entry[-1]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._stages.clear()
+
+
+def serve_metrics(metrics, port, host="127.0.0.1"):
+    """在背景執行緒提供 GET /metrics（Prometheus 文字格式），回傳 HTTP server"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+# 全域的量測實例；設定 METRICS_LOG 即把每次請求的追蹤寫入 JSONL
+METRICS = Metrics(log_path=os.environ.get("METRICS_LOG"))
@@ -0,0 +1,233 @@
+"""近似重複比對：詞 shingle + MinHash 簽章 + LSH 索引（SQLite，存在本機磁碟）
+
+每個片段切成詞（中文每個字算一個詞），連續 3 個詞為一個 shingle，以 64 個雜湊函式
+取 MinHash 簽章；簽章分成 32 個 band（每個 2 列）寫入 LSH 索引。查詢時取同一 band 桶內
+命中 band 最多的候選片段，再以簽章估計的相似度分成 identical / minor / paraphrased / unique 四級。
+
+相似度為兩片段 shingle 集合的交集除以較小的集合（包含度），片段邊界與已知文字
+不一致時（查詢視窗包含整段已知文字，或反過來）仍可比對。
+
+索引與簽章都存在 SQLite，記憶體用量與索引大小無關，可隨時加入新片段。
+
+用法：
+    python near_duplicate.py build known_ai_outputs.jsonl --index near_dup.db --source ai_output
+    python near_duplicate.py build essays/ --index near_dup.db --source submission
+    python near_duplicate.py query --index near_dup.db "text to look up"
+"""
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+SHINGLE_WORDS = 3
+NUM_PERM = 64
+BANDS = 32
+MAX_CANDIDATES = 64
+# 相似度（包含度）門檻，依序為 identical、minor、paraphrased；低於最後一個為 unique
+MATCH_BUCKETS = ("identical", "minor", "paraphrased", "unique")
+MATCH_THRESHOLDS = (0.9, 0.6, 0.3)
+INSERT_BATCH = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    shingles INTEGER NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh (
+    key INTEGER NOT NULL,
+    segment INTEGER NOT NULL,
+    PRIMARY KEY (key, segment)
+) WITHOUT ROWID;
+"""
+HASH_MULTIPLIER = np.uint64(0x100000001B3)
+# 詞：中文（CJK）每個字一個詞，其他語言為連續的字母數字；忽略大小寫與標點
+WORD_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]|[^\W\u3400-\u9fff\uf900-\ufaff]+')
+
+
+def shingle_hashes(text, k=SHINGLE_WORDS):
+    """所有連續 k 個詞的 shingle 的 64 位元雜湊（去重後的 uint64 陣列）"""
+    codes = np.array([zlib.crc32(word.encode()) for word in WORD_PATTERN.findall(text.lower())], dtype=np.uint64)
+    n = len(codes) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+    hashes = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        hashes = hashes * HASH_MULTIPLIER + codes[j:j+n]
+    return np.unique(hashes)
+
+
+def containment(signature, count, signatures, counts):
+    """由 MinHash 估計的 Jaccard 換算成 |A∩B| / min(|A|, |B|)；signatures / counts 為多個候選"""
+    jaccard = (signatures == signature).mean(axis=1)
+    return np.minimum(jaccard * (count + counts) / ((1 + jaccard) * np.minimum(count, counts)), 1.0)
+
+
+def match_bucket(similarity):
+    for bucket, threshold in zip(MATCH_BUCKETS, MATCH_THRESHOLDS):
+        if similarity >= threshold:
+            return bucket
+    return MATCH_BUCKETS[-1]
+
+
+class NearDuplicateIndex:
+    """MinHash + LSH 索引；參數存在資料庫中，重新開啟時沿用"""
+
+    def __init__(self, db_path, num_perm=NUM_PERM, bands=BANDS, shingle_words=SHINGLE_WORDS, seed=1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+
+        params = {"num_perm": num_perm, "bands": bands, "shingle_words": shingle_words, "seed": seed}
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+        if row is None:
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('params', ?)", (json.dumps(params),))
+            self._db.commit()
+        else:
+            params = json.loads(row[0])  # 既有索引的參數優先，簽章才能互相比較
+        self.num_perm, self.bands = params["num_perm"], params["bands"]
+        self.shingle_words = params["shingle_words"]
+        self.rows = self.num_perm // self.bands
+
+        # 雜湊函式 (a * x + b) >> 32，a 為奇數
+        rng = np.random.RandomState(params["seed"])
+        self._a = rng.randint(1, 2**62, size=self.num_perm, dtype=np.int64).astype(np.uint64) | np.uint64(1)
+        self._b = rng.randint(0, 2**62, size=self.num_perm, dtype=np.int64).astype(np.uint64)
+
+    # 簽章
+    def signature(self, text):
+        """回傳 (MinHash 簽章, shingle 數)；沒有任何 shingle 時簽章為 None"""
+        hashes = shingle_hashes(text, self.shingle_words)
+        if not len(hashes):
+            return None, 0
+        values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return values.min(axis=1).astype(np.uint32), len(hashes)
+
+    def band_keys(self, signature):
+        """每個 band 的編號與各列合併成一個 64 位元整數（SQLite INTEGER）"""
+        keys = np.arange(self.bands, dtype=np.uint64)
+        for row in signature.reshape(self.bands, self.rows).T.astype(np.uint64):
+            keys = keys * HASH_MULTIPLIER + row
+        return keys.view(np.int64).tolist()
+
+    # 寫入
+    def add(self, texts, source="unknown"):
+        """加入片段，回傳加入的片段數（沒有 shingle 的片段略過）"""
+        added = 0
+        segment_rows, band_rows = [], []
+        with self._lock:
+            next_id = (self._db.execute("SELECT MAX(id) FROM segments").fetchone()[0] or 0) + 1
+            for text in texts:
+                signature, count = self.signature(text)
+                if signature is None:
+                    continue
+                segment_rows.append((next_id, source, count, signature.tobytes()))
+                band_rows.extend((key, next_id) for key in self.band_keys(signature))
+                next_id += 1
+                added += 1
+                if len(segment_rows) >= INSERT_BATCH:
+                    self._write(segment_rows, band_rows)
+                    segment_rows, band_rows = [], []
+            self._write(segment_rows, band_rows)
+        return added
+
+    def _write(self, segment_rows, band_rows):
+        self._db.executemany("INSERT INTO segments (id, source, shingles, signature) VALUES (?, ?, ?, ?)",
+                             segment_rows)
+        self._db.executemany("INSERT OR IGNORE INTO lsh (key, segment) VALUES (?, ?)", band_rows)
+        self._db.commit()
+
+    # 查詢
+    def query(self, text, exclude_source=None):
+        """回傳最相似的已知片段 {"similarity", "bucket", "segment", "source"}；沒有候選時 similarity 為 0
+
+        exclude_source：不比對這個來源的片段（例如同一個 session 先前記錄的提交）
+        """
+        signature, count = self.signature(text)
+        best = {"similarity": 0.0, "bucket": MATCH_BUCKETS[-1], "segment": None, "source": None}
+        if signature is None:
+            return best
+        keys = self.band_keys(signature)
+        # 排除的來源在取前 MAX_CANDIDATES 個之前就過濾，不會佔掉其他候選的名額
+        exclude = ("JOIN segments AS s ON s.id = lsh.segment AND s.source != ? ", [exclude_source]) \
+            if exclude_source is not None else ("", [])
+        with self._lock:
+            # 同一 band 命中越多的片段越相似，只驗證前 MAX_CANDIDATES 個
+            candidates = self._db.execute(
+                "SELECT id, source, shingles, signature FROM segments WHERE id IN ("
+                f"SELECT segment FROM lsh {exclude[0]}WHERE key IN ({','.join('?' * len(keys))}) "
+                f"GROUP BY segment ORDER BY COUNT(*) DESC LIMIT {MAX_CANDIDATES})", exclude[1] + keys).fetchall()
+        if not candidates:
+            return best
+        ids, sources, counts, blobs = zip(*candidates)
+        signatures = np.frombuffer(b"".join(blobs), dtype=np.uint32).reshape(len(candidates), self.num_perm)
+        similarities = containment(signature, count, signatures, np.array(counts, dtype=np.float64))
+        i = int(similarities.argmax())
+        similarity = float(similarities[i])
+        return {"similarity": similarity, "bucket": match_bucket(similarity), "segment": ids[i], "source": sources[i]}
+
+    def classify_segments(self, segments, exclude_source=None):
+        """每個片段的比對等級（identical / minor / paraphrased / unique）"""
+        return [self.query(segment, exclude_source)["bucket"] for segment in segments]
+
+    def __len__(self):
+        # 片段只會加入、編號連續，MAX(id) 不必掃描整個資料表
+        with self._lock:
+            return self._db.execute("SELECT MAX(id) FROM segments").fetchone()[0] or 0
+
+
+# 命令列：由語料建立索引或查詢
+def document_segments(text, segment_size):
+    """依句子邊界（含中文標點）把整句裝進不超過 segment_size 個詞的片段；中文每個字算一個詞"""
+    from segmentation import pack_windows, sentence_boundaries
+
+    # 以詞代替 token：pack_windows 只需要每個詞的字元位置
+    offsets = [m.span() for m in WORD_PATTERN.finditer(text)]
+    return [text[offsets[i][0]:offsets[j-1][1]]
+            for i, j in pack_windows(offsets, offsets, sentence_boundaries(text), segment_size)]
+
+
+def iter_corpus_segments(path, segment_size):
+    """把語料中的每篇文件切成片段"""
+    from batch_score import iter_documents
+
+    for _, text in iter_documents(path):
+        yield from document_segments(text, segment_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the near-duplicate (MinHash/LSH) segment index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="add every segment of a JSONL file or folder of .txt/.md files")
+    build.add_argument("input")
+    build.add_argument("--index", required=True, help="SQLite index file (created if missing)")
+    build.add_argument("--source", default="corpus", help="label stored with each segment, e.g. ai_output")
+    build.add_argument("--segment-size", type=int, default=50, help="max words (CJK characters) per indexed segment")
+    query = sub.add_parser("query", help="look up one text")
+    query.add_argument("text")
+    query.add_argument("--index", required=True)
+    args = parser.parse_args(argv)
+
+    index = NearDuplicateIndex(args.index)
+    if args.command == "build":
+        start = time.perf_counter()
+        added = index.add(iter_corpus_segments(args.input, args.segment_size), source=args.source)
+        print(f"Added {added} segments in {time.perf_counter() - start:.1f}s ({len(index)} total) -> {args.index}",
+              file=sys.stderr)
+    else:
+        print(json.dumps(index.query(args.text)))
+
+
+if __name__ == "__main__":
+    main()
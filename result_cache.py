@@ -0,0 +1,127 @@
+"""以內容雜湊為鍵的兩層結果快取（整篇結果 + 單一片段分數）"""
+import hashlib
+import json
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_text(text):
+    """統一 Unicode 與換行格式，讓相同內容得到相同的鍵"""
+    return unicodedata.normalize("NFC", text).replace("\r\n", "\n").strip()
+
+
+def content_key(kind, payload, namespace, settings=None):
+    """以 模型名稱 + 設定 + 內容 計算 SHA-256 鍵"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([kind, namespace, settings], sort_keys=True).encode())
+    digest.update(b"\0")
+    digest.update(payload.encode() if isinstance(payload, str) else payload)
+    return f"{kind}:{digest.hexdigest()}"
+
+
+class ResultCache:
+    """記憶體 LRU（依資料大小淘汰）+ 選用的 SQLite 磁碟層，並統計命中次數"""
+
+    def __init__(self, namespace, max_bytes=DEFAULT_MAX_BYTES, db_path=None):
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()  # key -> (json 字串, 大小)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+        self.stats = {
+            "document_hits": 0,
+            "document_misses": 0,
+            "segment_hits": 0,
+            "segment_misses": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+        }
+
+    # 基本存取
+    def _get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return json.loads(entry[0])
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.stats["disk_hits"] += 1
+            self._remember(key, row[0])
+            return json.loads(row[0])
+
+    def _put_many(self, items):
+        with self._lock:
+            encoded = [(key, json.dumps(value)) for key, value in items]
+            for key, value in encoded:
+                self._remember(key, value)
+            if self._db is not None and encoded:
+                self._db.executemany("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", encoded)
+                self._db.commit()
+
+    def _remember(self, key, value):
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        size = len(key) + len(value)
+        self._memory[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._memory:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._bytes -= evicted
+            self.stats["evictions"] += 1
+
+    # 第一層：整篇結果
+    def document_key(self, text, settings):
+        return content_key("doc", text, self.namespace, settings)
+
+    def get_document(self, key):
+        result = self._get(key)
+        with self._lock:
+            self.stats["document_hits" if result is not None else "document_misses"] += 1
+        return result
+
+    def put_document(self, key, result):
+        self._put_many([(key, result)])
+
+    # 第二層：單一片段分數
+    def segment_key(self, payload):
+        return content_key("seg", payload, self.namespace)
+
+    def get_segments(self, keys):
+        """回傳與 keys 對應的分數列表，未命中者為 None"""
+        scores = [self._get(key) for key in keys]
+        hits = sum(1 for s in scores if s is not None)
+        with self._lock:
+            self.stats["segment_hits"] += hits
+            self.stats["segment_misses"] += len(scores) - hits
+        return scores
+
+    def put_segments(self, keys, scores):
+        self._put_many(zip(keys, scores))
+
+    def info(self):
+        """目前的命中統計與記憶體使用量"""
+        with self._lock:
+            return dict(self.stats, entries=len(self._memory), memory_bytes=self._bytes)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
@@ -0,0 +1,50 @@
+"""依句子與段落邊界切分視窗（支援中文標點）
+
+整篇先建立一次邊界索引（句末標點、換行），再把連續的句子裝進不超過 token 上限的視窗，
+視窗之間不重疊；單一句子超過上限時才在 token 位置硬切。
+"""
+import bisect
+import re
+
+# 英文句末：. ! ? 後面可接引號或括號，且必須接空白（避免切開 3.14、example.com）
+# 中文句末：。！？；… 後面可接引號或括號，不需要空白
+# 換行：段落或條列的分隔
+CJK_SENTENCE_END = "。！？；…"
+SENTENCE_END = re.compile(
+    r'[.!?]+["\'”’)\]]*(?=\s)'
+    rf'|[{CJK_SENTENCE_END}]+[」』”’）)]*'
+    r'|\n+'
+)
+# 結尾的句點不代表句子結束的常見縮寫
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e.g", "i.e", "a.m", "p.m", "no", "fig"}
+
+
+def sentence_boundaries(text):
+    """回傳每個句子或段落結束的字元位置（遞增，最後一個為全文長度）"""
+    boundaries = []
+    for match in SENTENCE_END.finditer(text):
+        if match.group().startswith("."):
+            word = text[max(match.start() - 16, 0):match.start()].rsplit(None, 1)[-1:] or [""]
+            if word[0].lower() in ABBREVIATIONS:
+                continue
+        boundaries.append(match.end())
+    if not boundaries or boundaries[-1] < len(text):
+        boundaries.append(len(text))
+    return boundaries
+
+
+def pack_windows(ids, offsets, boundaries, max_tokens):
+    """把句子依序裝進不超過 max_tokens 的視窗，回傳 token 區間 [(i, j), ...]"""
+    starts = [start for start, _ in offsets]
+    # 邊界的字元位置轉為 token 位置：邊界之前開始的 token 都屬於前一句
+    cuts = sorted({bisect.bisect_left(starts, b) for b in boundaries} - {0} | {len(ids)})
+
+    ranges = []
+    i = 0
+    while i < len(ids):
+        # 找出不超過上限的最遠句子邊界
+        k = bisect.bisect_right(cuts, i + max_tokens) - 1
+        j = cuts[k] if k >= 0 and cuts[k] > i else min(i + max_tokens, len(ids))
+        ranges.append((i, j))
+        i = j
+    return ranges
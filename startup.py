@@ -0,0 +1,95 @@
+"""冷啟動：在背景執行緒載入並預熱模型，頁面不必等待
+
+- model_source()：設定 MODEL_DIR 時從本機資料夾載入（不需網路），否則使用 Hub 名稱
+- ModelLoader：建立時立即回傳，狀態依序為 loading →（tuning →）warming → ready，失敗時為 failed
+- warm_up()：以典型長度的假輸入各推論一次，第一個真正的請求不必負擔延遲初始化
+
+transformers / torch 只在背景執行緒中（load_model 內）才匯入。
+"""
+import os
+import threading
+import time
+
+from detector import ADAPTIVE_BLOCK_TOKENS, MODEL_NAME, MIN_WINDOW_TOKENS, WINDOW_TOKENS, classify_ids, load_model
+from metrics import METRICS
+
+# 預熱使用的視窗長度（token）：短尾端視窗、預設視窗、adaptive 的大區塊
+WARMUP_LENGTHS = (MIN_WINDOW_TOKENS, WINDOW_TOKENS, ADAPTIVE_BLOCK_TOKENS)
+WARMUP_BATCH = 4
+WARMUP_TEXT = "The quick brown fox jumps over the lazy dog while the committee reviews the annual report. "
+
+
+def model_source(model_name=MODEL_NAME):
+    return os.environ.get("MODEL_DIR") or model_name
+
+
+def warm_up(clf, tokenizer, lengths=WARMUP_LENGTHS, batch_size=WARMUP_BATCH):
+    """token 視窗路徑（tokens / sentences / adaptive）與文字路徑（words）各推論一次"""
+    sample = tokenizer(WARMUP_TEXT, add_special_tokens=False)["input_ids"]
+    for length in lengths:
+        ids = (sample * (length // len(sample) + 1))[:length]
+        classify_ids(clf, tokenizer, [ids] * batch_size)
+    clf([WARMUP_TEXT * 4] * batch_size, truncation=True, batch_size=batch_size)
+
+
+class ModelLoader:
+    """在背景執行緒載入（與預熱）模型"""
+
+    def __init__(self, model_name=MODEL_NAME, backend="pytorch", warmup=True, autotune=None):
+        """autotune：None 不使用設定檔；"apply" 套用本主機已存的設定檔；"tune" 沒有設定檔時先調校"""
+        self.model_name = model_name
+        self.backend = backend
+        self.autotune = autotune
+        self.state = "loading"
+        self.error = None
+        self.timings = {}
+        self.profile = None
+        self._result = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._load, args=(warmup,), name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _load(self, warmup):
+        try:
+            start = time.perf_counter()
+            with METRICS.span("model_load"):
+                clf, tokenizer = load_model(self.model_name, self.backend)
+            self.timings["load"] = time.perf_counter() - start
+            if self.autotune:
+                self._tune(clf, tokenizer)
+            if warmup:
+                self.state = "warming"
+                start = time.perf_counter()
+                with METRICS.span("warmup"):
+                    warm_up(clf, tokenizer)
+                self.timings["warmup"] = time.perf_counter() - start
+            self._result = (clf, tokenizer)
+            self.state = "ready"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+        finally:
+            self._done.set()
+
+    def _tune(self, clf, tokenizer):
+        from autotune import apply_profile, autotune_model, load_profile
+
+        if self.autotune == "apply":
+            self.profile = apply_profile(load_profile(self.model_name, self.backend))
+            return
+        self.state = "tuning"
+        start = time.perf_counter()
+        self.profile = autotune_model(clf, tokenizer, self.model_name, self.backend)
+        self.timings["autotune"] = time.perf_counter() - start
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def result(self, timeout=None):
+        """等待載入完成，回傳 (clf, tokenizer)；載入失敗時拋出 RuntimeError"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Model {self.model_name} is still loading")
+        if self._result is None:
+            raise RuntimeError(f"Model {self.model_name} failed to load: {self.error}")
+        return self._result
@@ -0,0 +1,105 @@
+"""有限記憶體的串流分析：逐塊讀入文字、逐塊切視窗與推論
+
+輸入是文字片段的產生器（檔案或字串皆可），每次只在記憶體中保留一個區塊；
+每個視窗只記錄字元位置、權重與 float32 分數（array 儲存，每個視窗 24 bytes），
+不保留原文、片段文字或標註 HTML，峰值記憶體大致與文件長度無關。
+
+區塊在換行、句末標點或空白處切開，因此各區塊的視窗與整篇分析時大致相同，
+只有跨越區塊邊界的視窗會在邊界處斷開。
+"""
+from array import array
+
+from detector import (BATCH_SIZE, SEGMENT_SIZE, WINDOW_STRIDE, WINDOW_TOKENS, aggregate_scores, build_windows,
+                      overlap_weights, score_windows, to_ai_score)
+from metrics import METRICS
+
+# 每次讀取與分析的字元數
+STREAM_BLOCK_CHARS = 64 * 1024
+STREAM_MODES = ("words", "tokens", "sentences")
+# 切開區塊的位置，依優先順序：段落、句末標點、空白
+BLOCK_SEPARATORS = ("\n", "。", "！", "？", ". ", "! ", "? ", " ")
+
+
+# 讀取輸入
+def iter_file_chunks(path, chunk_chars=STREAM_BLOCK_CHARS):
+    """逐塊讀取文字檔"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_string_chunks(text, chunk_chars=STREAM_BLOCK_CHARS):
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start+chunk_chars]
+
+
+def iter_blocks(chunks, block_chars=STREAM_BLOCK_CHARS):
+    """把任意大小的輸入片段重新組成約 block_chars 的區塊，回傳 (區塊起點, 區塊文字)
+
+    區塊結尾盡量落在區塊後半段的段落、句子或字詞邊界上。
+    """
+    buffer, offset = "", 0
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= block_chars:
+            cut = block_chars
+            for separator in BLOCK_SEPARATORS:
+                position = buffer.rfind(separator, block_chars // 2, block_chars)
+                if position >= 0:
+                    cut = position + len(separator)
+                    break
+            yield offset, buffer[:cut]
+            buffer, offset = buffer[cut:], offset + cut
+    if buffer:
+        yield offset, buffer
+
+
+# 串流分析
+def empty_result():
+    return {"overall_score": 0.0, "starts": array("q"), "ends": array("q"), "weights": array("f"), "scores": array("f")}
+
+
+def iter_stream_analysis(chunks, clf, tokenizer, mode="sentences", segment_size=SEGMENT_SIZE,
+                         window_tokens=WINDOW_TOKENS, stride=WINDOW_STRIDE, batch_size=BATCH_SIZE,
+                         aggregation="length_weighted", cache=None, block_chars=STREAM_BLOCK_CHARS):
+    """每分析完一個區塊就產出 (已讀字元數, 目前結果)
+
+    結果為 {"overall_score", "starts", "ends", "weights", "scores"}，後四者是 array，
+    位置為整篇輸入中的字元位置；每次產出的是同一組 array，不會複製。
+    """
+    if mode not in STREAM_MODES:
+        raise ValueError(f"Unknown streaming mode: {mode!r} (expected one of {STREAM_MODES})")
+    METRICS.increment("documents_total", mode=f"stream_{mode}")
+    result = empty_result()
+    chars = 0
+    head = ""  # 沒有任何視窗時，與整篇分析相同，直接對開頭推論一次（推論會截斷到 512 token）
+
+    for offset, block in iter_blocks(chunks, block_chars):
+        windows = build_windows(block, tokenizer, mode, segment_size, window_tokens, stride)
+        _, scores = score_windows(block, windows, clf, tokenizer, mode, batch_size, cache)
+        spans = [(w.start, w.end) for w in windows]
+        result["starts"].extend(offset + start for start, _ in spans)
+        result["ends"].extend(offset + end for _, end in spans)
+        # 各區塊的視窗互不重疊，權重可以逐區塊計算
+        result["weights"].extend(overlap_weights(spans))
+        result["scores"].extend(scores)
+        if offset == 0:
+            head = block
+        chars = offset + len(block)
+        result["overall_score"] = aggregate_scores(result["scores"], result["weights"], aggregation)
+        yield chars, result
+
+    if not result["scores"] and head.strip():
+        result["overall_score"] = to_ai_score(clf(head, truncation=True, max_length=512)[0])
+        yield chars, result
+
+
+def stream_document(chunks, clf, tokenizer, **kwargs):
+    """串流分析整篇文字，回傳最終結果（參數同 iter_stream_analysis）"""
+    result = empty_result()
+    for _, result in iter_stream_analysis(chunks, clf, tokenizer, **kwargs):
+        pass
+    return result
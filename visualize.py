@@ -0,0 +1,78 @@
+"""大型結果的視覺化：整篇文件的分數時間軸與分頁顯示的標註文字
+
+- score_buckets()：把一段連續的視窗分成最多 n 個桶，以 NumPy reduceat 計算每桶的最低、最高與平均分數；
+  保留極值，單一個高分視窗不會因為降採樣而消失
+- page_bounds()：把原文切成約 PAGE_CHARS 個字元的頁（盡量在換行或空白處斷開）
+- page_html()：只輸出一頁的標註 HTML
+
+送到瀏覽器的圖表大小只與桶數有關、文字只與頁長有關，不隨視窗數成長。
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+from highlight import highlight_range_html
+
+TIMELINE_BUCKETS = 120
+PAGE_CHARS = 8000
+
+
+def score_buckets(spans, scores, n_buckets=TIMELINE_BUCKETS, first=0, last=None):
+    """視窗 [first, last) 依順序分成最多 n_buckets 個連續的桶
+
+    回傳各欄為 NumPy 陣列的 dict：first / last（每桶的視窗索引範圍，last 不含）、
+    start / end（原文字元位置）、min / max / mean（分數）。
+    """
+    last = len(scores) if last is None else last
+    values = np.asarray(scores[first:last], dtype=np.float64)
+    positions = np.asarray(spans[first:last], dtype=np.int64).reshape(-1, 2)
+    # 每桶的視窗數相差不超過 1；視窗數不多於桶數時每個視窗各自一桶
+    edges = np.linspace(0, len(values), min(n_buckets, len(values)) + 1).astype(np.int64)
+    heads = edges[:-1]
+    if not len(heads):
+        empty = np.empty(0)
+        return {"first": empty, "last": empty, "start": empty, "end": empty, "min": empty, "max": empty,
+                "mean": empty}
+    return {
+        "first": heads + first,
+        "last": edges[1:] + first,
+        "start": positions[heads, 0],
+        "end": np.maximum.reduceat(positions[:, 1], heads),
+        "min": np.minimum.reduceat(values, heads),
+        "max": np.maximum.reduceat(values, heads),
+        "mean": np.add.reduceat(values, heads) / np.diff(edges),
+    }
+
+
+def page_end(text, start, page_chars=PAGE_CHARS):
+    """從 start 開始的一頁在哪裡結束：優先在後半頁最後一個換行斷開，其次是空白"""
+    end = start + page_chars
+    if end >= len(text):
+        return len(text)
+    for separator in ("\n", " "):
+        cut = text.rfind(separator, start + page_chars // 2, end)
+        if cut != -1:
+            return cut + 1
+    return end
+
+
+def page_bounds(text, page_chars=PAGE_CHARS):
+    """每一頁的 (start, end)；空字串也有一頁"""
+    bounds = []
+    start = 0
+    while True:
+        end = page_end(text, start, page_chars)
+        bounds.append((start, end))
+        if end >= len(text):
+            return bounds
+        start = end
+
+
+def page_of(bounds, position):
+    """字元位置所在的頁（從 0 開始）"""
+    return max(bisect_right([start for start, _ in bounds], position) - 1, 0)
+
+
+def page_html(text, intervals, bounds, page):
+    start, end = bounds[page]
+    return highlight_range_html(text, intervals, start, end)
@@ -0,0 +1,166 @@
+"""多行程批次評分：各 worker 以記憶體映射讀取 safetensors 權重，共用唯讀分頁
+
+每個 worker 將 model.safetensors 以 MAP_PRIVATE 映射進記憶體並直接當作模型參數，
+不複製權重；N 個 worker 共用同一份 page cache，總 RSS 不會隨 N 倍增。
+"""
+import json
+import multiprocessing
+import os
+import re
+import struct
+from collections import deque
+
+from detector import MODEL_NAME
+
+SAFETENSORS_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+# 記憶體映射權重
+def mmap_safetensors(path):
+    """解析 safetensors 標頭，回傳直接指向映射檔案的 tensor（不複製）"""
+    import torch
+
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+
+    # shared=False 為 MAP_PRIVATE：未被寫入的分頁與 page cache 及其他行程共用
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = getattr(torch, SAFETENSORS_DTYPES[info["dtype"]])
+        begin, end = info["data_offsets"]
+        tensor = torch.empty(0, dtype=dtype)
+        offset, misaligned = divmod(data_start + begin, tensor.element_size())
+        if misaligned:
+            raise ValueError(f"Tensor {name} in {path} is not aligned to its dtype")
+        tensor.set_(storage, offset, info["shape"])
+        tensors[name] = tensor
+    return tensors
+
+
+def resolve_model_dir(model_name):
+    """本機資料夾直接使用；Hub 名稱則使用（或下載到）本機快取"""
+    if os.path.isdir(model_name):
+        return model_name
+    from huggingface_hub import snapshot_download
+    return snapshot_download(model_name, allow_patterns=["*.json", "*.safetensors", "*.txt", "*.model"])
+
+
+def optional_weight_keys(model):
+    """檔案中可以沒有的參數名稱：共用權重（tie_weights() 指向其他參數）與模型宣告可忽略的項目"""
+    tied = getattr(model, "all_tied_weights_keys", None) or getattr(model, "_tied_weights_keys", None) or []
+    ignored = getattr(model, "_keys_to_ignore_on_load_missing", None) or []
+    return set(tied), list(ignored)
+
+
+def missing_weights(model, missing_keys):
+    """真正缺少（沒有值）的參數名稱"""
+    tied, ignored = optional_weight_keys(model)
+    return [
+        key for key in missing_keys
+        if not any(key == name or key.endswith("." + name) for name in tied)
+        and not any(re.search(pattern, key) for pattern in ignored)
+    ]
+
+
+def materialize_buffers(model):
+    """meta 裝置上建立的模型中，權重檔沒有的 buffer（例如旋轉位置編碼的 inv_freq）沒有值：
+    改在 CPU 上配置，再以模型自己的初始化重新計算（已載入的參數標記為已初始化，不會被覆寫）"""
+    import torch
+
+    for tensor in model.state_dict(keep_vars=True).values():
+        tensor._is_hf_initialized = True
+    for module in model.modules():
+        names = [name for name, buffer in module.named_buffers(recurse=False) if buffer.is_meta]
+        for name in names:
+            module._buffers[name] = torch.empty_like(module._buffers[name], device="cpu")
+        if names:
+            model._init_weights(module)
+    leftover = [name for name, tensor in list(model.named_parameters()) + list(model.named_buffers()) if tensor.is_meta]
+    if leftover:
+        raise RuntimeError(f"Could not initialize {leftover[:5]} without loading the model")
+
+
+def load_mmap_model(model_name=MODEL_NAME, threads=None):
+    """以映射權重載入模型，回傳 (backend, tokenizer)"""
+    import torch
+    from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+    from backends import TorchBackend
+
+    if threads:
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+
+    model_dir = resolve_model_dir(model_name)
+    index_path = os.path.join(model_dir, "model.safetensors.index.json")
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            shards = sorted(set(json.load(f)["weight_map"].values()))
+    else:
+        shards = ["model.safetensors"]
+    state = {}
+    for shard in shards:
+        state.update(mmap_safetensors(os.path.join(model_dir, shard)))
+
+    # 在 meta 裝置上建立模型（不配置也不初始化權重），再以 assign=True 把參數換成映射的 tensor
+    config = AutoConfig.from_pretrained(model_dir)
+    with torch.device("meta"):
+        model = AutoModelForSequenceClassification.from_config(config)
+    result = model.load_state_dict(state, strict=False, assign=True)
+    if result.unexpected_keys:
+        raise RuntimeError(f"Unexpected weights in {model_dir}: {result.unexpected_keys[:5]}")
+    # strict=False 不會檢查缺少的參數；缺少的參數會留在 meta 裝置上（沒有值）
+    missing = missing_weights(model, result.missing_keys)
+    if missing:
+        raise RuntimeError(f"Missing weights in {model_dir}: {missing[:5]}")
+    model.tie_weights()
+    materialize_buffers(model)
+    model.requires_grad_(False)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    return TorchBackend(model, tokenizer), tokenizer
+
+
+# worker 行程
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    _worker_model = load_mmap_model(model_name, threads)
+
+
+def _score_in_worker(args):
+    from batch_score import score_document
+
+    doc_id, text, include_segments, settings = args
+    clf, tokenizer = _worker_model
+    return score_document(doc_id, text, clf, tokenizer, include_segments, **settings)
+
+
+def default_threads(processes):
+    """每個 worker 的 intra-op 執行緒數：平分 CPU 核心"""
+    return max(1, (os.cpu_count() or 1) // processes)
+
+
+def score_documents_parallel(documents, model_name=MODEL_NAME, processes=2, threads_per_worker=None,
+                             include_segments=False, **settings):
+    """將文件分散到多個 worker 行程，依輸入順序逐筆產出結果"""
+    threads = threads_per_worker or default_threads(processes)
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes, initializer=_init_worker, initargs=(model_name, threads)) as pool:
+        # 限制同時送出的文件數，避免一次把整個語料讀進佇列
+        pending = deque()
+        for doc_id, text in documents:
+            pending.append(pool.apply_async(_score_in_worker, ((doc_id, text, include_segments, settings),)))
+            if len(pending) >= processes * 4:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()